@@ -0,0 +1,373 @@
+"""
+Scaling benchmarks of module discovery, of the register and of its snapshots, run against synthetic codebases.
+
+Run from the root of the repository with `python -m benchmarks.suite`, see `--help` for the options.
+Results may be saved as a baseline (`--save`) and later runs compared against it (`--compare`):
+the comparison fails when any wall time or peak memory grows more than the tolerance.
+"""
+
+import argparse
+import functools
+import gc
+import importlib
+import itertools
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import (
+    asdict,
+    dataclass,
+)
+from pathlib import Path
+
+from pca.packages.archunit import (
+    ArchUnit,
+    ArchUnitRegister,
+)
+from pca.packages.archunit.importing import (
+    iterate_module_specs,
+    iterate_modules,
+)
+from pca.packages.archunit.introspection import TargetReference
+from pca.packages.archunit.snapshot import (
+    load_snapshot,
+    save_snapshot,
+)
+from pca.packages.archunit.units.application import Application
+from pca.packages.archunit.units.common import Tag
+
+DEFAULT_BASELINE_PATH = Path(".benchmarks") / "baseline.json"
+
+
+@dataclass(frozen=True)
+class Shape:
+    """
+    Layout of a synthetic codebase.
+
+    Each package has `modules` modules, `width` subpackages (down to the `depth`), `namespaces` subdirectories
+    without `__init__` (PEP 420 namespace packages) with `modules` modules each and, iff `tests` is on,
+    a `tests` directory without `__init__` with a test module per module of the package.
+    """
+
+    name: str
+    depth: int
+    width: int
+    modules: int
+    namespaces: int = 1
+    tests: bool = True
+
+
+SHAPES = {
+    "deep": Shape("synthetic_deep", depth=8, width=2, modules=3),
+    "wide": Shape("synthetic_wide", depth=2, width=16, modules=6),
+}
+
+
+class Result(t.NamedTuple):
+    name: str
+    wall_s: float
+    peak_bytes: int
+    operations: int
+
+
+class Label(Tag, compact=True):
+    color: str = "none"
+
+
+def generate_tree(root: Path, shape: Shape) -> int:
+    """Writes the synthetic codebase into the directory, returning the number of its `.py` files."""
+    return _write_package(root / shape.name, shape, 0)
+
+
+def _write_package(directory: Path, shape: Shape, level: int) -> int:
+    directory.mkdir(parents=True)
+    (directory / "__init__.py").write_text('"""A synthetic package."""\n')
+    file_count = 1 + _write_modules(directory, shape.modules)
+    for index in range(shape.namespaces):
+        namespace = directory / f"namespace{index}"
+        namespace.mkdir()
+        file_count += _write_modules(namespace, shape.modules)
+    if shape.tests:
+        tests = directory / "tests"
+        tests.mkdir()
+        for index in range(shape.modules):
+            (tests / f"test_module{index}.py").write_text(f"def test_module{index}():\n    assert True\n")
+        file_count += shape.modules
+    if level < shape.depth:
+        for index in range(shape.width):
+            file_count += _write_package(directory / f"package{index}", shape, level + 1)
+    return file_count
+
+
+def _write_modules(directory: Path, count: int) -> int:
+    for index in range(count):
+        source = "import typing as t\n"
+        if index:
+            source += f"from . import module{index - 1}\n"
+        source += f"\n\nclass Model{index}:\n    value: t.Optional[int] = None\n"
+        (directory / f"module{index}.py").write_text(source)
+    return count
+
+
+def measure(
+    name: str, function: t.Callable[[], int], repeat: int, setup: t.Callable[[], None] = lambda: None
+) -> Result:
+    """
+    Best wall time out of the `repeat` runs, and the peak of the memory allocated during a separate run.
+
+    The function returns the number of operations it has done, reported along the timings.
+    """
+    wall_s = float("inf")
+    operations = 0
+    for _ in range(repeat):
+        setup()
+        gc.collect()
+        start = time.perf_counter()
+        operations = function()
+        wall_s = min(wall_s, time.perf_counter() - start)
+    setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return Result(name, wall_s, peak_bytes, operations)
+
+
+def _forget_modules(package_name: str) -> None:
+    for name in [name for name in sys.modules if name == package_name or name.startswith(f"{package_name}.")]:
+        del sys.modules[name]
+    importlib.invalidate_caches()
+
+
+def benchmark_discovery(root: Path, shape: Shape, repeat: int) -> t.Iterator[Result]:
+    file_count = generate_tree(root, shape)
+    print(f"# {shape.name}: {file_count} files", file=sys.stderr)
+    for recursive, include_packages in itertools.product((True, False), repeat=2):
+        flags = f"recursive={recursive},include_packages={include_packages}"
+        yield measure(
+            f"{shape.name}.iterate_modules[{flags}]",
+            lambda: sum(1 for _ in iterate_modules(shape.name, recursive, include_packages)),
+            repeat,
+            setup=lambda: _forget_modules(shape.name),
+        )
+        yield measure(
+            f"{shape.name}.iterate_module_specs[{flags}]",
+            lambda: sum(1 for _ in iterate_module_specs(shape.name, recursive, include_packages)),
+            repeat,
+            setup=lambda: _forget_modules(shape.name),
+        )
+    _forget_modules(shape.name)
+
+
+def make_units(
+    count: int, units_per_target: int = 10, make_target: t.Callable[[int], t.Any] = lambda index: object()
+) -> t.Tuple[t.List[object], t.List[ArchUnit]]:
+    """Distinct units of a few types, spread over `count // units_per_target` targets."""
+    targets = [make_target(index) for index in range(max(count // units_per_target, 1))]
+    # NB: values repeat over the targets, as tags usually do
+    unit_types = itertools.cycle(
+        [
+            lambda target, i: Tag(target, f"tag-{i // len(targets)}"),
+            lambda target, i: Label(target, f"label-{i // len(targets)}", "green"),
+            lambda target, i: Application(target, f"application-{i // len(targets)}"),
+        ]
+    )
+    units = [next(unit_types)(targets[i % len(targets)], i) for i in range(count)]  # type: ignore
+    return targets, units
+
+
+def benchmark_register(count: int, repeat: int) -> t.Iterator[Result]:
+    targets, units = make_units(count)
+    print(f"# register: {count} units, {len(targets)} targets", file=sys.stderr)
+
+    def register_one_by_one() -> int:
+        register = ArchUnitRegister()
+        for unit in units:
+            register.register(unit)
+        return len(units)
+
+    def register_multiple() -> int:
+        ArchUnitRegister().register_multiple(units)
+        return len(units)
+
+    yield measure("register.register", register_one_by_one, repeat)
+    yield measure("register.register_multiple", register_multiple, repeat)
+
+    register = ArchUnitRegister()
+    register.register_multiple(units)
+    yield measure("register.freeze", lambda: len(register.freeze()), repeat)
+    for kind, queried in (("mutable", register), ("frozen", register.freeze())):
+        yield from _benchmark_queries(kind, queried, targets, repeat)
+    for threads in (1, 4):
+        yield measure(
+            f"register.concurrent[threads={threads}]",
+            functools.partial(_register_and_query_concurrently, units, targets, threads),
+            repeat,
+        )
+
+
+def _register_and_query_concurrently(units: t.List[ArchUnit], targets: t.List[object], threads: int) -> int:
+    """Each thread registers its share of the units in batches, and queries their targets after each batch."""
+    register = ArchUnitRegister()
+
+    def work(index: int) -> int:
+        operations = 0
+        share = units[index::threads]
+        for start in range(0, len(share), 100):
+            register.register_multiple(share[start : start + 100])
+            operations += sum(
+                1 for target in targets[start // 10 : start // 10 + 10] for _ in register.get_all_for_target(target)
+            )
+        return operations + len(share)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return sum(executor.map(work, range(threads)))
+
+
+QUERIED_UNIT_TYPES = (ArchUnit, Tag, Application)
+
+
+def benchmark_snapshot(root: Path, count: int, repeat: int) -> t.Iterator[Result]:
+    # NB: targets of saved units have to be referable
+    targets, units = make_units(count, make_target=lambda index: TargetReference(f"module{index}", "target"))
+    register = ArchUnitRegister()
+    register.register_multiple(units)
+    path = root / "units.snapshot"
+
+    def save() -> int:
+        save_snapshot(register, path)
+        return len(units)
+
+    def load() -> int:
+        with load_snapshot(path) as snapshot:
+            return len(snapshot)
+
+    def load_all() -> int:
+        with load_snapshot(path) as snapshot:
+            return sum(1 for _ in snapshot)
+
+    yield measure("snapshot.save", save, repeat)
+    print(f"# snapshot: {path.stat().st_size} bytes", file=sys.stderr)
+    yield measure("snapshot.load", load, repeat)
+    yield measure("snapshot.load+iterate", load_all, repeat)
+    snapshot = load_snapshot(path)
+    try:
+        yield from _benchmark_queries("snapshot", snapshot, targets, repeat)
+    finally:
+        snapshot.close()
+
+
+def _benchmark_queries(kind: str, register: t.Any, targets: t.List[object], repeat: int) -> t.Iterator[Result]:
+    for unit_type in QUERIED_UNIT_TYPES:
+        yield measure(
+            f"{kind}.get_all_of_type[{unit_type.__name__}]",
+            functools.partial(_count_all, register.get_all_of_type, [unit_type]),
+            repeat,
+        )
+    yield measure(
+        f"{kind}.get_all_for_target",
+        functools.partial(_count_all, register.get_all_for_target, targets),
+        repeat,
+    )
+    for unit_type in QUERIED_UNIT_TYPES:
+        yield measure(
+            f"{kind}.get_all_of_type_for_target[{unit_type.__name__}]",
+            functools.partial(
+                _count_all, lambda target: register.get_all_of_type_for_target(target, unit_type), targets
+            ),
+            repeat,
+        )
+
+
+def _count_all(query: t.Callable[[t.Any], t.Iterable[ArchUnit]], arguments: t.Iterable[t.Any]) -> int:
+    """Runs the query for each of the arguments, consuming the results; returns the number of the units."""
+    return sum(1 for argument in arguments for _ in query(argument))
+
+
+def compare(results: t.List[Result], baseline: t.Dict[str, t.Any], tolerance: float) -> t.List[str]:
+    """Descriptions of the regressions against the baseline: these exceeding it more than `tolerance` times."""
+    baseline_results = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline_results.get(result.name)
+        if previous is None:
+            continue
+        for metric in ("wall_s", "peak_bytes"):
+            current_value, previous_value = getattr(result, metric), previous[metric]
+            if previous_value and current_value > previous_value * (1 + tolerance):
+                regressions.append(
+                    f"{result.name} {metric}: {previous_value:.6g} -> {current_value:.6g} "
+                    f"(+{(current_value / previous_value - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def print_results(results: t.List[Result]) -> None:
+    print(f"{'benchmark':<72} {'wall ms':>10} {'peak KiB':>10} {'ns/op':>10}")
+    for result in results:
+        per_operation = result.wall_s / result.operations * 1e9 if result.operations else 0.0
+        print(
+            f"{result.name:<72} {result.wall_s * 1e3:>10.2f} {result.peak_bytes / 1024:>10.1f} {per_operation:>10.0f}"
+        )
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", choices=sorted(SHAPES), action="append", help="layouts of the codebases")
+    parser.add_argument("--units", type=int, default=100_000, help="number of the registered units")
+    parser.add_argument("--repeat", type=int, default=3, help="number of the timed runs, the best one is taken")
+    parser.add_argument("--skip-discovery", action="store_true")
+    parser.add_argument("--skip-register", action="store_true")
+    parser.add_argument("--skip-snapshot", action="store_true")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE_PATH, type=Path, help="save as a baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE_PATH, type=Path, help="compare to a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative growth accepted by the comparison")
+    args = parser.parse_args(argv)
+
+    results: t.List[Result] = []
+    if not args.skip_discovery:
+        with tempfile.TemporaryDirectory() as root:
+            sys.path.insert(0, root)
+            try:
+                for shape_name in args.shape or sorted(SHAPES):
+                    results.extend(benchmark_discovery(Path(root), SHAPES[shape_name], args.repeat))
+            finally:
+                sys.path.remove(root)
+    if not args.skip_register:
+        results.extend(benchmark_register(args.units, args.repeat))
+    if not args.skip_snapshot:
+        with tempfile.TemporaryDirectory() as root:
+            results.extend(benchmark_snapshot(Path(root), args.units, args.repeat))
+    print_results(results)
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "units": args.units,
+            "results": [result._asdict() for result in results],
+            "shapes": {name: asdict(shape) for name, shape in SHAPES.items()},
+        }
+        args.save.write_text(json.dumps(report, indent=2))
+        print(f"# saved to {args.save}", file=sys.stderr)
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"# no regressions against {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
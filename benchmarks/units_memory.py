@@ -0,0 +1,65 @@
+"""
+Memory footprint of ArchUnits: regular vs compact ones.
+
+Run from the root of the repository with `python -m benchmarks.units_memory [number of units]`.
+Fails when the register takes more than `REGISTER_BYTES_PER_UNIT` per unit, on top of the units themselves
+(with a target per unit, which is the common case).
+"""
+
+import gc
+import sys
+import tracemalloc
+import typing as t
+
+from pca.packages.archunit import (
+    ArchUnit,
+    ArchUnitRegister,
+)
+
+# the register of 0.0.1 took about 210 bytes per unit, in two sets
+REGISTER_BYTES_PER_UNIT = 256
+
+
+class RegularTag(ArchUnit):
+    value: str
+
+
+class CompactTag(ArchUnit, compact=True):
+    value: str
+
+
+def measure(unit_type: t.Type[ArchUnit], count: int) -> t.Tuple[float, float]:
+    """Bytes per unit, for the units alone and for the units registered in a register."""
+    # targets are made before measuring; values are made per unit (as if read from a source code)
+    # and repeat, as tags usually do
+    targets = [object() for _ in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    units = [unit_type(target, f"tag-{i % 100}") for i, target in enumerate(targets)]
+    units_size = tracemalloc.get_traced_memory()[0]
+    register = ArchUnitRegister()
+    register.register_multiple(units)
+    register_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return units_size / count, register_size / count
+
+
+def main(count: int) -> int:
+    print(f"{count} units, bytes per unit:")
+    print(f"{'':>12} {'units':>10} {'registered':>12}")
+    regressions = []
+    for unit_type in (RegularTag, CompactTag):
+        units_size, register_size = measure(unit_type, count)
+        print(f"{unit_type.__name__:>12} {units_size:>10.1f} {register_size:>12.1f}")
+        if register_size - units_size > REGISTER_BYTES_PER_UNIT:
+            regressions.append(
+                f"{unit_type.__name__} register: {register_size - units_size:.1f} bytes per unit "
+                f"(budget {REGISTER_BYTES_PER_UNIT})"
+            )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
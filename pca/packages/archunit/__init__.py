@@ -1,7 +1,32 @@
-from . import units  # noqa: F401, F403
-from .register import ArchUnitRegister  # noqa: F401, F403
-from .units import ArchUnit  # noqa: F401, F403
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from . import units  # noqa: F401, F403
+    from .register import ArchUnitRegister  # noqa: F401, F403
+    from .units import ArchUnit  # noqa: F401, F403
 
 __author__ = """lhaze"""
 __email__ = "github@lhaze.name"
 __version__ = VERSION = "0.0.1"
+
+# names exported by the package, imported on the first access (PEP 562), so that importing any
+# of the submodules (e.g. the CLI) doesn't import all the others
+_LAZY_NAMES = {
+    "units": ".units",
+    "ArchUnitRegister": ".register",
+    "ArchUnit": ".units",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    module = import_module(_LAZY_NAMES[name], __name__)
+    value = module if name == "units" else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_NAMES])
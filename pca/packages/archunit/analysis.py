@@ -0,0 +1,80 @@
+import ast
+import os
+import typing as t
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+)
+from itertools import islice
+from types import ModuleType
+
+from .importing import (
+    ModuleSpec,
+    find_module_spec,
+)
+
+T = t.TypeVar("T")
+Analyzer = t.Callable[[ModuleSpec], T]
+
+DEFAULT_CHUNK_SIZE = 32
+
+
+def parse_module(spec: ModuleSpec) -> ast.Module:
+    """
+    Parses the source code of the module, without importing it.
+
+    Modules without a source (i.e. namespace packages) give an empty `ast.Module`.
+    """
+    return ast.parse(spec.read_source(), filename=str(spec.path))
+
+
+def analyze_modules(
+    modules: t.Iterable[t.Union[ModuleSpec, ModuleType]],
+    analyzer: Analyzer = parse_module,  # type: ignore
+    jobs: t.Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> t.Generator[T, None, None]:
+    """
+    Runs the analyzer over each of the modules, in parallel processes if there are more than one `jobs`.
+
+    Results are yielded lazily in the order of the `modules`, so the output of `iterate_modules`
+    or `iterate_module_specs` may be consumed as a stream. Modules are sent to the workers in
+    chunks of `chunk_size` specs, to keep the interprocess communication cost low.
+
+    :param modules: specs of the modules or the modules themselves (e.g. from `iterate_modules`).
+    :param analyzer: a function taking a `ModuleSpec`; it has to be picklable (i.e. defined at the top level
+        of a module) as well as its results, when run in parallel.
+    :param jobs: number of worker processes; defaults to the number of CPUs, `1` runs the analysis in-process.
+    :param chunk_size: number of modules analyzed by a worker in a single batch.
+    """
+    specs = (module if isinstance(module, ModuleSpec) else find_module_spec(module)[0] for module in modules)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1:
+        yield from map(analyzer, specs)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from _analyze_in_chunks(executor, specs, analyzer, jobs, chunk_size)
+
+
+def _analyze_in_chunks(
+    executor: Executor, specs: t.Iterator[ModuleSpec], analyzer: Analyzer, jobs: int, chunk_size: int
+) -> t.Generator[T, None, None]:
+    # keep a bounded number of chunks in flight, so that an infinite (or just huge) stream of modules
+    # doesn't have to be materialized, and results are yielded as soon as their predecessors are done
+    pending: t.Deque[Future] = deque()
+    while True:
+        while len(pending) < 2 * jobs:
+            chunk = list(islice(specs, chunk_size))
+            if not chunk:
+                break
+            pending.append(executor.submit(_analyze_chunk, analyzer, chunk))
+        if not pending:
+            return
+        yield from pending.popleft().result()
+
+
+def _analyze_chunk(analyzer: Analyzer, specs: t.List[ModuleSpec]) -> t.List[T]:
+    return [analyzer(spec) for spec in specs]
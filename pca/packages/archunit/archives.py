@@ -0,0 +1,313 @@
+"""
+Reading modules out of zip archives (zipapps, wheels, eggs) without extracting them.
+
+Paths inside an archive look the same as these the `zipimport` machinery gives to the modules,
+e.g. `/opt/app.pyz/my_app/__init__.py`. The central directory of an archive is read directly (with `mmap`)
+and indexed once per archive; sources of the members are read on demand, one at a time.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import typing as t
+import zipfile
+import zlib
+
+from . import probes
+
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<4s4H2LH")
+_END_OF_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x05\x06"
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+_ZIP64_END_OF_CENTRAL_DIRECTORY = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_OF_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x06\x06"
+_CENTRAL_DIRECTORY_ENTRY = struct.Struct("<4s6H3L5H2L")
+_CENTRAL_DIRECTORY_ENTRY_SIGNATURE = b"PK\x01\x02"
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_ZIP64_EXTRA_ID = 0x0001
+_MAX_COMMENT_SIZE = 0xFFFF
+_UTF8_FLAG = 0x800
+_ENCRYPTED_FLAG = 0x1
+_STORED = 0
+_DEFLATED = 8
+
+
+class ArchiveError(ValueError):
+    """The file isn't a (supported) zip archive."""
+
+
+class _Member(t.NamedTuple):
+    method: int
+    flags: int
+    compressed_size: int
+    size: int
+    header_offset: int
+
+
+class ArchiveEntry:
+    """An entry of a directory inside an archive, quacking like `os.DirEntry` as far as modules are concerned."""
+
+    __slots__ = ("name", "path", "_is_dir")
+
+    def __init__(self, name: str, path: str, is_dir: bool) -> None:
+        self.name = name
+        self.path = path
+        self._is_dir = is_dir
+
+    def is_dir(self) -> bool:
+        return self._is_dir
+
+    def is_file(self) -> bool:
+        return not self._is_dir
+
+    def __repr__(self) -> str:
+        return f"<ArchiveEntry {self.name!r}>"
+
+
+class ArchiveIndex:
+    """
+    The members & the directory tree of a zip archive, made out of its central directory.
+
+    Directories don't need entries of their own: they are implied by the names of the members. Data
+    prepended to the archive (e.g. the shebang line of a zipapp) is accounted for, as `zipfile` does.
+    """
+
+    _PACKAGE_INIT_FILE_NAMES = ("__init__.py", "__init__.pyc")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        stat = os.stat(path)
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.members: t.Dict[str, _Member] = {}
+        # children of each directory (`""` being the root of the archive) by name: are they directories?
+        self.directories: t.Dict[str, t.Dict[str, bool]] = {"": {}}
+        self.explicit_directories: t.Set[str] = set()
+        self._offset = 0
+        self._read_central_directory()
+
+    @probes.instrumented("read_central_directory", "archives")
+    def _read_central_directory(self) -> None:
+        with open(self.path, "rb") as f:
+            if not self.size:
+                raise ArchiveError(f"{self.path} is not a zip archive")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                try:
+                    entry_count, directory_offset = self._find_central_directory(data)
+                    position = directory_offset + self._offset
+                    for _ in range(entry_count):
+                        position = self._read_entry(data, position)
+                except struct.error:
+                    raise ArchiveError(f"{self.path} is a truncated zip archive")
+
+    def _find_central_directory(self, data: mmap.mmap) -> t.Tuple[int, int]:
+        end = len(data)
+        position = data.rfind(_END_OF_CENTRAL_DIRECTORY_SIGNATURE, max(0, end - _MAX_COMMENT_SIZE - 22), end)
+        if position < 0:
+            raise ArchiveError(f"{self.path} is not a zip archive")
+        _, _, _, _, entry_count, directory_size, directory_offset, _ = _END_OF_CENTRAL_DIRECTORY.unpack_from(
+            data, position
+        )
+        records_size = 0
+        locator_position = position - _ZIP64_LOCATOR.size
+        if locator_position >= 0 and data[locator_position : locator_position + 4] == _ZIP64_LOCATOR_SIGNATURE:
+            record_position = locator_position - _ZIP64_END_OF_CENTRAL_DIRECTORY.size
+            record = _ZIP64_END_OF_CENTRAL_DIRECTORY.unpack_from(data, record_position)
+            if record[0] != _ZIP64_END_OF_CENTRAL_DIRECTORY_SIGNATURE:
+                raise ArchiveError(f"{self.path} has a corrupted zip64 end of central directory")
+            entry_count, directory_size, directory_offset = record[7], record[8], record[9]
+            records_size = _ZIP64_LOCATOR.size + _ZIP64_END_OF_CENTRAL_DIRECTORY.size
+        # NB: offsets are relative to the beginning of the archive, which may follow some other data
+        self._offset = position - records_size - directory_size - directory_offset
+        if self._offset < 0:
+            raise ArchiveError(f"{self.path} has a corrupted end of central directory")
+        return entry_count, directory_offset
+
+    def _read_entry(self, data: mmap.mmap, position: int) -> int:
+        entry = _CENTRAL_DIRECTORY_ENTRY.unpack_from(data, position)
+        if entry[0] != _CENTRAL_DIRECTORY_ENTRY_SIGNATURE:
+            raise ArchiveError(f"{self.path} has a corrupted central directory")
+        flags, method = entry[3], entry[4]
+        compressed_size, size = entry[8], entry[9]
+        name_size, extra_size, comment_size = entry[10], entry[11], entry[12]
+        header_offset = entry[16]
+        position += _CENTRAL_DIRECTORY_ENTRY.size
+        raw_name = data[position : position + name_size]
+        name = raw_name.decode("utf-8" if flags & _UTF8_FLAG else "cp437")
+        extra = data[position + name_size : position + name_size + extra_size]
+        if 0xFFFFFFFF in (compressed_size, size, header_offset):
+            size, compressed_size, header_offset = _read_zip64_extra(extra, size, compressed_size, header_offset)
+        self._add(name, _Member(method, flags, compressed_size, size, header_offset))
+        return position + name_size + extra_size + comment_size
+
+    def _add(self, name: str, member: _Member) -> None:
+        is_dir = name.endswith("/")
+        name = name.rstrip("/")
+        if not name:
+            return
+        if not is_dir:
+            self.members[name] = member
+        parts = name.split("/")
+        for index in range(len(parts)):
+            parent = "/".join(parts[:index])
+            self.directories.setdefault(parent, {})[parts[index]] = is_dir or index < len(parts) - 1
+        if is_dir:
+            self.directories.setdefault(name, {})
+            self.explicit_directories.add(name)
+
+    def list_directory(self, inner_path: str) -> t.Optional[t.List[ArchiveEntry]]:
+        """
+        Entries of the directory, sorted by name; `None` if there is no such directory in the archive.
+
+        Subdirectories without entries of their own are listed only if they are regular packages: `zipimport`
+        can't import them as namespace packages.
+        """
+        children = self.directories.get(inner_path)
+        if children is None:
+            return None
+        directory = os.path.join(self.path, *inner_path.split("/")) if inner_path else self.path
+        prefix = f"{inner_path}/" if inner_path else ""
+        return [
+            ArchiveEntry(name, os.path.join(directory, name), children[name])
+            for name in sorted(children)
+            if not children[name] or self._is_importable_directory(f"{prefix}{name}")
+        ]
+
+    def _is_importable_directory(self, inner_path: str) -> bool:
+        if inner_path in self.explicit_directories:
+            return True
+        children = self.directories.get(inner_path, {})
+        return any(name in children for name in self._PACKAGE_INIT_FILE_NAMES)
+
+    def read(self, inner_path: str) -> bytes:
+        """Reads & decompresses a member of the archive. Raises KeyError if there is no such member."""
+        member = self.members[inner_path]
+        if member.flags & _ENCRYPTED_FLAG:
+            raise ArchiveError(f"{inner_path} is encrypted in {self.path}")
+        if member.method not in (_STORED, _DEFLATED):
+            # NB: rare compression methods are left to `zipfile`
+            with zipfile.ZipFile(self.path) as archive:
+                return archive.read(inner_path)
+        with open(self.path, "rb") as f:
+            f.seek(self._offset + member.header_offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            if header[0] != _LOCAL_HEADER_SIGNATURE:
+                raise ArchiveError(f"{inner_path} has a corrupted header in {self.path}")
+            f.seek(header[9] + header[10], os.SEEK_CUR)
+            data = f.read(member.compressed_size)
+        probes.count("archives.read_members")
+        if member.method == _DEFLATED:
+            return zlib.decompress(data, -zlib.MAX_WBITS)
+        return data
+
+
+def _read_zip64_extra(extra: bytes, size: int, compressed_size: int, header_offset: int) -> t.Tuple[int, int, int]:
+    position = 0
+    while position + 4 <= len(extra):
+        extra_id, extra_size = struct.unpack_from("<2H", extra, position)
+        position += 4
+        if extra_id == _ZIP64_EXTRA_ID:
+            # NB: only the fields which don't fit into the entry are there, in this order
+            values = iter(struct.unpack_from(f"<{extra_size // 8}Q", extra, position))
+            if size == 0xFFFFFFFF:
+                size = next(values)
+            if compressed_size == 0xFFFFFFFF:
+                compressed_size = next(values)
+            if header_offset == 0xFFFFFFFF:
+                header_offset = next(values)
+            break
+        position += extra_size
+    return size, compressed_size, header_offset
+
+
+_indexes: t.Dict[str, ArchiveIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_archive_index(path: str) -> ArchiveIndex:
+    """
+    The index of the archive, read once and reused until the archive is modified.
+
+    Raises OSError if the file can't be read and ArchiveError if it isn't a zip archive.
+    """
+    stat = os.stat(path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+    if index is None or (index.mtime_ns, index.size) != (stat.st_mtime_ns, stat.st_size):
+        index = ArchiveIndex(path)
+        with _indexes_lock:
+            _indexes[path] = index
+    return index
+
+
+def clear_archive_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def find_archive(path: str) -> t.Optional[t.Tuple[ArchiveIndex, str]]:
+    """
+    Splits a path pointing into an archive into the index of the archive and the path inside it.
+
+    Returns `None` if the path doesn't point into a zip archive.
+    """
+    head = os.path.abspath(path)
+    inner_parts: t.List[str] = []
+    while not os.path.exists(head):
+        parent, name = os.path.split(head)
+        if parent == head:
+            return None
+        inner_parts.append(name)
+        head = parent
+    if not inner_parts or not os.path.isfile(head):
+        return None
+    try:
+        index = get_archive_index(head)
+    except (OSError, ArchiveError):
+        return None
+    return index, "/".join(reversed(inner_parts))
+
+
+def list_archive_directory(path: str) -> t.List[ArchiveEntry]:
+    """Entries of a directory inside an archive, sorted by name; empty if there is no such directory."""
+    found = find_archive(path)
+    if found is None:
+        return []
+    index, inner_path = found
+    return index.list_directory(inner_path) or []
+
+
+def read_file(path: str) -> bytes:
+    """Reads a file, or a member of an archive. Raises OSError if there is neither."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        found = find_archive(path)
+        if found is None or found[1] not in found[0].members:
+            raise
+        index, inner_path = found
+        return index.read(inner_path)
+
+
+def stat_file(path: str) -> t.Tuple[int, int]:
+    """
+    The modification time (in ns) & the size of a file, or of a member of an archive. Raises OSError if there is
+    neither.
+
+    Members share the modification time of their archive, so the time changes whenever the archive does.
+    """
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        found = find_archive(path)
+        if found is None:
+            raise
+        index, inner_path = found
+        member = index.members.get(inner_path)
+        if member is None and inner_path not in index.directories:
+            raise
+        return index.mtime_ns, member.size if member is not None else 0
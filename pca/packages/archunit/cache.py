@@ -0,0 +1,215 @@
+import hashlib
+import os
+import pickle
+import typing as t
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+
+from .analysis import (
+    DEFAULT_CHUNK_SIZE,
+    Analyzer,
+    T,
+    analyze_modules,
+)
+from .archives import (
+    read_file,
+    stat_file,
+)
+from .importing import (
+    ModuleSpec,
+    find_module_spec,
+)
+
+DEFAULT_CACHE_DIRECTORY = ".archunit_cache"
+_CACHE_FORMAT_VERSION = 1
+
+
+@dataclass
+class CacheStats:
+    """Counters of the cache usage since the cache was opened."""
+
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    removals: int = 0
+
+
+class _Entry(t.NamedTuple):
+    name: str
+    is_package: bool
+    is_namespace: bool
+    mtime_ns: int
+    size: int
+    digest: bytes
+    result: t.Any
+
+
+class ScanCache:
+    """
+    Persistent on-disk cache of per-module analysis results.
+
+    An entry is keyed by the path of the module and remembers the spec of the module (its qualified name
+    and the kind of package), the modification time & size of the file and a hash of its content.
+    Entries are reused iff the spec is unchanged and the file is unmodified: files with a changed
+    modification time are hashed to tell real changes from just touched files. Entries of files that
+    disappeared or namespace directories that got an `__init__` file are removed when the cache is saved.
+
+    Results are stored per analyzer (by its qualified name and an optional `version`), so they have to be
+    picklable.
+
+        with ScanCache() as cache:
+            trees = list(cache.analyze(iterate_module_specs("my_package"), parse_module, jobs=4))
+            print(cache.stats)
+    """
+
+    def __init__(self, directory: t.Union[str, Path] = DEFAULT_CACHE_DIRECTORY) -> None:
+        self.directory = Path(directory)
+        self.stats = CacheStats()
+        self._entries_per_analyzer: t.Dict[str, t.Dict[str, _Entry]] = {}
+        self._seen_per_analyzer: t.Dict[str, t.Set[str]] = {}
+
+    def __enter__(self) -> "ScanCache":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.save()
+
+    def analyze(
+        self,
+        modules: t.Iterable[t.Union[ModuleSpec, ModuleType]],
+        analyzer: Analyzer,
+        jobs: t.Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        version: str = "",
+    ) -> t.Generator[T, None, None]:
+        """
+        Does the same as `analysis.analyze_modules`, but analyzes only the modules missing from the cache.
+
+        Results are yielded in the order of the `modules`.
+        """
+        key = _get_analyzer_key(analyzer, version)
+        entries = self._get_entries(key)
+        seen = self._seen_per_analyzer.setdefault(key, set())
+
+        specs = [module if isinstance(module, ModuleSpec) else find_module_spec(module)[0] for module in modules]
+        hits: t.List[t.Optional[_Entry]] = []
+        misses: t.List[ModuleSpec] = []
+        fingerprints: t.List[t.Tuple[int, int, bytes]] = []
+        for spec in specs:
+            path = str(spec.path)
+            seen.add(path)
+            entry, fingerprint = self._lookup(entries, spec)
+            hits.append(entry)
+            if entry is None:
+                misses.append(spec)
+                fingerprints.append(fingerprint)
+
+        missed_results: t.Iterator[T] = analyze_modules(misses, analyzer, jobs=jobs, chunk_size=chunk_size)
+        missed = iter(zip(misses, fingerprints))
+        for entry in hits:
+            if entry is not None:
+                yield entry.result
+                continue
+            spec, (mtime_ns, size, digest) = next(missed)
+            result = next(missed_results)
+            entries[str(spec.path)] = _Entry(
+                spec.name, spec.is_package, spec.is_namespace, mtime_ns, size, digest, result
+            )
+            yield result
+
+    def save(self) -> None:
+        """Writes loaded entries to the disk, dropping these of modules that no longer exist."""
+        if not self._entries_per_analyzer:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        gitignore = self.directory / ".gitignore"
+        if not gitignore.exists():
+            gitignore.write_text("# Created by pca-archunit automatically.\n*\n")
+        for key, entries in self._entries_per_analyzer.items():
+            seen = self._seen_per_analyzer.get(key, set())
+            for path in [path for path, entry in entries.items() if path not in seen and _is_stale(path, entry)]:
+                del entries[path]
+                self.stats.removals += 1
+            file_path = self._get_file_path(key)
+            # NB: a temporary file per process, as many processes (e.g. xdist workers) may share the cache
+            temporary_path = file_path.with_suffix(f".{os.getpid()}.tmp")
+            with temporary_path.open("wb") as f:
+                pickle.dump((_CACHE_FORMAT_VERSION, key, entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, file_path)
+
+    def clear(self) -> None:
+        """Removes all the entries, both loaded and stored on the disk."""
+        self._entries_per_analyzer.clear()
+        self._seen_per_analyzer.clear()
+        if self.directory.is_dir():
+            for file_path in self.directory.glob("*.pickle"):
+                file_path.unlink()
+
+    def _get_file_path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}.pickle"
+
+    def _get_entries(self, key: str) -> t.Dict[str, _Entry]:
+        if key in self._entries_per_analyzer:
+            return self._entries_per_analyzer[key]
+        entries: t.Dict[str, _Entry] = {}
+        try:
+            with self._get_file_path(key).open("rb") as f:
+                version, stored_key, stored_entries = pickle.load(f)
+            if version == _CACHE_FORMAT_VERSION and stored_key == key:
+                entries = stored_entries
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+            # a missing or a corrupted cache file: start from scratch
+            pass
+        self._entries_per_analyzer[key] = entries
+        return entries
+
+    def _lookup(
+        self, entries: t.Dict[str, _Entry], spec: ModuleSpec
+    ) -> t.Tuple[t.Optional[_Entry], t.Tuple[int, int, bytes]]:
+        path = str(spec.path)
+        if spec.is_namespace:
+            # namespace packages have no source, there's nothing to check but the spec
+            mtime_ns, size, digest = 0, 0, b""
+        else:
+            (mtime_ns, size), digest = stat_file(path), b""
+        entry = entries.get(path)
+        if entry is not None and (entry.name, entry.is_package, entry.is_namespace) == (
+            spec.name,
+            spec.is_package,
+            spec.is_namespace,
+        ):
+            if (entry.mtime_ns, entry.size) == (mtime_ns, size):
+                self.stats.hits += 1
+                return entry, (mtime_ns, size, entry.digest)
+            digest = _hash_file(path)
+            if entry.digest == digest:
+                # the file has been touched, but not changed
+                entries[path] = entry._replace(mtime_ns=mtime_ns, size=size)
+                self.stats.hits += 1
+                return entry, (mtime_ns, size, digest)
+        if entry is not None:
+            self.stats.invalidations += 1
+        self.stats.misses += 1
+        if not spec.is_namespace and not digest:
+            digest = _hash_file(path)
+        return None, (mtime_ns, size, digest)
+
+
+def _get_analyzer_key(analyzer: Analyzer, version: str) -> str:
+    return f"{analyzer.__module__}.{analyzer.__qualname__}:{version}"
+
+
+def _hash_file(path: str) -> bytes:
+    return hashlib.blake2b(read_file(path), digest_size=16).digest()
+
+
+def _is_stale(path: str, entry: _Entry) -> bool:
+    try:
+        stat_file(path)
+    except OSError:
+        return True
+    if entry.is_namespace:
+        # has the namespace package become a regular one?
+        return any(os.path.isfile(os.path.join(path, f"__init__{suffix}")) for suffix in (".py", ".pyc"))
+    return False
@@ -1,15 +1,267 @@
 """Console script for pca-archunit."""
 
+import sys
+import time
+import typing as t
+from contextlib import ExitStack
+
 import click
 
+from . import probes
+
+if t.TYPE_CHECKING:
+    from .rules import Rule
+
+EXIT_OK = 0
+EXIT_VIOLATIONS = 1
+EXIT_USAGE_ERROR = 2
+
+# choices of `profile-imports --sort`, by the fields of ImportCost
+_SORT_FIELDS = {
+    "cumulative": "cumulative_ns",
+    "self": "self_ns",
+    "cumulative-memory": "cumulative_bytes",
+    "self-memory": "self_bytes",
+}
 
-@click.command()
-def main():
+
+@click.group(invoke_without_command=True)
+@click.pass_context
+def main(ctx: click.Context) -> None:
     """Run the main entrypoint."""
+    if ctx.invoked_subcommand is not None:
+        return
     click.echo("pca-archunit")
     click.echo("=" * len("pca-archunit"))
     click.echo("A DSL & testing library for your architecture. Part of the python-clean-architecture project.")
 
 
+@main.command()
+@click.argument("target")
+@click.argument("rules", nargs=-1, required=True)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes parsing the modules. Defaults to the number of CPUs.",
+)
+@click.option("--fail-fast", is_flag=True, help="Stop at the first violation.")
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory of the cache of the parsing results, reused between the runs.",
+)
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write a Chrome trace of the internals of the check to the file and print a summary of its timings.",
+)
+@click.option(
+    "--junit-xml",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the results as a JUnit XML report to the file.",
+)
+@click.option(
+    "--jsonl",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the results as JSON Lines to the file.",
+)
+def check(
+    target: str,
+    rules: t.Tuple[str, ...],
+    jobs: t.Optional[int],
+    fail_fast: bool,
+    cache_dir: t.Optional[str],
+    trace: t.Optional[str],
+    junit_xml: t.Optional[str],
+    jsonl: t.Optional[str],
+):
+    """
+    Check the architecture rules against the TARGET package.
+
+    RULES are qualified names of modules with the rules (listed in their `archunit_rules` attribute
+    or defined on the module level), of single rules or of iterables of rules. Violations are printed
+    as soon as they are found. Exits with 0 when all the rules are kept, with 1 when any is broken
+    and with 2 on usage errors.
+    """
+    reports = {"junit_xml": junit_xml, "jsonl": jsonl}
+    if trace is None:
+        _check(target, rules, jobs, fail_fast, cache_dir, reports)
+        return
+    from .instrumentation import tracing
+
+    with tracing() as tracer:
+        try:
+            _check(target, rules, jobs, fail_fast, cache_dir, reports)
+        finally:
+            tracer.write_chrome_trace(trace)
+            click.echo(tracer.format_summary(), err=True)
+
+
+def _check(
+    target: str,
+    rules: t.Tuple[str, ...],
+    jobs: t.Optional[int],
+    fail_fast: bool,
+    cache_dir: t.Optional[str],
+    reports: t.Dict[str, t.Optional[str]],
+) -> None:
+    # NB: the analysis is imported lazily, so the banner & the help don't pay for it
+    from .cache import ScanCache
+    from .graph import build_dependency_graph
+    from .reporting import (
+        JSONLinesReporter,
+        JUnitXMLReporter,
+        Reporter,
+        TextReporter,
+        report_rules,
+    )
+
+    _check_target(target)
+    loaded_rules = _load_rules(rules)
+    try:
+        with probes.span("build_dependency_graph", "cli", target=target):
+            if cache_dir is None:
+                graph = build_dependency_graph(target, jobs=jobs)
+            else:
+                with ScanCache(cache_dir) as cache:
+                    graph = build_dependency_graph(target, jobs=jobs, cache=cache)
+    except ImportError as e:
+        raise click.BadParameter(str(e), param_hint="TARGET")
+
+    with ExitStack() as stack:
+        reporters: t.List[Reporter] = [TextReporter(sys.stdout)]
+        if reports["junit_xml"] is not None:
+            reporters.append(JUnitXMLReporter(stack.enter_context(open(reports["junit_xml"], "w", encoding="utf-8"))))
+        if reports["jsonl"] is not None:
+            reporters.append(JSONLinesReporter(stack.enter_context(open(reports["jsonl"], "w", encoding="utf-8"))))
+        with probes.span("check_rules", "cli"):
+            violation_count = report_rules(graph, loaded_rules, reporters, fail_fast=fail_fast)
+    summary = f"{len(loaded_rules)} rule(s) checked against {len(graph.modules)} module(s)"
+    if violation_count:
+        click.echo(f"{summary}: {violation_count} violation(s) found", err=True)
+        raise SystemExit(EXIT_VIOLATIONS)
+    click.echo(f"{summary}: no violations", err=True)
+
+
+@main.command()
+@click.argument("target")
+@click.argument("rules", nargs=-1, required=True)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0),
+    default=0.5,
+    show_default=True,
+    help="Seconds between the polls for changes.",
+)
+@click.option("-j", "--jobs", type=click.IntRange(min=1), default=1, help="Number of processes parsing the modules.")
+def watch(target: str, rules: t.Tuple[str, ...], interval: float, jobs: int):
+    """
+    Check the architecture rules against the TARGET package, and check them again on every change.
+
+    Only the changed modules are parsed again, and only the rules they may affect are evaluated again.
+    All the current violations are printed after each change. Stop with Ctrl+C; exits with 1 if there
+    are violations left, with 0 otherwise.
+    """
+    from .watch import (
+        Watcher,
+        WatchResult,
+    )
+
+    _check_target(target)
+    watcher = Watcher(target, _load_rules(rules), jobs=jobs)
+    checks = 0
+
+    def print_result(result: WatchResult) -> None:
+        nonlocal checks
+        checks += 1
+        for violation in result.violations:
+            click.echo(str(violation))
+        changed = f"{len(result.changed)} module(s) changed" if checks > 1 else f"{result.analyzed} module(s) analyzed"
+        click.echo(
+            f"[{time.strftime('%H:%M:%S')}] {changed}, {len(result.checked_rules)} rule(s) evaluated "
+            f"in {result.duration * 1e3:.0f} ms: {len(result.violations)} violation(s)",
+            err=True,
+        )
+
+    try:
+        watcher.watch(print_result, interval=interval)
+    except ImportError as e:
+        raise click.BadParameter(str(e), param_hint="TARGET")
+    except KeyboardInterrupt:
+        pass
+    if watcher.violations:
+        raise SystemExit(EXIT_VIOLATIONS)
+
+
+@main.command("profile-imports")
+@click.argument("target")
+@click.option(
+    "--sort",
+    type=click.Choice(sorted(_SORT_FIELDS)),
+    default="cumulative",
+    show_default=True,
+    help="The cost the modules are ranked by.",
+)
+@click.option(
+    "--limit", type=click.IntRange(min=1), default=30, show_default=True, help="Number of the modules listed."
+)
+@click.option(
+    "--in-process",
+    is_flag=True,
+    help="Import the modules in this process instead of a fresh one; the modules imported already aren't measured.",
+)
+@click.option("--no-memory", is_flag=True, help="Don't trace the memory allocated, which slows the imports down.")
+def profile_imports(target: str, sort: str, limit: int, in_process: bool, no_memory: bool):
+    """
+    Import the TARGET package and all its modules, and rank the modules by the time and the memory
+    taken by their imports, including the modules they have imported for the first time.
+    """
+    from .profiling import (
+        format_import_costs,
+        profile_imports,
+    )
+
+    _check_target(target)
+    try:
+        costs = profile_imports(target, trace_memory=not no_memory, isolated=not in_process)
+    except ImportError as e:
+        raise click.BadParameter(str(e), param_hint="TARGET")
+    click.echo(format_import_costs(costs, sort_by=_SORT_FIELDS[sort], limit=limit))
+    total_ns = sum(cost.self_ns for cost in costs)
+    click.echo(f"{len(costs)} module(s) imported in {total_ns / 1e6:.1f} ms", err=True)
+
+
+def _check_target(target: str) -> None:
+    """Fails with a usage error, if the target isn't a module or package with the source to analyze."""
+    from .importing import (
+        OwnImportError,
+        find_module_spec,
+    )
+
+    try:
+        find_module_spec(target)
+    except (ImportError, OwnImportError) as e:
+        raise click.BadParameter(str(e), param_hint="TARGET")
+
+
+def _load_rules(names: t.Iterable[str]) -> t.List["Rule"]:
+    from .rules import load_rules
+
+    loaded_rules = []
+    for name in names:
+        try:
+            with probes.span("load_rules", "cli", rules=name):
+                loaded_rules.extend(load_rules(name))
+        except (ImportError, TypeError) as e:
+            raise click.BadParameter(str(e), param_hint="RULES")
+    return loaded_rules
+
+
 if __name__ == "__main__":
     main()  # pragma: no cover
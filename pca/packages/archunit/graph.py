@@ -0,0 +1,304 @@
+import ast
+import typing as t
+import warnings
+from array import array
+from itertools import accumulate
+from sys import intern
+from types import ModuleType
+
+from .analysis import analyze_modules
+from .cache import ScanCache
+from .importing import (
+    ModuleSpec,
+    find_module_spec,
+    iterate_module_specs,
+)
+
+# flags of a dependency edge; an edge may have both of them, if the dependency is imported twice
+RUNTIME_IMPORT = 1
+TYPE_CHECKING_IMPORT = 2
+ANY_IMPORT = RUNTIME_IMPORT | TYPE_CHECKING_IMPORT
+
+_TYPE_CHECKING_NAME = "TYPE_CHECKING"
+# typecodes of the arrays: 4-byte unsigned ints for ids & offsets, a byte for flags
+_ID_TYPECODE = "I"
+_FLAGS_TYPECODE = "B"
+
+
+class ImportStatement(t.NamedTuple):
+    """
+    An import found in the source of a module, with relative imports already made absolute.
+
+    `import a.b` gives `ImportStatement("a.b", ())`, while `from a import b, c` gives
+    `ImportStatement("a", ("b", "c"))`: the names may be either submodules or attributes of `a`.
+    """
+
+    module: str
+    names: t.Tuple[str, ...]
+    flags: int
+
+
+class ModuleImports(t.NamedTuple):
+    """The result of `extract_imports` for a single module."""
+
+    name: str
+    imports: t.Tuple[ImportStatement, ...]
+    # why the source of the module couldn't be parsed, if so; such a module has no imports
+    error: t.Optional[str] = None
+
+
+def extract_imports(spec: ModuleSpec) -> ModuleImports:
+    """
+    Finds all the imports in the source code of the module, without importing it.
+
+    Imports placed inside `if TYPE_CHECKING:` blocks (`typing.TYPE_CHECKING` or any other attribute
+    named so) are flagged with `TYPE_CHECKING_IMPORT` instead of `RUNTIME_IMPORT`.
+    A module which can't be parsed has no imports, and the error is kept in the result instead.
+    """
+    try:
+        tree = ast.parse(spec.read_source(), filename=str(spec.path))
+    except (SyntaxError, UnicodeDecodeError, ValueError) as e:
+        # NB: ValueError is raised for null bytes in the source by Python < 3.12
+        return ModuleImports(spec.name, (), f"{type(e).__name__}: {e}")
+    package = spec.name if spec.is_package else spec.name.rpartition(".")[0]
+    statements: t.List[ImportStatement] = []
+    stack: t.List[t.Tuple[ast.AST, int]] = [(tree, RUNTIME_IMPORT)]
+    while stack:
+        node, flags = stack.pop()
+        if isinstance(node, ast.Import):
+            statements.extend(ImportStatement(alias.name, (), flags) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = _resolve_relative_import(package, node.module, node.level)
+            if module is not None:
+                statements.append(ImportStatement(module, tuple(alias.name for alias in node.names), flags))
+        elif isinstance(node, ast.If) and _is_type_checking_test(node.test):
+            stack.extend((child, flags) for child in reversed(node.orelse))
+            stack.extend((child, TYPE_CHECKING_IMPORT) for child in reversed(node.body))
+        else:
+            stack.extend((child, flags) for child in reversed(list(ast.iter_child_nodes(node))))
+    return ModuleImports(spec.name, tuple(statements))
+
+
+def _resolve_relative_import(package: str, module: t.Optional[str], level: int) -> t.Optional[str]:
+    if not level:
+        return module
+    parts = package.split(".") if package else []
+    if level - 1 >= len(parts):
+        # a relative import beyond the top-level package; it can't be resolved
+        return None
+    base = ".".join(parts[: len(parts) - level + 1])
+    return f"{base}.{module}" if module else base
+
+
+def _is_type_checking_test(test: ast.expr) -> bool:
+    return (isinstance(test, ast.Name) and test.id == _TYPE_CHECKING_NAME) or (
+        isinstance(test, ast.Attribute) and test.attr == _TYPE_CHECKING_NAME
+    )
+
+
+class DependencyGraph:
+    """
+    Module-to-module import dependencies.
+
+    Modules are interned as integer ids: the modules of the analyzed codebase come first, in the order
+    of discovery, followed by the external modules they import. Edges are kept in compressed sparse row
+    (CSR) arrays, both forward (what a module imports) and reversed (what imports a module), so that
+    both questions are answered in O(degree) time and the whole graph takes a few bytes per edge.
+    """
+
+    def __init__(
+        self,
+        names: t.Sequence[str],
+        internal_count: int,
+        edges: t.Iterable[t.Tuple[int, int, int]],
+    ) -> None:
+        """
+        Builds the graph out of module names and edges between their ids.
+
+        :param names: the names of the modules; the position of the name is the id of a module.
+        :param internal_count: the number of the modules, at the beginning of `names`, that belong to
+            the analyzed codebase.
+        :param edges: triples of an importing module id, an imported module id and the flags of the import.
+        """
+        self._names: t.List[str] = [intern(name) for name in names]
+        self._ids: t.Dict[str, int] = {name: index for index, name in enumerate(self._names)}
+        self._internal_count = internal_count
+        # NB: edges are keyed by a single int instead of a tuple of ids, which is faster to hash & to sort
+        node_count = len(self._names)
+        edge_flags: t.Dict[int, int] = {}
+        for source, target, flags in edges:
+            key = source * node_count + target
+            edge_flags[key] = edge_flags.get(key, 0) | flags
+        self._offsets, self._targets, self._flags = _build_csr(node_count, edge_flags)
+        reversed_edge_flags = {
+            (key % node_count) * node_count + key // node_count: flags for key, flags in edge_flags.items()
+        }
+        self._reverse_offsets, self._reverse_sources, self._reverse_flags = _build_csr(node_count, reversed_edge_flags)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ids
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._names)
+
+    @property
+    def modules(self) -> t.Sequence[str]:
+        """The names of the modules of the analyzed codebase, i.e. without the external ones."""
+        return self._names[: self._internal_count]
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._targets)
+
+    def is_internal(self, name: str) -> bool:
+        return self._ids[name] < self._internal_count
+
+    def id_of(self, name: str) -> int:
+        return self._ids[name]
+
+    def name_of(self, module_id: int) -> str:
+        return self._names[module_id]
+
+    def successors(self, module_id: int, flags: int = ANY_IMPORT) -> t.List[int]:
+        """Ids of the modules imported by the module of given id."""
+        return _select(self._offsets, self._targets, self._flags, module_id, flags)
+
+    def predecessors(self, module_id: int, flags: int = ANY_IMPORT) -> t.List[int]:
+        """Ids of the modules importing the module of given id."""
+        return _select(self._reverse_offsets, self._reverse_sources, self._reverse_flags, module_id, flags)
+
+    def edge_flags(self, source_id: int, target_id: int) -> int:
+        """The flags of the import of the target by the source module, or `0` if there's none."""
+        start, end = self._offsets[source_id], self._offsets[source_id + 1]
+        for index in range(start, end):
+            if self._targets[index] == target_id:
+                return self._flags[index]
+        return 0
+
+    def imports(self, name: str, flags: int = ANY_IMPORT) -> t.List[str]:
+        """Names of the modules imported by the module."""
+        return [self._names[i] for i in self.successors(self._ids[name], flags)]
+
+    def imported_by(self, name: str, flags: int = ANY_IMPORT) -> t.List[str]:
+        """Names of the modules importing the module."""
+        return [self._names[i] for i in self.predecessors(self._ids[name], flags)]
+
+    def edges(self, flags: int = ANY_IMPORT) -> t.Iterator[t.Tuple[str, str, int]]:
+        """Iterates through all the edges as triples: importing module, imported module, flags of the import."""
+        for source in range(len(self._names)):
+            for index in range(self._offsets[source], self._offsets[source + 1]):
+                if self._flags[index] & flags:
+                    yield self._names[source], self._names[self._targets[index]], self._flags[index]
+
+
+def _build_csr(node_count: int, edge_flags: t.Dict[int, int]) -> t.Tuple["array[int]", "array[int]", "array[int]"]:
+    keys = sorted(edge_flags)
+    counts = [0] * (node_count + 1)
+    for key in keys:
+        counts[key // node_count + 1] += 1
+    offsets = array(_ID_TYPECODE, accumulate(counts))
+    neighbours = array(_ID_TYPECODE, (key % node_count for key in keys))
+    flags = array(_FLAGS_TYPECODE, (edge_flags[key] for key in keys))
+    return offsets, neighbours, flags
+
+
+def _select(
+    offsets: "array[int]", neighbours: "array[int]", edge_flags: "array[int]", module_id: int, flags: int
+) -> t.List[int]:
+    start, end = offsets[module_id], offsets[module_id + 1]
+    if flags == ANY_IMPORT:
+        return neighbours[start:end].tolist()
+    return [neighbours[i] for i in range(start, end) if edge_flags[i] & flags]
+
+
+def build_dependency_graph(
+    target: t.Union[str, ModuleType],
+    recursive: bool = True,
+    jobs: t.Optional[int] = None,
+    cache: t.Optional[ScanCache] = None,
+) -> DependencyGraph:
+    """
+    Builds the graph of imports between the modules of the target package, without importing them.
+
+    :param target: `builtins.module` object or Python qualified name of a package (or of a single module).
+    :param recursive: looks into subpackages (by default) or not.
+    :param jobs: number of processes to parse the modules with, see `analysis.analyze_modules`.
+    :param cache: the cache of the import extraction results, if any.
+    """
+    root, _ = find_module_spec(target)
+    specs = list(iterate_module_specs(target, recursive=recursive, include_packages=True))
+    if root.is_package:
+        specs.insert(0, root)
+    if cache is not None:
+        results: t.Iterable[ModuleImports] = cache.analyze(specs, extract_imports, jobs=jobs)
+    else:
+        results = analyze_modules(specs, extract_imports, jobs=jobs)
+    return graph_from_imports((spec.name for spec in specs), results)
+
+
+def graph_from_imports(modules: t.Iterable[str], results: t.Iterable[ModuleImports]) -> DependencyGraph:
+    """
+    Builds the graph out of the names of the analyzed modules and their imports.
+
+    Imports are resolved to the analyzed modules wherever possible: `from a import b` points to module `a.b`
+    if there is such a module, or to `a` otherwise; `import a.b.c` points to the longest prefix of the name
+    being an analyzed module. Imports of other modules are kept as external nodes of the graph.
+    """
+    resolver = ImportResolver(modules)
+    edges: t.List[t.Tuple[int, int, int]] = []
+    for module_imports in results:
+        edges.extend(resolver.resolve_module(module_imports))
+    return DependencyGraph(resolver.names, resolver.internal_count, edges)
+
+
+class ImportResolver:
+    """
+    Resolves the imports of the analyzed modules to the edges of the graph, see `graph_from_imports`.
+
+    The ids of the analyzed modules follow their order; the external modules get the next ids, when first imported.
+    """
+
+    def __init__(self, modules: t.Iterable[str]) -> None:
+        self.names = list(modules)
+        self.internal_count = len(self.names)
+        self._ids = {name: index for index, name in enumerate(self.names)}
+
+    def get_id(self, name: str) -> int:
+        module_id = self._ids.get(name)
+        if module_id is None:
+            module_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return module_id
+
+    def resolve_module(self, module_imports: ModuleImports) -> t.List[t.Tuple[int, int, int]]:
+        """The edges of the imports of the module."""
+        source = self.get_id(module_imports.name)
+        if module_imports.error is not None:
+            warnings.warn(
+                f"{module_imports.name} can't be parsed, so its imports are skipped ({module_imports.error})"
+            )
+        edges = []
+        for statement in module_imports.imports:
+            for target in self.resolve(statement):
+                if target != source:
+                    edges.append((source, target, statement.flags))
+        return edges
+
+    def resolve(self, statement: ImportStatement) -> t.List[int]:
+        submodules = (f"{statement.module}.{name}" for name in statement.names)
+        targets = {name if self._is_internal(name) else self._resolve_name(statement.module) for name in submodules}
+        return [self.get_id(name) for name in sorted(targets) or [self._resolve_name(statement.module)]]
+
+    def _is_internal(self, name: str) -> bool:
+        return self._ids.get(name, self.internal_count) < self.internal_count
+
+    def _resolve_name(self, name: str) -> str:
+        prefix = name
+        while prefix:
+            if self._is_internal(prefix):
+                return prefix
+            prefix = prefix.rpartition(".")[0]
+        return name
@@ -1,11 +1,17 @@
+import copy
 import os
 import pkgutil
 import sys
+import threading
 import typing as t
+from collections import OrderedDict
 from importlib import import_module
+from importlib.util import find_spec
 from pathlib import Path
 from types import ModuleType
 
+from . import probes
+
 # TODO create own error classes
 OwnImportError = ValueError
 UnexpectedBehavior = RuntimeError
@@ -23,12 +29,16 @@ def maybe_dotted_name(sth: t.Any) -> t.Any:
     return sth
 
 
-# noinspection PyUnboundLocalVariable
 def import_dotted_name(dotted_qualified_name: str) -> t.Any:
     """
     Import a dotted module path and return the attribute/class designated by
     the last name in the path. Raise ImportError if the import failed.
 
+    Results, including the failures, are memoized in a bounded LRU cache, see `resolution_cache_info`.
+    A result is dropped when the module is removed from `sys.modules`, replaced there or reloaded,
+    and a failure also when `sys.path` changes or `importlib.invalidate_caches` is called;
+    use `clear_resolution_cache` when the attributes of the modules have been changed.
+
     Code taken from: django.utils.module_loading:import_string v 1.9
 
     NB: stdlib `pkgutil` has `resolve_name` function, which does approximately the same,
@@ -36,12 +46,18 @@ def import_dotted_name(dotted_qualified_name: str) -> t.Any:
 
     TODO (tombstone Python 3.8 end of life: 2024-10)
     """
-    if ":" in dotted_qualified_name:
-        module_path, attribute_path = dotted_qualified_name.rsplit(":", 1)
-    else:
-        module_path, attribute_path = dotted_qualified_name, None
+    return _resolution_cache.resolve(dotted_qualified_name)
 
-    obj = import_module(module_path)
+
+def _import_module(name: str) -> ModuleType:
+    # NB: the span includes the imports of the dependencies of the module, which haven't been imported yet
+    with probes.span("import_module", "importing", module=name):
+        return import_module(name)
+
+
+# noinspection PyUnboundLocalVariable
+def _import_dotted_name(module_path: str, attribute_path: t.Optional[str]) -> t.Any:
+    obj = _import_module(module_path)
 
     if attribute_path is None:
         return obj
@@ -54,8 +70,172 @@ def import_dotted_name(dotted_qualified_name: str) -> t.Any:
     return obj
 
 
+class ResolutionCacheInfo(t.NamedTuple):
+    hits: int
+    misses: int
+    invalidations: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class _Resolution(t.NamedTuple):
+    module_path: str
+    # the module and its spec at the time of the resolution, to tell if it has been replaced or reloaded since
+    module: t.Optional[ModuleType]
+    module_spec: t.Any
+    value: t.Any
+    error: t.Optional[ImportError]
+    # the import generation of a failure, to tell if the modules may be found anew, see `_get_import_generation`
+    import_generation: int
+
+
+class _ResolutionCache:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._resolutions: "OrderedDict[str, _Resolution]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = self.evictions = 0
+        # bumped when `sys.path` changes or `importlib.invalidate_caches` is called, see `_InvalidationHook`
+        self._import_generation = 0
+        self._sys_path: t.List[str] = list(sys.path)
+        self._invalidation_hook = _InvalidationHook(self)
+
+    def resolve(self, dotted_qualified_name: str) -> t.Any:
+        # NB: the dict is read without the lock: single operations on it are atomic
+        resolution = self._resolutions.get(dotted_qualified_name)
+        if resolution is not None:
+            module_path, cached_module, module_spec, value, error, import_generation = resolution
+            module = sys.modules.get(module_path)
+            if (
+                module is cached_module
+                and getattr(module, "__spec__", None) is module_spec
+                and (error is None or import_generation == self._get_import_generation())
+            ):
+                with self._lock:
+                    self.hits += 1
+                    if dotted_qualified_name in self._resolutions:
+                        # unless evicted by another thread in the meantime
+                        self._resolutions.move_to_end(dotted_qualified_name)
+                if error is not None:
+                    # a fresh copy, so that tracebacks don't pile up on the cached one
+                    raise copy.copy(error) from error.__cause__
+                return value
+            with self._lock:
+                if self._resolutions.pop(dotted_qualified_name, None) is not None:
+                    self.invalidations += 1
+        with self._lock:
+            self.misses += 1
+        return self._resolve_missed(dotted_qualified_name)
+
+    def _resolve_missed(self, dotted_qualified_name: str) -> t.Any:
+        # NB: the import is done without the lock, as it may resolve other names on its own
+        if ":" in dotted_qualified_name:
+            module_path, attribute_path = dotted_qualified_name.rsplit(":", 1)
+        else:
+            module_path, attribute_path = dotted_qualified_name, None
+        # NB: taken before the import, so that a change made during the import isn't missed
+        import_generation = self._get_import_generation()
+        value: t.Any = None
+        error: t.Optional[ImportError] = None
+        try:
+            value = _import_dotted_name(module_path, attribute_path)
+        except ImportError as e:
+            error = e
+        module = sys.modules.get(module_path)
+        cached_error = None
+        if error is not None:
+            cached_error = _copy_error(error)
+            self._invalidation_hook.install()
+        resolution = _Resolution(
+            module_path, module, getattr(module, "__spec__", None), value, cached_error, import_generation
+        )
+        with self._lock:
+            self._resolutions[dotted_qualified_name] = resolution
+            self._resolutions.move_to_end(dotted_qualified_name)
+            while len(self._resolutions) > self.maxsize:
+                self._resolutions.popitem(last=False)
+                self.evictions += 1
+        if error is not None:
+            raise error
+        return value
+
+    def _get_import_generation(self) -> int:
+        if sys.path != self._sys_path:
+            with self._lock:
+                self._sys_path = list(sys.path)
+                self._import_generation += 1
+        return self._import_generation
+
+    def invalidate_failures(self) -> None:
+        with self._lock:
+            self._import_generation += 1
+
+    def info(self) -> ResolutionCacheInfo:
+        with self._lock:
+            return ResolutionCacheInfo(
+                self.hits, self.misses, self.invalidations, self.evictions, self.maxsize, len(self._resolutions)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._resolutions.clear()
+            self.hits = self.misses = self.invalidations = self.evictions = 0
+
+
+_Error = t.TypeVar("_Error", bound=BaseException)
+
+
+def _copy_error(error: _Error) -> _Error:
+    """
+    A copy of the error and of the errors it's been raised from, without their tracebacks,
+    so that the cached error doesn't keep the frames of its traceback alive.
+    """
+    copied = copy.copy(error)
+    if error.__cause__ is not None:
+        copied.__cause__ = _copy_error(error.__cause__)
+    return copied
+
+
+class _InvalidationHook:
+    """
+    Meta path finder which finds nothing, installed at the end of `sys.meta_path` once a failure is cached:
+    `importlib.invalidate_caches` calls it, which invalidates the failures cached before.
+    """
+
+    def __init__(self, cache: _ResolutionCache) -> None:
+        self.cache = cache
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.append(self)
+
+    def find_spec(self, fullname: str, path: t.Any, target: t.Any = None) -> None:
+        return None
+
+    def invalidate_caches(self) -> None:
+        self.cache.invalidate_failures()
+
+
+DEFAULT_RESOLUTION_CACHE_SIZE = 4096
+_resolution_cache = _ResolutionCache(DEFAULT_RESOLUTION_CACHE_SIZE)
+
+
+def resolution_cache_info() -> ResolutionCacheInfo:
+    """Statistics of the cache of `import_dotted_name`, similar to `functools.lru_cache`."""
+    return _resolution_cache.info()
+
+
+def clear_resolution_cache(maxsize: t.Optional[int] = None) -> None:
+    """Clears the cache of `import_dotted_name` and its statistics, optionally changing its size."""
+    _resolution_cache.clear()
+    if maxsize is not None:
+        _resolution_cache.maxsize = maxsize
+
+
 _INIT_FILE_NAME = "__init__"
 _PYTHON_CODE_FILE_SUFFIXES = {".py", ".pyc"}
+_PYTHON_SOURCE_FILE_SUFFIXES = {".py"}
 _IGNORED_DIRECTORY_NAMES = {"__pycache__"}
 
 
@@ -69,9 +249,10 @@ def iterate_modules(  # noqa: C901
     may iterate through test modules in codebase, even if hidden in `tests` of non-init directory structure.
     * May be recursive (by default) or not, depending on `recursive` flag.
     * May include intermediate packages iff `include_packages` flag is on.
-    * NB: for now, the function doesn't consider packed packages like zipfiles and eggs.
+    * Supports packages imported from zip archives (zipapps, wheels, eggs), see `archives`.
     * NB: extended design comparing of just using `pkgutil.walk_packages`, because `walk_packages` ignores
     implicit packages.
+    * NB: use `iterate_module_specs` to find the modules without importing them.
 
     :param target: `builtins.module` object (which represents both single-file Python module and a Python package)
         or Python qualified name of such an object to import.
@@ -128,7 +309,7 @@ def iterate_modules(  # noqa: C901
         for module_info in pkgutil.walk_packages([str(path)]):
             checked.add(module_info.name)
             try:
-                subtarget = import_module(f"{target.__name__}.{module_info.name}")
+                subtarget = _import_iterated_module(f"{target.__name__}.{module_info.name}")
             except ImportError:  # pragma: no cover
                 # TODO raise warning of non-importable package
                 continue
@@ -144,15 +325,15 @@ def iterate_modules(  # noqa: C901
         if not recursive:
             continue
         # try with subtargets as PEP 420 – Implicit Namespace Packages
-        for subpath in path.iterdir():
+        for entry in _list_directory(str(path)):
             if (
-                subpath.stem in checked  # these has been identified as packages earlier
-                or not subpath.is_dir()  # ignore non-dirs
-                or subpath.name in _IGNORED_DIRECTORY_NAMES  # specifically ignore some directories like Python cache
+                os.path.splitext(entry.name)[0] in checked  # these has been identified as packages earlier
+                or not entry.is_dir()  # ignore non-dirs
+                or entry.name in _IGNORED_DIRECTORY_NAMES  # specifically ignore some directories like Python cache
             ):
                 continue
             try:
-                subtarget = import_module(f"{target.__name__}.{subpath.name}")
+                subtarget = _import_iterated_module(f"{target.__name__}.{entry.name}")
             except ImportError:
                 continue
             if include_packages:
@@ -161,6 +342,13 @@ def iterate_modules(  # noqa: C901
             yield from iterate_modules(subtarget, recursive=recursive, include_packages=include_packages)
 
 
+def _import_iterated_module(name: str) -> ModuleType:
+    # NB: the span covers the module alone, not the iteration through its submodules, if it's a package
+    with probes.span("iterate_modules.module", "importing", module=name):
+        probes.count("iterated_modules")
+        return _import_module(name)
+
+
 def _get_modules_target_paths(target: ModuleType) -> t.Set[Path]:
     if target.__file__ is None:
         # case: PEP 420 – Implicit Namespace Packages
@@ -180,6 +368,262 @@ def _get_modules_target_paths(target: ModuleType) -> t.Set[Path]:
     raise UnexpectedBehavior("Unsupported case for Python module path.")  # pragma: no cover
 
 
+def _list_directory(directory: str) -> t.List[t.Any]:
+    """Entries of a directory, or of a directory inside a zip archive, sorted by name."""
+    try:
+        with os.scandir(directory) as entries:
+            return sorted(entries, key=lambda entry: entry.name)
+    except OSError:
+        # NB: looking for an archive only when there is no such directory keeps the common case fast
+        from .archives import list_archive_directory
+
+        return list_archive_directory(directory)
+
+
+class ModuleSpec(t.NamedTuple):
+    """
+    Lightweight description of a module found on the disk, made without importing it.
+
+    `path` mirrors `module.__file__`: the source file of a single-file module or the `__init__` file of
+    a regular package. Implicit namespace packages have no such file, so `path` points to the directory
+    of the namespace portion instead. For modules in a zip archive, `path` points into the archive,
+    as with `zipimport`: `app.pyz/my_app/__init__.py`.
+    """
+
+    name: str
+    path: Path
+    is_package: bool = False
+    is_namespace: bool = False
+
+    def load(self) -> ModuleType:
+        """Import the module described by the spec."""
+        return _import_module(self.name)
+
+    def read_source(self) -> bytes:
+        """Read the source code of the module, without importing it. Namespace packages have no source."""
+        if self.is_namespace or self.path.suffix not in _PYTHON_SOURCE_FILE_SUFFIXES:
+            return b""
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except OSError:
+            # NB: the archives are looked into only when there is no such file, see `_list_directory`
+            from .archives import read_file
+
+            return read_file(str(self.path))
+
+
+def find_module_spec(target: t.Union[str, ModuleType]) -> t.Tuple[ModuleSpec, t.Tuple[str, ...]]:
+    """
+    Finds the spec of a module without executing its code (nor the code of its parent packages).
+
+    Already imported modules are described on the basis of their attributes.
+
+    :param target: `builtins.module` object or Python qualified name of a module.
+    :return: the spec of the target and the directories to look for its submodules in (empty for
+        single-file modules).
+    """
+    if isinstance(target, ModuleType):
+        return _describe_module(target)
+    if ":" in target:
+        raise OwnImportError(f"Target '{target}' is not a valid module or package qualified name.")
+    if target in sys.modules:
+        return _describe_module(sys.modules[target])
+
+    parts = target.split(".")
+    # NB: top-level names are found with the whole import machinery (it doesn't execute any code),
+    # so that custom finders from `sys.meta_path` are honored
+    spec = find_spec(parts[0])
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{parts[0]}'", name=parts[0])
+    found = _describe_spec(parts[0], spec.origin, spec.submodule_search_locations)
+    for index in range(1, len(parts)):
+        name = ".".join(parts[: index + 1])
+        if name in sys.modules:
+            found = _describe_module(sys.modules[name])
+            continue
+        search_locations = found[1]
+        if not search_locations:
+            raise ModuleNotFoundError(f"No module named '{name}'; '{found[0].name}' is not a package", name=name)
+        found = _find_spec_in(name, search_locations)
+    return found
+
+
+def _describe_module(module: ModuleType) -> t.Tuple[ModuleSpec, t.Tuple[str, ...]]:
+    search_locations = getattr(module, "__path__", None)
+    return _describe_spec(module.__name__, getattr(module, "__file__", None), search_locations)
+
+
+def _describe_spec(
+    name: str, origin: t.Optional[str], search_locations: t.Optional[t.Iterable[str]]
+) -> t.Tuple[ModuleSpec, t.Tuple[str, ...]]:
+    if search_locations is None:
+        if origin is None or not os.path.isabs(origin):
+            # builtin or frozen modules have no location to look into
+            raise OwnImportError(f"Module '{name}' has no source location to look into.")
+        return ModuleSpec(name, Path(origin)), ()
+    # NB: Implicit packages' __path__ object - _NamespacePath class - has potential paths to codebase
+    # under `._path` attribute
+    locations = tuple(getattr(search_locations, "_path", search_locations))
+    if origin is None or origin == "namespace":
+        # case: PEP 420 – Implicit Namespace Packages
+        # https://peps.python.org/pep-0420/
+        if not locations:
+            raise OwnImportError(f"Namespace package '{name}' has no portions to look into.")
+        return ModuleSpec(name, Path(locations[0]), is_package=True, is_namespace=True), locations
+    return ModuleSpec(name, Path(origin), is_package=True), locations
+
+
+def _find_spec_in(name: str, search_locations: t.Iterable[str]) -> t.Tuple[ModuleSpec, t.Tuple[str, ...]]:
+    """Mimics `importlib.machinery.PathFinder` without relying on the parent package to be imported."""
+    namespace_portions: t.List[str] = []
+    for location in search_locations:
+        importer = pkgutil.get_importer(location)
+        spec = importer.find_spec(name) if importer is not None and hasattr(importer, "find_spec") else None
+        if spec is None:
+            continue
+        if spec.loader is not None:
+            return _describe_spec(name, spec.origin, spec.submodule_search_locations)
+        namespace_portions.extend(spec.submodule_search_locations or ())
+    if namespace_portions:
+        return _describe_spec(name, None, namespace_portions)
+    raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+
+def iterate_module_specs(
+    target: t.Union[str, ModuleType], recursive: bool = True, include_packages: bool = False
+) -> t.Generator[ModuleSpec, None, None]:
+    """
+    Iterates through specs of all modules of a given module, without importing any of them.
+
+    The counterpart of `iterate_modules`: yields the same modules, in the same order, but
+    described by `ModuleSpec` objects made out of the directory structure (with `os.scandir`)
+    instead of imported module objects. Use `ModuleSpec.load` to import only these modules
+    you actually need as live objects.
+
+    * Supports PEP 420 (Implicit Namespace Packages), same as `iterate_modules`.
+    * Walks the directory tree iteratively, so deep structures don't hit the recursion limit.
+    * Walks zip archives (zipapps, wheels, eggs) on `sys.path` too, reading their central directories,
+    without extracting them.
+    * NB: directories whose names aren't valid Python identifiers can't be namespace packages
+    and are skipped.
+
+    :param target: `builtins.module` object or Python qualified name of a module to look into.
+    :param recursive: looks into subpackages looking for modules (by default) or not.
+    :param include_packages: yield also the intermediate packages while looking for modules or not (by default)
+    """
+    spec, search_locations = find_module_spec(target)
+    yield from walk_module_specs(spec, search_locations, recursive, include_packages)
+
+
+DirectoryScanner = t.Callable[[str, Path, bool], t.List[ModuleSpec]]
+
+
+def walk_module_specs(
+    spec: ModuleSpec,
+    search_locations: t.Iterable[str],
+    recursive: bool = True,
+    include_packages: bool = False,
+    scanner: t.Optional[DirectoryScanner] = None,
+) -> t.Iterator[ModuleSpec]:
+    """
+    Iterates through specs of all modules of a module described by `find_module_spec`, see `iterate_module_specs`.
+
+    :param scanner: lists the specs found in a directory of a package, with the signature
+        of `scan_directory` (used by default); lets the caller reuse the listings of unchanged directories.
+    """
+    scan = scanner or scan_directory
+    if not spec.is_package:
+        yield spec
+        return
+
+    seen_namespaces: t.Set[str] = set()
+    stack = [iter(_scan_locations(spec.name, search_locations, recursive, scan))]
+    while stack:
+        subspec = next(stack[-1], None)
+        if subspec is None:
+            stack.pop()
+            continue
+        if not subspec.is_package:
+            yield subspec
+            continue
+        if subspec.is_namespace:
+            # a namespace package may consist of portions spread over multiple directories
+            if subspec.name in seen_namespaces:
+                if recursive:
+                    stack.append(iter(scan(subspec.name, subspec.path, recursive)))
+                continue
+            seen_namespaces.add(subspec.name)
+        if include_packages:
+            yield subspec
+        if recursive:
+            # we need to go deeper :)
+            directory = subspec.path if subspec.is_namespace else subspec.path.parent
+            stack.append(iter(scan(subspec.name, directory, recursive)))
+
+
+def _scan_locations(
+    package_name: str, locations: t.Iterable[str], include_namespaces: bool, scan: DirectoryScanner
+) -> t.Iterator[ModuleSpec]:
+    for location in locations:
+        yield from scan(package_name, Path(location), include_namespaces)
+
+
+@probes.instrumented("scan_directory", "importing")
+def scan_directory(package_name: str, directory: Path, include_namespaces: bool) -> t.List[ModuleSpec]:
+    """
+    Lists specs of the modules and packages found in the directory of a package.
+
+    Follows the order of `pkgutil.iter_modules`: modules & regular packages sorted by name,
+    and then, iff `include_namespaces` is on, the subdirectories being implicit namespace packages.
+    """
+    import inspect
+
+    entries = _list_directory(str(directory))
+    specs: t.List[ModuleSpec] = []
+    namespace_specs: t.List[ModuleSpec] = []
+    checked: t.Set[str] = set()
+    for entry in entries:
+        module_name = inspect.getmodulename(entry.name)
+        if module_name == _INIT_FILE_NAME or module_name in checked:
+            continue
+        if module_name is None:
+            if "." in entry.name or not entry.is_dir():
+                continue
+            init_file = _find_init_file(entry.path)
+            if init_file is not None:
+                checked.add(entry.name)
+                specs.append(ModuleSpec(f"{package_name}.{entry.name}", init_file, is_package=True))
+            elif include_namespaces and entry.name not in _IGNORED_DIRECTORY_NAMES and entry.name.isidentifier():
+                namespace_specs.append(
+                    ModuleSpec(f"{package_name}.{entry.name}", Path(entry.path), is_package=True, is_namespace=True)
+                )
+        elif "." not in module_name:
+            checked.add(module_name)
+            specs.append(ModuleSpec(f"{package_name}.{module_name}", Path(entry.path)))
+    # these has been identified as modules or packages earlier
+    specs.extend(spec for spec in namespace_specs if spec.name.rpartition(".")[2] not in checked)
+    probes.count("scanned_modules", len(specs))
+    return specs
+
+
+def _find_init_file(directory: str) -> t.Optional[Path]:
+    import inspect
+
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if inspect.getmodulename(entry.name) == _INIT_FILE_NAME:
+                    return Path(entry.path)
+    except OSError:
+        from .archives import list_archive_directory
+
+        for archive_entry in list_archive_directory(directory):
+            if inspect.getmodulename(archive_entry.name) == _INIT_FILE_NAME:
+                return Path(archive_entry.path)
+    return None
+
+
 def import_all_names(_file, _name):
     """
     Util for a tricky dynamic import of all names from all submodules.
@@ -0,0 +1,183 @@
+import atexit
+import json
+import os
+import threading
+import typing as t
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter_ns
+
+from . import probes
+from .probes import (  # noqa: F401
+    _NULL_SPAN,
+    DEFAULT_CATEGORY,
+    TRACE_ENVIRONMENT_VARIABLE,
+    _Span,
+)
+
+# the hooks of the internals, see `probes`, to be used along with the tracer
+span = probes.span
+count = probes.count
+instrumented = probes.instrumented
+
+
+class SpanStats(t.NamedTuple):
+    """Aggregated timings of the spans of the same name."""
+
+    name: str
+    calls: int
+    total_ns: int
+    max_ns: int
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.calls
+
+
+class _Event(t.NamedTuple):
+    name: str
+    category: str
+    start_ns: int
+    duration_ns: int
+    thread_id: int
+    args: t.Optional[t.Dict[str, t.Any]]
+
+
+class Tracer:
+    """
+    Collects timing spans & counters of the library internals, see `enable`.
+
+    Spans are kept as complete events and may be dumped as a Chrome trace-event JSON file (to be opened
+    with `chrome://tracing` or Perfetto) or aggregated into a flat summary.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: t.List[_Event] = []
+        self._counters: t.Counter[str] = Counter()
+        self._origin_ns = perf_counter_ns()
+
+    def span(self, name: str, category: str = DEFAULT_CATEGORY, **args: t.Any) -> _Span:
+        """Context manager timing its body as a span of the name."""
+        return _Span(self, name, category, args or None)
+
+    def add_span(
+        self,
+        name: str,
+        start_ns: int,
+        duration_ns: int,
+        category: str = DEFAULT_CATEGORY,
+        args: t.Optional[t.Dict[str, t.Any]] = None,
+    ) -> None:
+        """Records a span timed with `time.perf_counter_ns`."""
+        # NB: appending to a list is atomic, no need for the lock
+        self._events.append(_Event(name, category, start_ns, duration_ns, threading.get_ident(), args))
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    @property
+    def counters(self) -> t.Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def summary(self) -> t.List[SpanStats]:
+        """Statistics of the spans per name, the most time-consuming first."""
+        stats: t.Dict[str, t.List[int]] = {}
+        for event in list(self._events):
+            name_stats = stats.setdefault(event.name, [0, 0, 0])
+            name_stats[0] += 1
+            name_stats[1] += event.duration_ns
+            name_stats[2] = max(name_stats[2], event.duration_ns)
+        return sorted(
+            (SpanStats(name, *name_stats) for name, name_stats in stats.items()),
+            key=lambda span_stats: span_stats.total_ns,
+            reverse=True,
+        )
+
+    def format_summary(self) -> str:
+        """The summary & the counters as a plain text table."""
+        lines = [f"{'span':<48} {'calls':>8} {'total ms':>10} {'mean µs':>10} {'max µs':>10}"]
+        for stats in self.summary():
+            lines.append(
+                f"{stats.name:<48} {stats.calls:>8} {stats.total_ns / 1e6:>10.3f} "
+                f"{stats.mean_ns / 1e3:>10.1f} {stats.max_ns / 1e3:>10.1f}"
+            )
+        counters = self.counters
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':<48} {'value':>8}")
+            lines.extend(f"{name:<48} {value:>8}" for name, value in sorted(counters.items()))
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> t.Dict[str, t.Any]:
+        """The spans & the counters in the Chrome trace-event format."""
+        pid = os.getpid()
+        trace_events: t.List[t.Dict[str, t.Any]] = []
+        end_us = 0.0
+        for event in list(self._events):
+            start_us = (event.start_ns - self._origin_ns) / 1e3
+            trace_event = {
+                "name": event.name,
+                "cat": event.category,
+                "ph": "X",
+                "ts": start_us,
+                "dur": event.duration_ns / 1e3,
+                "pid": pid,
+                "tid": event.thread_id,
+            }
+            if event.args:
+                trace_event["args"] = {key: str(value) for key, value in event.args.items()}
+            trace_events.append(trace_event)
+            end_us = max(end_us, start_us + event.duration_ns / 1e3)
+        for name, value in sorted(self.counters.items()):
+            trace_events.append({"name": name, "ph": "C", "ts": end_us, "pid": pid, "args": {"value": value}})
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: t.Union[str, Path]) -> None:
+        Path(path).write_text(json.dumps(self.to_chrome_trace()))
+
+
+def enable(tracer: t.Optional[Tracer] = None) -> Tracer:
+    """
+    Turns the instrumentation on, collecting into the given tracer or a new one.
+
+    The instrumentation may also be turned on with the `PCA_ARCHUNIT_TRACE` environment variable, set to
+    a path of the Chrome trace file to be written when the interpreter exits.
+    """
+    probes._tracer = tracer or Tracer()
+    return probes._tracer
+
+
+def disable() -> t.Optional[Tracer]:
+    """Turns the instrumentation off, returning the tracer with the collected data, if any."""
+    tracer, probes._tracer = probes._tracer, None
+    return tracer
+
+
+def get_tracer() -> t.Optional[Tracer]:
+    return probes._tracer
+
+
+@contextmanager
+def tracing(tracer: t.Optional[Tracer] = None) -> t.Iterator[Tracer]:
+    """Turns the instrumentation on for the duration of the block, restoring the previous state afterwards."""
+    previous = probes._tracer
+    current = enable(tracer)
+    try:
+        yield current
+    finally:
+        probes._tracer = previous
+
+
+def _write_trace_at_exit(path: str) -> None:
+    tracer = get_tracer()
+    if tracer is not None:
+        tracer.write_chrome_trace(path)
+
+
+if os.environ.get(TRACE_ENVIRONMENT_VARIABLE):
+    enable()
+    atexit.register(_write_trace_at_exit, os.environ[TRACE_ENVIRONMENT_VARIABLE])
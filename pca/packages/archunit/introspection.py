@@ -1,4 +1,8 @@
+import sys
+import threading
 import typing as t
+from types import ModuleType
+from weakref import WeakValueDictionary
 
 
 def _subclasses_recursive_search(cls) -> t.Generator[t.Type, None, None]:
@@ -12,3 +16,106 @@ def get_all_subclasses(cls) -> t.Tuple[t.Type, ...]:
     Returns a set of all (direct or indirect) subclasses of the `cls` class.
     """
     return tuple(_subclasses_recursive_search(cls))
+
+
+class SubclassesIndex:
+    """
+    Cache of `get_all_subclasses` results for a class hierarchy.
+
+    It has to be invalidated whenever a new class joins the hierarchy, i.e. from `__init_subclass__`
+    of the root class. The `version` changes with each invalidation, so that derived caches may tell
+    whether they are up to date.
+    """
+
+    def __init__(self) -> None:
+        self._subclasses: t.Dict[t.Type, t.Tuple[t.Type, ...]] = {}
+        self.version = 0
+
+    def get_all_subclasses(self, cls) -> t.Tuple[t.Type, ...]:
+        """Same as `get_all_subclasses` function, but computed once per class."""
+        try:
+            return self._subclasses[cls]
+        except KeyError:
+            subclasses = self._subclasses[cls] = get_all_subclasses(cls)
+            return subclasses
+
+    def invalidate(self) -> None:
+        self._subclasses.clear()
+        self.version += 1
+
+
+class TargetReference:
+    """
+    Target of ArchUnits given by its qualified name, when the object itself isn't at hand.
+
+    E.g. the units found in another process (see `sandbox.ImportWorkerPool`) or found statically, without
+    importing the code. References are interned: `TargetReference("a.b", "C") is TargetReference("a.b", "C")`,
+    so they work with registers, which look the units up by the identity of their targets.
+
+    :param module: qualified name of the module (of the target being a module itself or containing it).
+    :param qualname: qualified name of the target within the module; `None` for the module itself.
+    """
+
+    __slots__ = ("module", "qualname", "__weakref__")
+
+    module: str
+    qualname: t.Optional[str]
+
+    _instances: "WeakValueDictionary[t.Tuple[str, t.Optional[str]], TargetReference]" = WeakValueDictionary()
+    _lock = threading.Lock()
+
+    def __new__(cls, module: str, qualname: t.Optional[str] = None) -> "TargetReference":
+        key = (module, qualname)
+        with cls._lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = super().__new__(cls)
+                object.__setattr__(instance, "module", module)
+                object.__setattr__(instance, "qualname", qualname)
+                cls._instances[key] = instance
+        return instance
+
+    def __setattr__(self, name: str, value: t.Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self) -> t.Tuple[t.Any, ...]:
+        return TargetReference, (self.module, self.qualname)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.module!r}, {self.qualname!r})"
+
+    def __str__(self) -> str:
+        return self.module if self.qualname is None else f"{self.module}:{self.qualname}"
+
+    def resolve(self) -> t.Any:
+        """Imports the referenced object."""
+        from .importing import import_dotted_name
+
+        return import_dotted_name(str(self))
+
+
+def reference_of(target: t.Any, module: t.Optional[ModuleType] = None) -> TargetReference:
+    """
+    Gives a reference to the target: a module, an object with a qualified name (like a class or a function)
+    or, when the `module` is given, an object being a global of the module (like an app object).
+
+    Raises TypeError if the target can't be referenced.
+    """
+    if isinstance(target, TargetReference):
+        return target
+    if isinstance(target, ModuleType):
+        return TargetReference(target.__name__)
+    module_name = getattr(target, "__module__", None)
+    qualname = getattr(target, "__qualname__", None)
+    if isinstance(module_name, str) and isinstance(qualname, str) and "<locals>" not in qualname:
+        # NB: instances have the `__module__` of their classes, so the name has to lead to the target itself
+        owner: t.Any = sys.modules.get(module_name)
+        for name in qualname.split("."):
+            owner = getattr(owner, name, None)
+        if owner is target:
+            return TargetReference(module_name, qualname)
+    if module is not None:
+        for name, value in vars(module).items():
+            if value is target:
+                return TargetReference(module.__name__, name)
+    raise TypeError(f"{target!r} can't be referenced by a qualified name")
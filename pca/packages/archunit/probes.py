@@ -0,0 +1,120 @@
+"""
+Hooks of the instrumentation placed in the library internals, cheap enough for the modules imported
+with the package: they do nothing until the instrumentation is turned on, see `instrumentation`.
+
+The tracer collecting the spans & the counters lives in `instrumentation`, which is imported only once
+the instrumentation is turned on (or the `PCA_ARCHUNIT_TRACE` environment variable is set).
+"""
+
+import functools
+import os
+import typing as t
+from time import perf_counter_ns
+from types import GeneratorType
+
+if t.TYPE_CHECKING:
+    from .instrumentation import Tracer
+
+TRACE_ENVIRONMENT_VARIABLE = "PCA_ARCHUNIT_TRACE"
+DEFAULT_CATEGORY = "archunit"
+
+F = t.TypeVar("F", bound=t.Callable[..., t.Any])
+
+# set by `instrumentation.enable` & `instrumentation.disable`
+_tracer: t.Optional["Tracer"] = None
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: t.Optional[t.Dict[str, t.Any]]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start_ns = 0
+
+    def __enter__(self) -> "_Span":
+        self.start_ns = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.tracer.add_span(self.name, self.start_ns, perf_counter_ns() - self.start_ns, self.category, self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, category: str = DEFAULT_CATEGORY, **args: t.Any) -> t.ContextManager[t.Any]:
+    """Context manager timing its body, if the instrumentation is on; does nothing otherwise."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, category, args or None)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increments the counter, if the instrumentation is on."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def instrumented(name: t.Optional[str] = None, category: str = DEFAULT_CATEGORY) -> t.Callable[[F], F]:
+    """
+    Decorator timing each call of the function as a span, if the instrumentation is on.
+
+    A call of a disabled instrumented function costs a check of a global and an extra call.
+    A span of a generator function lasts from the first resumption of the generator until it's exhausted
+    or closed, so it includes the time spent by its consumer in between.
+    """
+
+    def decorator(function: F) -> F:
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args: t.Any, **kwargs: t.Any) -> t.Any:
+            tracer = _tracer
+            if tracer is None:
+                return function(*args, **kwargs)
+            start_ns = perf_counter_ns()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                tracer.add_span(span_name, start_ns, perf_counter_ns() - start_ns, category)
+                raise
+            # NB: told by the result rather than with `inspect`, which is too costly to import here
+            if type(result) is GeneratorType:
+                return _timed_generator(tracer, span_name, category, result)
+            tracer.add_span(span_name, start_ns, perf_counter_ns() - start_ns, category)
+            return result
+
+        return t.cast(F, wrapper)
+
+    return decorator
+
+
+def _timed_generator(
+    tracer: "Tracer", name: str, category: str, generator: t.Generator[t.Any, t.Any, t.Any]
+) -> t.Generator[t.Any, t.Any, t.Any]:
+    # NB: `yield from` passes `send`, `throw` & `close` through, so a generator closed early ends its span at once
+    start_ns = perf_counter_ns()
+    try:
+        return (yield from generator)
+    finally:
+        tracer.add_span(name, start_ns, perf_counter_ns() - start_ns, category)
+
+
+if os.environ.get(TRACE_ENVIRONMENT_VARIABLE):
+    # NB: turns the instrumentation on, see `instrumentation.enable`
+    from . import instrumentation  # noqa: F401
@@ -0,0 +1,306 @@
+"""
+Profiling of the imports: the time each module takes to import and the memory it allocates, as ArchUnits.
+
+    costs = profile_imports("app")
+    print(format_import_costs(costs, limit=20))
+
+Budgets of the imports are checked as architecture rules, e.g. `ImportBudget("app.domain", max_ms=5)`.
+"""
+
+import multiprocessing
+import sys
+import threading
+import time
+import tracemalloc
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from importlib.machinery import ModuleSpec as ImportSpec
+from types import ModuleType
+from weakref import WeakKeyDictionary
+
+from .graph import DependencyGraph
+from .importing import (
+    find_module_spec,
+    iterate_module_specs,
+)
+from .introspection import TargetReference
+from .register import ArchUnitRegister
+from .rules import (
+    ModuleSelector,
+    Rule,
+    Violation,
+)
+from .units.profiling import ImportCost
+
+if t.TYPE_CHECKING:
+    from .query import QueryableRegister
+
+# fields of ImportCost the reports may be sorted by
+SORT_FIELDS = ("cumulative_ns", "self_ns", "cumulative_bytes", "self_bytes")
+
+
+class ModuleCost(t.NamedTuple):
+    """Cost of importing a module, see `units.profiling.ImportCost`; sent between processes."""
+
+    module: str
+    self_ns: int
+    cumulative_ns: int
+    self_bytes: int
+    cumulative_bytes: int
+
+
+class ImportProfiler:
+    """
+    Measures the imports of all the modules executed while it is active:
+
+        with ImportProfiler() as profiler:
+            import app
+        profiler.costs
+
+    Loaders found by the other finders of `sys.meta_path` are wrapped, so that the execution of each module
+    is timed (and its allocations traced, if `trace_memory`), and the costs of the modules it imports
+    are subtracted from its own one. Modules imported before aren't imported, hence measured, again.
+    NB: tracing the memory slows the imports down, so their times are comparable only with each other.
+    """
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        self.trace_memory = trace_memory
+        # in the order of the imports being finished, so the imported modules come before their importers
+        self.costs: t.List[ModuleCost] = []
+        self._finder = _ProfilingFinder(self)
+        self._frames = threading.local()
+        self._started_tracing = False
+
+    def __enter__(self) -> "ImportProfiler":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        sys.meta_path.insert(0, self._finder)
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        sys.meta_path.remove(self._finder)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _measure(self, name: str, execute: t.Callable[[], None]) -> None:
+        frames: t.List[t.List[int]] = self._frames.__dict__.setdefault("stack", [])
+        # the time & memory at the start, and these taken by the imports of other modules
+        frame = [time.perf_counter_ns(), self._get_traced_memory(), 0, 0]
+        frames.append(frame)
+        imported = False
+        try:
+            execute()
+            imported = True
+        finally:
+            frames.pop()
+            elapsed_ns = time.perf_counter_ns() - frame[0]
+            allocated = self._get_traced_memory() - frame[1]
+            # NB: a failed import costs the importing module all the same, but it's no module of its own
+            if frames:
+                frames[-1][2] += elapsed_ns
+                frames[-1][3] += allocated
+            if imported:
+                self.costs.append(ModuleCost(name, elapsed_ns - frame[2], elapsed_ns, allocated - frame[3], allocated))
+
+    def _get_traced_memory(self) -> int:
+        return tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+
+
+class _ProfilingFinder:
+    def __init__(self, profiler: ImportProfiler) -> None:
+        self.profiler = profiler
+
+    def find_spec(self, fullname: str, path: t.Any = None, target: t.Any = None) -> t.Optional[ImportSpec]:
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _ProfilingLoader(spec.loader, self.profiler)
+        return spec
+
+
+class _ProfilingLoader:
+    def __init__(self, loader: t.Any, profiler: ImportProfiler) -> None:
+        self.loader = loader
+        self.profiler = profiler
+
+    def __getattr__(self, name: str) -> t.Any:
+        return getattr(self.loader, name)
+
+    def create_module(self, spec: ImportSpec) -> t.Optional[ModuleType]:
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: ModuleType) -> None:
+        # NB: the module gets its own loader back before its code runs, so that the wrapper never leaks
+        spec = getattr(module, "__spec__", None)
+        if spec is not None and spec.loader is self:
+            spec.loader = self.loader
+        if getattr(module, "__loader__", None) is self:
+            module.__loader__ = self.loader
+        self.profiler._measure(module.__name__, lambda: self.loader.exec_module(module))
+
+
+def profile_modules(names: t.Iterable[str], trace_memory: bool = True) -> t.List[ModuleCost]:
+    """
+    Imports the modules one by one, measuring them and all the modules they import for the first time.
+
+    Modules failing to import, with any exception, are skipped; their costs count towards the modules
+    importing them, if any.
+    """
+    with ImportProfiler(trace_memory) as profiler:
+        for name in names:
+            try:
+                import_module(name)
+            except Exception:
+                continue
+    return profiler.costs
+
+
+def profile_imports(
+    where: t.Union[str, ModuleType],
+    recursive: bool = True,
+    trace_memory: bool = True,
+    isolated: bool = False,
+) -> t.List[ImportCost]:
+    """
+    Imports the package and all its modules, measuring them and all the modules they import for the first time
+    (e.g. these of the third-party libraries).
+
+    The modules imported before aren't measured, so for the costs of a cold start use `isolated`: the modules
+    are imported in a fresh process then. Units target the modules, or `TargetReference`s to the modules
+    imported in another process.
+
+    :param trace_memory: traces the memory allocated by the imports with `tracemalloc`, slowing them down.
+    """
+    root, _ = find_module_spec(where)
+    names = [spec.name for spec in iterate_module_specs(where, recursive, include_packages=True)]
+    if root.is_package:
+        names.insert(0, root.name)
+    if isolated:
+        return [
+            ImportCost(TargetReference(cost.module), *cost[1:]) for cost in _profile_in_process(names, trace_memory)
+        ]
+    return [
+        ImportCost(sys.modules.get(cost.module) or TargetReference(cost.module), *cost[1:])
+        for cost in profile_modules(names, trace_memory)
+    ]
+
+
+def _profile_in_process(names: t.List[str], trace_memory: bool) -> t.List[ModuleCost]:
+    # NB: spawned, so that nothing is imported in the process beforehand
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(profile_modules, names, trace_memory).result()
+
+
+def register_import_costs(
+    register: ArchUnitRegister,
+    where: t.Union[str, ModuleType],
+    trace_memory: bool = True,
+    isolated: bool = False,
+) -> t.List[ImportCost]:
+    """Registers the units made by `profile_imports`; returns them."""
+    units = profile_imports(where, trace_memory=trace_memory, isolated=isolated)
+    register.register_multiple(units)
+    return units
+
+
+def format_import_costs(
+    costs: t.Iterable[ImportCost], sort_by: str = "cumulative_ns", limit: t.Optional[int] = None
+) -> str:
+    """A table of the costs, ranked from the most expensive one by the field."""
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"can't sort by {sort_by!r}, only by one of: {', '.join(SORT_FIELDS)}")
+    ranked = sorted(costs, key=lambda cost: getattr(cost, sort_by), reverse=True)[:limit]
+    lines = [f"{'#':>4} {'cumulative ms':>14} {'self ms':>10} {'cumulative KiB':>15} {'self KiB':>10}  module"]
+    for rank, cost in enumerate(ranked, 1):
+        lines.append(
+            f"{rank:>4} {cost.cumulative_ns / 1e6:>14.2f} {cost.self_ns / 1e6:>10.2f} "
+            f"{cost.cumulative_bytes / 1024:>15.1f} {cost.self_bytes / 1024:>10.1f}  {_get_module_name(cost.target)}"
+        )
+    return "\n".join(lines)
+
+
+def _get_module_name(target: t.Any) -> str:
+    return target.__name__ if isinstance(target, ModuleType) else str(target)
+
+
+class ImportBudget(Rule):
+    """
+    Modules selected by the patterns (all modules of the analyzed codebase, by default) must import
+    in under `max_ms` milliseconds and/or allocating at most `max_bytes` bytes.
+
+    The costs are cumulative, i.e. they include the modules imported for the first time, unless
+    `cumulative` is off. They are taken from the ImportCost units of the `register` or, when there is
+    none, measured once per dependency graph: all its modules are imported in a fresh process, in the order
+    of the graph.
+    """
+
+    def __init__(
+        self,
+        *patterns: str,
+        max_ms: t.Optional[float] = None,
+        max_bytes: t.Optional[int] = None,
+        cumulative: bool = True,
+        register: t.Optional["QueryableRegister"] = None,
+    ) -> None:
+        if max_ms is None and max_bytes is None:
+            raise ValueError("an import budget needs `max_ms` or `max_bytes`")
+        self.modules = ModuleSelector(patterns) if patterns else None
+        self.max_ms = max_ms
+        self.max_bytes = max_bytes
+        self.cumulative = cumulative
+        self.register = register
+
+    def __str__(self) -> str:
+        limits = []
+        if self.max_ms is not None:
+            limits.append(f"in under {self.max_ms:g} ms")
+        if self.max_bytes is not None:
+            limits.append(f"allocating at most {self.max_bytes} bytes")
+        modules = f"modules of {self.modules}" if self.modules else "modules"
+        return f"{modules} must import {' and '.join(limits)}"
+
+    def selects(self, name: str) -> bool:
+        return self.modules is None or self.modules.matches(name)
+
+    def check(self, graph: DependencyGraph) -> t.Iterator[Violation]:
+        for name, cost in self._get_costs(graph).items():
+            if not self.selects(name) or (self.register is None and not graph.is_internal(name)):
+                continue
+            elapsed_ns, allocated = (
+                (cost.cumulative_ns, cost.cumulative_bytes) if self.cumulative else (cost.self_ns, cost.self_bytes)
+            )
+            exceeded = []
+            if self.max_ms is not None and elapsed_ns > self.max_ms * 1e6:
+                exceeded.append(f"{elapsed_ns / 1e6:.2f} ms")
+            if self.max_bytes is not None and allocated > self.max_bytes:
+                exceeded.append(f"{allocated} bytes")
+            if exceeded:
+                yield Violation(f"{self} ({', '.join(exceeded)})", (name,))
+
+    def _get_costs(self, graph: DependencyGraph) -> t.Mapping[str, t.Union[ImportCost, ModuleCost]]:
+        if self.register is not None:
+            return {
+                _get_module_name(unit.target): unit
+                for unit in self.register.get_all_of_type(ImportCost)
+                if isinstance(unit, ImportCost)
+            }
+        trace_memory = self.max_bytes is not None
+        per_tracing = _graph_costs.setdefault(graph, {})
+        if trace_memory not in per_tracing:
+            costs = _profile_in_process(list(graph.modules), trace_memory)
+            per_tracing[trace_memory] = {cost.module: cost for cost in costs}
+        return per_tracing[trace_memory]
+
+
+_graph_costs: "WeakKeyDictionary[DependencyGraph, t.Dict[bool, t.Dict[str, ModuleCost]]]" = WeakKeyDictionary()
@@ -0,0 +1,213 @@
+"""
+Pytest plugin checking the architecture rules as test items.
+
+Configure the analyzed package and the rules in the ini file of pytest:
+
+    [pytest]
+    archunit_target = my_app
+    archunit_rules =
+        my_app.architecture
+    archunit_cache_dir = .archunit_cache
+
+Each rule is collected as a test item of its own, named after the rule, e.g. `archunit::my_app.architecture::layers`.
+The package is analyzed once per session (lazily, by the first rule checked), and the analysis is shared
+by all the rule items and the `archunit_graph` & `archunit_register` fixtures. Node ids are deterministic,
+so pytest-xdist spreads the rules over its workers like any other tests; each worker analyzes the package
+at most once, and with `archunit_cache_dir` the workers share the parsing results through the cache.
+
+Rules are collected when the run has no explicit test paths (`--archunit` forces them, `--no-archunit` skips them).
+The plugin is registered with the `pytest11` entry point, or can be enabled with `-p pca.packages.archunit.pytest_plugin`.
+"""
+
+import sys
+import typing as t
+
+import pytest
+
+if t.TYPE_CHECKING:
+    from .graph import DependencyGraph
+    from .register import FrozenArchUnitRegister
+    from .rules import (
+        Rule,
+        Violation,
+    )
+
+
+class Analysis(t.NamedTuple):
+    """The dependency graph of the analyzed package and the frozen register of its units."""
+
+    graph: "DependencyGraph"
+    register: "FrozenArchUnitRegister"
+
+
+_ANALYSIS_KEY = pytest.StashKey[Analysis]()
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("archunit", "architecture rules")
+    group.addoption(
+        "--archunit",
+        action="store_true",
+        default=False,
+        help="collect the architecture rules, even if test paths are given",
+    )
+    group.addoption(
+        "--no-archunit",
+        action="store_true",
+        default=False,
+        help="don't collect the architecture rules",
+    )
+    parser.addini("archunit_target", "qualified name of the package analyzed by the architecture rules")
+    parser.addini(
+        "archunit_rules", "qualified names of the architecture rules, see `rules.load_rules`", type="linelist"
+    )
+    parser.addini("archunit_cache_dir", "directory of the cache of the parsing results, shared by the sessions")
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "archunit: an architecture rule, checked against the analyzed package")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(session: pytest.Session, config: pytest.Config, items: t.List[pytest.Item]) -> None:
+    if not _collects_rules(config):
+        return
+    for rules_name in config.getini("archunit_rules"):
+        collector = ArchUnitRules.from_parent(session, name=rules_name, nodeid=f"archunit::{rules_name}")
+        items.extend(collector.collect())
+
+
+def _collects_rules(config: pytest.Config) -> bool:
+    if config.getoption("no_archunit") or not config.getini("archunit_rules"):
+        return False
+    if config.getoption("archunit"):
+        return True
+    # NB: `args_source` is there since pytest 7.2; rules are collected whenever it's unknown
+    args_source = getattr(config, "args_source", None)
+    return args_source is None or args_source != pytest.Config.ArgsSource.ARGS
+
+
+def get_analysis(config: pytest.Config) -> Analysis:
+    """
+    The analysis of the `archunit_target` package, made on the first call in the session (or in the xdist worker).
+
+    Raises `pytest.UsageError` if there is no target configured or it can't be found.
+    """
+    analysis = config.stash.get(_ANALYSIS_KEY, None)
+    if analysis is None:
+        target = config.getini("archunit_target")
+        if not target:
+            raise pytest.UsageError("archunit_target is not configured")
+        # NB: xdist workers are processes already, they parse the modules by themselves
+        jobs = 1 if hasattr(config, "workerinput") else None
+        try:
+            analysis = analyze_target(target, jobs=jobs, cache_dir=config.getini("archunit_cache_dir") or None)
+        except ImportError as e:
+            raise pytest.UsageError(f"archunit_target: {e}")
+        config.stash[_ANALYSIS_KEY] = analysis
+    return analysis
+
+
+def analyze_target(target: str, jobs: t.Optional[int] = None, cache_dir: t.Optional[str] = None) -> Analysis:
+    """Builds the dependency graph of the package and registers the units of its modules."""
+    from .cache import ScanCache
+    from .graph import build_dependency_graph
+    from .register import ArchUnitRegister
+
+    if cache_dir is None:
+        graph = build_dependency_graph(target, jobs=jobs)
+    else:
+        with ScanCache(cache_dir) as cache:
+            graph = build_dependency_graph(target, jobs=jobs, cache=cache)
+    register = ArchUnitRegister()
+    register.autodiscover(target)
+    return Analysis(graph, register.freeze())
+
+
+@pytest.fixture(scope="session")
+def archunit_analysis(pytestconfig: pytest.Config) -> Analysis:
+    """The analysis of the `archunit_target` package, shared by the whole session."""
+    return get_analysis(pytestconfig)
+
+
+@pytest.fixture(scope="session")
+def archunit_graph(archunit_analysis: Analysis) -> "DependencyGraph":
+    """The dependency graph of the `archunit_target` package, shared by the whole session."""
+    return archunit_analysis.graph
+
+
+@pytest.fixture(scope="session")
+def archunit_register(archunit_analysis: Analysis) -> "FrozenArchUnitRegister":
+    """The frozen register of the units of the `archunit_target` package, shared by the whole session."""
+    return archunit_analysis.register
+
+
+class RuleViolationError(AssertionError):
+    def __init__(self, rule: "Rule", violations: t.List["Violation"]) -> None:
+        super().__init__(f"{rule}: {len(violations)} violation(s)")
+        self.rule = rule
+        self.violations = violations
+
+
+class ArchUnitRules(pytest.Collector):
+    """The rules designated by a qualified name, see `rules.load_rules`."""
+
+    def collect(self) -> t.List["ArchUnitRuleItem"]:
+        from .rules import load_rules
+
+        try:
+            rules = load_rules(self.name)
+        except (ImportError, TypeError) as e:
+            raise pytest.UsageError(f"archunit_rules: {e}")
+        return [
+            ArchUnitRuleItem.from_parent(self, name=name, rule=rule)
+            for name, rule in zip(_name_rules(self.name, rules), rules)
+        ]
+
+
+def _name_rules(rules_name: str, rules: t.List["Rule"]) -> t.List[str]:
+    """
+    Names of the rules unique within the collector: their names in the module, if they have any.
+
+    Names have to be the same in all the processes of a session, so they don't depend on the order of imports
+    or on the ids of the objects.
+    """
+    module = sys.modules.get(rules_name)
+    names_by_id: t.Dict[int, str] = {}
+    if module is not None:
+        for attribute_name, value in vars(module).items():
+            names_by_id.setdefault(id(value), attribute_name)
+    names: t.List[str] = []
+    taken: t.Set[str] = set()
+    for index, rule in enumerate(rules):
+        name = names_by_id.get(id(rule), f"rule{index}")
+        if name in taken:
+            name = f"{name}{index}"
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+class ArchUnitRuleItem(pytest.Item):
+    """A rule checked against the analysis of the session; fails with the list of its violations."""
+
+    def __init__(self, *, rule: "Rule", **kwargs: t.Any) -> None:
+        super().__init__(**kwargs)
+        self.rule = rule
+        self.add_marker("archunit")
+
+    def runtest(self) -> None:
+        graph = get_analysis(self.config).graph
+        violations = list(self.rule.check(graph))
+        if violations:
+            raise RuleViolationError(self.rule, violations)
+
+    def repr_failure(self, excinfo: pytest.ExceptionInfo[BaseException], style: t.Any = None) -> t.Any:
+        if isinstance(excinfo.value, RuleViolationError):
+            return "\n".join([str(excinfo.value), *(f"    {violation}" for violation in excinfo.value.violations)])
+        if isinstance(excinfo.value, pytest.UsageError):
+            return str(excinfo.value)
+        return super().repr_failure(excinfo, style)
+
+    def reportinfo(self) -> t.Tuple[t.Any, t.Optional[int], str]:
+        return self.path, None, f"archunit: {self.rule}"
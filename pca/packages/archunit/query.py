@@ -0,0 +1,469 @@
+"""
+Fluent queries of the units of a register, executed with the indexes of the register.
+
+    routes = Query(register).of_type(Route).in_modules("app.views").carrying(Tag, value="public")
+    for route in routes:
+        ...
+    print(routes.explain())
+
+A query is compiled into a plan: the conditions backed by an index of the register (the type of the units,
+their targets, the units carried by their targets) are ordered by the estimated number of their units,
+and the most selective one gives the candidates. The others narrow the candidates down, either
+by an intersection with the targets they select or, when that would cost more than the candidates
+themselves, by a lookup per candidate. Conditions without an index are checked last.
+
+Plans depend only on the conditions and on the sizes of the indexes, so they are cached per register,
+see `plan_cache_info`.
+"""
+
+import threading
+import typing as t
+import weakref
+from collections import OrderedDict
+from types import ModuleType
+
+from .introspection import TargetReference
+from .rules import ModuleSelector
+from .units.base import ArchUnit
+
+
+class QueryableRegister(t.Protocol):
+    """The part of the registers (mutable, frozen or snapshots) the queries use."""
+
+    def __len__(self) -> int: ...
+
+    def get_all_of_type(self, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]: ...
+
+    def get_all_of_type_for_target(self, target: t.Any, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]: ...
+
+    def count_all_of_type(self, unit_type: t.Type[ArchUnit]) -> int: ...
+
+    def count_all_for_target(self, target: t.Any) -> int: ...
+
+
+_MISSING = object()
+
+
+class Condition:
+    """A condition of a query, see the methods of `Query`."""
+
+    # whether the condition is backed by an index of the register, so it may give the candidates
+    indexed: t.ClassVar[bool] = False
+    # whether the condition selects the units by their targets, so it may intersect the candidates
+    selects_targets: t.ClassVar[bool] = False
+
+    def __str__(self) -> str:
+        raise NotImplementedError
+
+    def key(self) -> t.Hashable:
+        """The identity of the condition for the cache of the plans."""
+        raise NotImplementedError
+
+    def estimate(self, register: QueryableRegister, unit_type: t.Type[ArchUnit]) -> int:
+        """Upper bound of the number of the candidates the condition gives, taken from the indexes."""
+        raise NotImplementedError
+
+    def scan(self, register: QueryableRegister, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        """The units of the type meeting the condition, found with the indexes."""
+        raise NotImplementedError
+
+    def select_targets(self, register: QueryableRegister) -> t.Set[int]:
+        """Identities of the targets whose units meet the condition."""
+        raise NotImplementedError
+
+    def selection_cost(self, register: QueryableRegister) -> int:
+        """Number of the items `select_targets` goes through."""
+        raise NotImplementedError
+
+    def matches(self, register: QueryableRegister, unit: ArchUnit) -> bool:
+        raise NotImplementedError
+
+
+class OfType(Condition):
+    indexed = True
+
+    def __init__(self, unit_type: t.Type[ArchUnit]) -> None:
+        self.unit_type = unit_type
+
+    def __str__(self) -> str:
+        return f"units of {self.unit_type.__qualname__}"
+
+    def key(self) -> t.Hashable:
+        return (OfType, self.unit_type)
+
+    def estimate(self, register: QueryableRegister, unit_type: t.Type[ArchUnit]) -> int:
+        return register.count_all_of_type(unit_type)
+
+    def scan(self, register: QueryableRegister, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        return register.get_all_of_type(unit_type)
+
+    def matches(self, register: QueryableRegister, unit: ArchUnit) -> bool:
+        return isinstance(unit, self.unit_type)
+
+
+class ForTargets(Condition):
+    indexed = True
+    selects_targets = True
+
+    def __init__(self, targets: t.Iterable[t.Any]) -> None:
+        # NB: the targets are told apart by their identity, as the registers do
+        self.targets = tuple({id(target): target for target in targets}.values())
+
+    def __str__(self) -> str:
+        return f"targets: {', '.join(map(_describe_target, self.targets))}"
+
+    def key(self) -> t.Hashable:
+        return (ForTargets, tuple(map(id, self.targets)))
+
+    def estimate(self, register: QueryableRegister, unit_type: t.Type[ArchUnit]) -> int:
+        return sum(register.count_all_for_target(target) for target in self.targets)
+
+    def scan(self, register: QueryableRegister, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        for target in self.targets:
+            yield from register.get_all_of_type_for_target(target, unit_type)
+
+    def select_targets(self, register: QueryableRegister) -> t.Set[int]:
+        return set(map(id, self.targets))
+
+    def selection_cost(self, register: QueryableRegister) -> int:
+        return len(self.targets)
+
+    def matches(self, register: QueryableRegister, unit: ArchUnit) -> bool:
+        return any(unit.target is target for target in self.targets)
+
+
+class Carrying(Condition):
+    indexed = True
+    selects_targets = True
+
+    def __init__(self, unit_type: t.Type[ArchUnit], fields: t.Dict[str, t.Any]) -> None:
+        self.unit_type = unit_type
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return f"targets carrying {self.unit_type.__qualname__}({_describe_fields(self.fields)})"
+
+    def key(self) -> t.Hashable:
+        return (Carrying, self.unit_type, tuple(sorted(self.fields.items())))
+
+    def estimate(self, register: QueryableRegister, unit_type: t.Type[ArchUnit]) -> int:
+        # NB: the number of the carried units bounds the number of the targets, not of their units;
+        # it is the cost of finding the targets as well
+        return register.count_all_of_type(self.unit_type)
+
+    def scan(self, register: QueryableRegister, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        seen = set()
+        for carried in register.get_all_of_type(self.unit_type):
+            if id(carried.target) not in seen and _has_fields(carried, self.fields):
+                seen.add(id(carried.target))
+                yield from register.get_all_of_type_for_target(carried.target, unit_type)
+
+    def select_targets(self, register: QueryableRegister) -> t.Set[int]:
+        return {
+            id(carried.target)
+            for carried in register.get_all_of_type(self.unit_type)
+            if _has_fields(carried, self.fields)
+        }
+
+    def selection_cost(self, register: QueryableRegister) -> int:
+        return register.count_all_of_type(self.unit_type)
+
+    def matches(self, register: QueryableRegister, unit: ArchUnit) -> bool:
+        return any(
+            _has_fields(carried, self.fields)
+            for carried in register.get_all_of_type_for_target(unit.target, self.unit_type)
+        )
+
+
+class InModules(Condition):
+    def __init__(self, patterns: t.Iterable[str]) -> None:
+        self.modules = ModuleSelector(patterns)
+
+    def __str__(self) -> str:
+        return f"targets in modules: {self.modules}"
+
+    def key(self) -> t.Hashable:
+        return (InModules, self.modules.patterns)
+
+    def matches(self, register: QueryableRegister, unit: ArchUnit) -> bool:
+        module = _get_module_name(unit.target)
+        return module is not None and self.modules.matches(module)
+
+
+class Where(Condition):
+    def __init__(self, fields: t.Dict[str, t.Any]) -> None:
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return f"fields: {_describe_fields(self.fields)}"
+
+    def key(self) -> t.Hashable:
+        return (Where, tuple(sorted(self.fields.items())))
+
+    def matches(self, register: QueryableRegister, unit: ArchUnit) -> bool:
+        return _has_fields(unit, self.fields)
+
+
+class Filter(Condition):
+    def __init__(self, predicate: t.Callable[[ArchUnit], bool]) -> None:
+        self.predicate = predicate
+
+    def __str__(self) -> str:
+        return f"filter: {getattr(self.predicate, '__qualname__', repr(self.predicate))}"
+
+    def key(self) -> t.Hashable:
+        return (Filter, self.predicate)
+
+    def matches(self, register: QueryableRegister, unit: ArchUnit) -> bool:
+        return bool(self.predicate(unit))
+
+
+def _has_fields(unit: ArchUnit, fields: t.Dict[str, t.Any]) -> bool:
+    return all(getattr(unit, name, _MISSING) == value for name, value in fields.items())
+
+
+def _describe_fields(fields: t.Dict[str, t.Any]) -> str:
+    return ", ".join(f"{name}={value!r}" for name, value in fields.items())
+
+
+def _describe_target(target: t.Any) -> str:
+    if isinstance(target, TargetReference):
+        return str(target)
+    if isinstance(target, ModuleType):
+        return target.__name__
+    return getattr(target, "__qualname__", None) or repr(target)
+
+
+def _get_module_name(target: t.Any) -> t.Optional[str]:
+    if isinstance(target, TargetReference):
+        return target.module
+    if isinstance(target, ModuleType):
+        return target.__name__
+    module = getattr(target, "__module__", None)
+    return module if isinstance(module, str) else None
+
+
+class Step(t.NamedTuple):
+    """
+    A step of a plan: how a condition is checked.
+
+    Modes: `scan` gives the candidates with the index of the condition; `intersect` keeps the candidates
+    whose targets are selected by the condition; `lookup` checks the condition with the index per candidate;
+    `filter` checks it on the candidates themselves.
+    """
+
+    mode: str
+    condition: Condition
+    # the estimated number of the units of the indexed conditions
+    estimate: t.Optional[int]
+
+    def __str__(self) -> str:
+        estimate = f" (~{self.estimate} units)" if self.estimate is not None else ""
+        return f"{self.mode} {self.condition}{estimate}"
+
+
+class Plan(t.NamedTuple):
+    unit_type: t.Type[ArchUnit]
+    steps: t.Tuple[Step, ...]
+
+    def __str__(self) -> str:
+        lines = [f"{index}. {step}" for index, step in enumerate(self.steps, 1)]
+        if not isinstance(self.steps[0].condition, OfType) and self.unit_type is not ArchUnit:
+            lines[0] += f", of {self.unit_type.__qualname__}"
+        return "\n".join(lines)
+
+    def execute(self, register: QueryableRegister) -> t.Iterator[ArchUnit]:
+        checks: t.List[t.Callable[[ArchUnit], bool]] = []
+        for step in self.steps[1:]:
+            if step.mode == "intersect":
+                target_ids = step.condition.select_targets(register)
+                checks.append(lambda unit, target_ids=target_ids: id(unit.target) in target_ids)  # type: ignore
+            else:
+                checks.append(lambda unit, condition=step.condition: condition.matches(register, unit))  # type: ignore
+        for unit in self.steps[0].condition.scan(register, self.unit_type):
+            if all(check(unit) for check in checks):
+                yield unit
+
+
+def compile_plan(register: QueryableRegister, unit_type: t.Type[ArchUnit], conditions: t.Sequence[Condition]) -> Plan:
+    """Orders the conditions of a query of units of the type, by the sizes of the indexes of the register."""
+    estimated = sorted(
+        (
+            (condition.estimate(register, unit_type), index, condition)
+            for index, condition in enumerate([OfType(unit_type), *conditions])
+            if condition.indexed
+        ),
+        key=lambda item: item[:2],
+    )
+    (driver_estimate, _, driver), *others = estimated
+    steps = [Step("scan", driver, driver_estimate)]
+    for estimate, _, condition in others:
+        if isinstance(condition, OfType):
+            # the scans give the units of the queried type already
+            continue
+        # NB: selecting the targets once is cheaper than looking the condition up for each of the candidates
+        if condition.selects_targets and condition.selection_cost(register) <= driver_estimate:
+            steps.append(Step("intersect", condition, estimate))
+        else:
+            steps.append(Step("lookup", condition, estimate))
+    steps.extend(Step("filter", condition, None) for condition in conditions if not condition.indexed)
+    return Plan(unit_type, tuple(steps))
+
+
+class PlanCacheInfo(t.NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class _PlanCache:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[t.Hashable, Plan]" = OrderedDict()
+        # NB: registers are referenced weakly, so that the plans (holding the targets & the predicates of their
+        # queries) go with their register, and a register made later at the same address isn't taken for it
+        self._registers: t.Dict[int, "weakref.ref[QueryableRegister]"] = {}
+        # references of the registers gone, whose plans are yet to be dropped
+        self._dead: t.List["weakref.ref[QueryableRegister]"] = []
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, register: QueryableRegister, unit_type: t.Type[ArchUnit], conditions: t.Sequence[Condition]) -> Plan:
+        # NB: a register is known by its identity and size, which the estimates depend on
+        register_id = id(register)
+        key = (register_id, len(register), unit_type, tuple(condition.key() for condition in conditions))
+        try:
+            plan = self._plans.get(key)
+        except TypeError:
+            # unhashable values of the fields
+            return compile_plan(register, unit_type, conditions)
+        reference = self._registers.get(register_id)
+        if plan is not None and reference is not None and reference() is register:
+            with self._lock:
+                self.hits += 1
+                if key in self._plans:
+                    self._plans.move_to_end(key)
+            return plan
+        plan = compile_plan(register, unit_type, conditions)
+        with self._lock:
+            self.misses += 1
+            self._forget_dead()
+            reference = self._registers.get(register_id)
+            if reference is None or reference() is not register:
+                self._forget(register_id)
+                try:
+                    self._registers[register_id] = weakref.ref(register, self._dead.append)
+                except TypeError:
+                    # a register which can't be referenced weakly isn't cached
+                    return plan
+            self._plans[key] = plan
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    def _forget_dead(self) -> None:
+        # NB: the callbacks of the references only collect them, as they may be called by the garbage collector
+        # at any moment, even while the lock is held
+        while self._dead:
+            reference = self._dead.pop()
+            for register_id, registered in list(self._registers.items()):
+                if registered is reference:
+                    self._forget(register_id)
+
+    def _forget(self, register_id: int) -> None:
+        self._registers.pop(register_id, None)
+        for key in [key for key in self._plans if key[0] == register_id]:  # type: ignore
+            del self._plans[key]
+
+    def info(self) -> PlanCacheInfo:
+        with self._lock:
+            self._forget_dead()
+            return PlanCacheInfo(self.hits, self.misses, self.maxsize, len(self._plans))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self._registers.clear()
+            self._dead.clear()
+            self.hits = self.misses = 0
+
+
+DEFAULT_PLAN_CACHE_SIZE = 1024
+_plan_cache = _PlanCache(DEFAULT_PLAN_CACHE_SIZE)
+
+
+def plan_cache_info() -> PlanCacheInfo:
+    """Statistics of the cache of the plans of the queries, similar to `functools.lru_cache`."""
+    return _plan_cache.info()
+
+
+def clear_plan_cache(maxsize: t.Optional[int] = None) -> None:
+    """Clears the cache of the plans and its statistics, optionally changing its size."""
+    _plan_cache.clear()
+    if maxsize is not None:
+        _plan_cache.maxsize = maxsize
+
+
+class Query(t.Iterable[ArchUnit]):
+    """
+    Units of the register meeting all the conditions, selected step by step:
+
+        Query(register).of_type(Route).for_targets(view).where(websocket=True)
+
+    Queries are immutable: each method gives a new query, so a query may be refined in many ways.
+    Units are looked up anew on each iteration.
+    """
+
+    def __init__(
+        self,
+        register: QueryableRegister,
+        unit_type: t.Type[ArchUnit] = ArchUnit,
+        conditions: t.Tuple[Condition, ...] = (),
+    ) -> None:
+        self.register = register
+        self.unit_type = unit_type
+        self.conditions = conditions
+
+    def of_type(self, unit_type: t.Type[ArchUnit]) -> "Query":
+        """Units of the type (or of its subclasses); replaces the type given before."""
+        return Query(self.register, unit_type, self.conditions)
+
+    def for_targets(self, *targets: t.Any) -> "Query":
+        """Units of any of the targets."""
+        return self._where(ForTargets(targets))
+
+    def carrying(self, unit_type: t.Type[ArchUnit], **fields: t.Any) -> "Query":
+        """Units whose targets have a unit of the type, with the values of the fields, e.g. a `Tag`."""
+        return self._where(Carrying(unit_type, fields))
+
+    def in_modules(self, *patterns: str) -> "Query":
+        """Units whose targets are defined in (or are) the modules, see `rules.ModuleSelector`."""
+        return self._where(InModules(patterns))
+
+    def where(self, **fields: t.Any) -> "Query":
+        """Units with the values of the fields."""
+        return self._where(Where(fields))
+
+    def filter(self, predicate: t.Callable[[ArchUnit], bool]) -> "Query":
+        """Units the predicate holds for."""
+        return self._where(Filter(predicate))
+
+    def _where(self, condition: Condition) -> "Query":
+        return Query(self.register, self.unit_type, self.conditions + (condition,))
+
+    def plan(self) -> Plan:
+        return _plan_cache.get(self.register, self.unit_type, self.conditions)
+
+    def explain(self) -> str:
+        """Describes the plan of the query, e.g. to tell which index gives the candidates."""
+        return str(self.plan())
+
+    def __iter__(self) -> t.Iterator[ArchUnit]:
+        return self.plan().execute(self.register)
+
+    def first(self) -> t.Optional[ArchUnit]:
+        return next(iter(self), None)
+
+    def count(self) -> int:
+        return sum(1 for _ in self)
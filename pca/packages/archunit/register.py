@@ -1,58 +1,444 @@
+import threading
 import typing as t
-from collections import defaultdict
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from types import ModuleType
 
-from .importing import maybe_dotted_name
+from immutabledict import immutabledict
+
+from .importing import (
+    ModuleSpec,
+    find_module_spec,
+    iterate_module_specs,
+    maybe_dotted_name,
+)
 from .introspection import get_all_subclasses
-from .units.base import ArchUnit
+from .probes import (
+    count,
+    instrumented,
+)
+from .units.base import (
+    ArchUnit,
+    _subclasses_index,
+)
+
+_INCLUDEME_HOOK_NAME = "archunit_includeme"
 
 
 class ArchUnitRegister(t.Collection[ArchUnit]):
+    """
+    Register of the units, which may be read and written to from many threads.
+
+    Writers are serialized by a lock. Readers take no lock: each read works on a consistent view of the units
+    published so far (see `read_view`), so it never sees a unit being registered meanwhile, nor a part
+    of a batch of `register_multiple`.
+    """
+
     def __init__(self) -> None:
-        self._index_per_unit: t.Dict[t.Type[ArchUnit], t.Set[ArchUnit]] = defaultdict(set)
-        self._index_per_target: t.Dict[t.Type, t.Set[ArchUnit]] = defaultdict(set)
+        # serializes registering, so that modules may be included from many threads
+        self._lock = threading.RLock()
+        self._state = _RegisterState()
 
     def __iter__(self) -> t.Iterator[ArchUnit]:
-        yield from self.get_all_of_type(ArchUnit)
+        return iter(self.read_view())
 
     def __contains__(self, unit: object) -> bool:
-        if not isinstance(unit, ArchUnit):
-            return False
-        return unit in self._index_per_unit[type(unit)]
+        return unit in self.read_view()
 
     def __len__(self) -> int:
-        return sum(len(units) for k, units in self._index_per_unit.items())
+        return self._state.generation
 
+    @property
+    def generation(self) -> int:
+        """Number of the units published; grows with every registering, until the register is cleared."""
+        return self._state.generation
+
+    def read_view(self) -> "ArchUnitRegisterView":
+        """
+        Read-only view of the units published so far, unaffected by the units registered later.
+
+        It's made in constant time, without locking nor copying, so it is cheap to take one per rule,
+        to get consistent results of many queries.
+        """
+        state = self._state
+        return ArchUnitRegisterView(state, state.generation)
+
+    @instrumented(category="register")
     def include(self, where: t.Union[str, t.Any]) -> t.Any:
         where = maybe_dotted_name(where)
-        if hasattr(where, "archunit_includeme"):
-            where.archunit_includeme(self)
+        if hasattr(where, _INCLUDEME_HOOK_NAME):
+            getattr(where, _INCLUDEME_HOOK_NAME)(self)
         return where
 
-    def autodiscover(where: t.Union[str, t.Any]):
-        where = maybe_dotted_name(where)
+    def autodiscover(self, where: t.Union[str, ModuleType], jobs: int = 1) -> t.List[ModuleType]:
+        """
+        Includes all the modules of the package which define the `archunit_includeme` hook.
+
+        Sources of the modules are checked for the name of the hook before they are imported, so
+        modules without the hook are never imported.
 
+        :param where: `builtins.module` object or Python qualified name of a package (or of a single module).
+        :param jobs: number of threads to check & include modules with; the hooks may be called concurrently.
+        :return: the included modules, in the order of discovery.
+        """
+        root, _ = find_module_spec(where)
+        specs = list(iterate_module_specs(where, include_packages=True))
+        if root.is_package and not root.is_namespace:
+            specs.insert(0, root)
+        if jobs > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                modules = list(executor.map(self._include_if_hooked, specs))
+        else:
+            modules = [self._include_if_hooked(spec) for spec in specs]
+        return [module for module in modules if module is not None]
+
+    def _include_if_hooked(self, spec: ModuleSpec) -> t.Optional[ModuleType]:
+        if _INCLUDEME_HOOK_NAME.encode() not in spec.read_source():
+            count("autodiscover.skipped_modules")
+            return None
+        module = spec.load()
+        if not hasattr(module, _INCLUDEME_HOOK_NAME):
+            # the name has been found somewhere in the source, but not as a definition of the hook
+            return None
+        return self.include(module)
+
+    @instrumented(category="register")
     def register(self, unit: ArchUnit) -> None:
-        self._index_per_unit[type(unit)].add(unit)
-        self._index_per_target[type(unit.target)].add(unit)
+        with self._lock:
+            state = self._state
+            state.append(unit)
+            state.generation = state.appended
 
+    @instrumented(category="register")
     def register_multiple(self, units: t.Iterable[ArchUnit]) -> None:
-        for unit in units:
-            self.register(unit)
+        """Registers the units as a batch: readers see either none or all of them."""
+        # NB: the units are hashed upfront, so that a failing one leaves none of the batch appended
+        batch = list(units)
+        for unit in batch:
+            hash(unit)
+        with self._lock:
+            state = self._state
+            for unit in batch:
+                state.append(unit)
+            state.generation = state.appended
+
+    def freeze(self) -> "FrozenArchUnitRegister":
+        """Makes an immutable, read-optimized copy of the register, e.g. when all the units have been registered."""
+        return FrozenArchUnitRegister(self)
 
     def clear(self) -> None:
-        self._index_per_unit.clear()
-        self._index_per_target.clear()
+        # NB: the indexes are replaced rather than emptied, so the views taken before keep their units
+        with self._lock:
+            self._state = _RegisterState()
+
+    @instrumented(category="register")
+    def get_all_of_type(self, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        yield from self.read_view().get_all_of_type(unit_type)
+
+    @instrumented(category="register")
+    def get_all_for_target(self, target: t.Any) -> t.Iterable[ArchUnit]:
+        yield from self.read_view().get_all_for_target(target)
+
+    @instrumented(category="register")
+    def get_all_of_type_for_target(self, target: t.Any, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        yield from self.read_view().get_all_of_type_for_target(target, unit_type)
+
+    def count_all_of_type(self, unit_type: t.Type[ArchUnit]) -> int:
+        """Number of the units `get_all_of_type` gives, without iterating over them."""
+        return self.read_view().count_all_of_type(unit_type)
+
+    def count_all_for_target(self, target: t.Any) -> int:
+        """Number of the units `get_all_for_target` gives, without iterating over them."""
+        return self.read_view().count_all_for_target(target)
+
+
+class _Bucket:
+    """
+    Units in the order of registering, with their sequence numbers. Buckets are append-only, so readers
+    take the units published in their generation, without locking, while a writer appends more of them.
+    """
+
+    __slots__ = ("units", "sequence_numbers")
+
+    def __init__(self) -> None:
+        self.units: t.List[ArchUnit] = []
+        self.sequence_numbers = array("I")
+
+    def append(self, unit: ArchUnit, sequence_number: int) -> None:
+        # NB: units go first, so that a sequence number read is always one of a unit already appended
+        self.units.append(unit)
+        self.sequence_numbers.append(sequence_number)
+
+    def count(self, generation: int) -> int:
+        sequence_numbers = self.sequence_numbers
+        if not sequence_numbers or sequence_numbers[-1] < generation:
+            return len(sequence_numbers)
+        return bisect_left(sequence_numbers, generation)
+
+    def get_units(self, generation: int) -> t.List[ArchUnit]:
+        return self.units[: self.count(generation)]
+
+    def iterate_units(self, generation: int) -> t.Iterator[ArchUnit]:
+        # NB: without copying the units, as the list is only appended to
+        return islice(self.units, self.count(generation))
+
+
+# a target with more units than that gets them indexed per type as well, see `_RegisterState.index_per_unit_and_target`
+_SMALL_TARGET_SIZE = 8
+
+
+class _RegisterState:
+    """
+    Indexes of the units registered since the register was made or cleared; `clear` replaces them as a whole.
+
+    Units get sequence numbers when appended, and these below `generation` are published. Only writers,
+    holding the lock of the register, append units or publish them.
+
+    Most targets have a single unit, so the target index holds a bare unit until a second one comes,
+    and only the targets with many units are indexed per type too: buckets take several times the memory
+    of the unit itself.
+    """
+
+    def __init__(self) -> None:
+        self.appended = 0
+        self.generation = 0
+        # sequence numbers of the units; deduplicates the units, per type, as equal units are of the same type
+        self.units_per_type: t.Dict[t.Type[ArchUnit], t.Dict[ArchUnit, int]] = {}
+        self.index_per_unit: t.Dict[t.Type[ArchUnit], _Bucket] = {}
+        # NB: targets are indexed by their identity, as units are looked up by `unit.target is target`.
+        # Identities are stable: the register holds units, which hold their targets, so an `id` of a target
+        # can't be reused by another object while there is a unit of the target in the register.
+        self.index_per_target: t.Dict[int, t.Union[ArchUnit, _Bucket]] = {}
+        # only for the targets with more than `_SMALL_TARGET_SIZE` units; the others are filtered by type
+        self.index_per_unit_and_target: t.Dict[t.Tuple[t.Type[ArchUnit], int], _Bucket] = {}
+        # NB: replaced, never mutated, so that readers may iterate over it
+        self.unit_types: t.Tuple[t.Type[ArchUnit], ...] = ()
+        # registered unit types being the given type or its subclass; replaced when a new type is
+        # registered or when the ArchUnit type hierarchy changes
+        self.types_per_type: t.Dict[t.Type[ArchUnit], t.Tuple[t.Type[ArchUnit], ...]] = {}
+        self.types_version = _subclasses_index.version
+
+    def append(self, unit: ArchUnit) -> None:
+        unit_type = type(unit)
+        units = self.units_per_type.get(unit_type)
+        if units is None:
+            units = self.units_per_type[unit_type] = {}
+            self.index_per_unit[unit_type] = _Bucket()
+            self.unit_types += (unit_type,)
+            self.types_per_type = {}
+        elif unit in units:
+            return
+        sequence_number = self.appended
+        # NB: counted as appended before it's indexed, so that a reader finding the unit in an index
+        # finds its sequence number too, see `ArchUnitRegisterView._is_published`
+        self.appended = sequence_number + 1
+        units[unit] = sequence_number
+        self.index_per_unit[unit_type].append(unit, sequence_number)
+        target_id = id(unit.target)
+        entry = self.index_per_target.get(target_id)
+        if entry is None:
+            self.index_per_target[target_id] = unit
+            return
+        if isinstance(entry, _Bucket):
+            bucket = entry
+        else:
+            bucket = _Bucket()
+            bucket.append(entry, self.units_per_type[type(entry)][entry])
+        bucket.append(unit, sequence_number)
+        # NB: the bucket is complete before it replaces the unit, as readers may look it up meanwhile
+        self.index_per_target[target_id] = bucket
+        if len(bucket.units) == _SMALL_TARGET_SIZE + 1:
+            for target_unit, target_sequence_number in zip(bucket.units, bucket.sequence_numbers):
+                self._index_per_unit_and_target(target_unit, target_id, target_sequence_number)
+        elif len(bucket.units) > _SMALL_TARGET_SIZE:
+            self._index_per_unit_and_target(unit, target_id, sequence_number)
+
+    def _index_per_unit_and_target(self, unit: ArchUnit, target_id: int, sequence_number: int) -> None:
+        key = (type(unit), target_id)
+        bucket = self.index_per_unit_and_target.get(key)
+        if bucket is None:
+            bucket = self.index_per_unit_and_target[key] = _Bucket()
+        bucket.append(unit, sequence_number)
+
+    def get_registered_types(self, unit_type: t.Type[ArchUnit]) -> t.Tuple[t.Type[ArchUnit], ...]:
+        types_per_type = self.types_per_type
+        if self.types_version != _subclasses_index.version:
+            types_per_type = self.types_per_type = {}
+            self.types_version = _subclasses_index.version
+        registered_types = types_per_type.get(unit_type)
+        if registered_types is None:
+            # NB: a type registered meanwhile is found here, but the views skip its units of later generations
+            registered_types = types_per_type[unit_type] = tuple(
+                subclass
+                for subclass in _subclasses_index.get_all_subclasses(unit_type)
+                if subclass in self.index_per_unit
+            )
+        return registered_types
 
+
+class ArchUnitRegisterView(t.Collection[ArchUnit]):
+    """
+    Units of an `ArchUnitRegister` published up to a generation, made with `ArchUnitRegister.read_view`.
+
+    A view shares the indexes of its register and never locks nor changes them, so it is safe to use
+    from any thread while the register is being written to.
+    """
+
+    def __init__(self, state: _RegisterState, generation: int) -> None:
+        self._state = state
+        self.generation = generation
+
+    def __iter__(self) -> t.Iterator[ArchUnit]:
+        for unit_type in self._state.unit_types:
+            yield from self._state.index_per_unit[unit_type].iterate_units(self.generation)
+
+    def __contains__(self, unit: object) -> bool:
+        if not isinstance(unit, ArchUnit):
+            return False
+        sequence_number = self._state.units_per_type.get(type(unit), {}).get(unit)
+        return sequence_number is not None and sequence_number < self.generation
+
+    def __len__(self) -> int:
+        return self.generation
+
+    def freeze(self) -> "FrozenArchUnitRegister":
+        return FrozenArchUnitRegister(self)
+
+    def get_all_of_type(self, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        for registered_type in self._state.get_registered_types(unit_type):
+            yield from self._state.index_per_unit[registered_type].iterate_units(self.generation)
+
+    def get_all_for_target(self, target: t.Any) -> t.Iterable[ArchUnit]:
+        return self._get_units(self._state.index_per_target.get(id(target)))
+
+    def get_all_of_type_for_target(self, target: t.Any, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        target_id = id(target)
+        units = self._get_units(self._state.index_per_target.get(target_id))
+        registered_types = self._state.get_registered_types(unit_type)
+        if len(units) <= _SMALL_TARGET_SIZE or len(units) <= len(registered_types):
+            # the target has few units, or fewer than there are types to look up
+            yield from (unit for unit in units if isinstance(unit, unit_type))
+            return
+        for registered_type in registered_types:
+            bucket = self._state.index_per_unit_and_target.get((registered_type, target_id))
+            if bucket is not None:
+                yield from bucket.iterate_units(self.generation)
+
+    def count_all_of_type(self, unit_type: t.Type[ArchUnit]) -> int:
+        return sum(
+            self._state.index_per_unit[registered_type].count(self.generation)
+            for registered_type in self._state.get_registered_types(unit_type)
+        )
+
+    def count_all_for_target(self, target: t.Any) -> int:
+        entry = self._state.index_per_target.get(id(target))
+        if isinstance(entry, _Bucket):
+            return entry.count(self.generation)
+        return int(entry is not None and self._is_published(entry))
+
+    def _get_units(self, entry: t.Union[ArchUnit, _Bucket, None]) -> t.Sequence[ArchUnit]:
+        if entry is None:
+            return ()
+        if isinstance(entry, _Bucket):
+            return entry.get_units(self.generation)
+        return (entry,) if self._is_published(entry) else ()
+
+    def _is_published(self, unit: ArchUnit) -> bool:
+        state = self._state
+        # NB: read after the unit has been found, so if nothing has been appended since the generation,
+        # the unit is of it; looking up its sequence number is left for the views of past generations
+        if state.appended <= self.generation:
+            return True
+        return state.units_per_type[type(unit)][unit] < self.generation
+
+
+class FrozenArchUnitRegister(t.Collection[ArchUnit]):
+    """
+    Immutable snapshot of an `ArchUnitRegister`, made with `ArchUnitRegister.freeze`.
+
+    Indexes are kept as tuples in `immutabledict`s, which take less memory than the sets of the mutable
+    register, and the subclass closures of all the ArchUnit types known at the moment of freezing are
+    precomputed. Lookups never mutate the snapshot, so it is safe to share between threads without locking.
+    """
+
+    def __init__(self, register: t.Union[ArchUnitRegister, ArchUnitRegisterView]) -> None:
+        view = register.read_view() if isinstance(register, ArchUnitRegister) else register
+        state = view._state
+        self._units = frozenset(view)
+        self._index_per_unit: t.Mapping[t.Type[ArchUnit], t.Tuple[ArchUnit, ...]] = _freeze_index(
+            state.index_per_unit, view
+        )
+        self._index_per_target: t.Mapping[int, t.Tuple[ArchUnit, ...]] = _freeze_index(state.index_per_target, view)
+        index_per_unit_and_target: t.Dict[t.Tuple[t.Type[ArchUnit], int], t.List[ArchUnit]] = {}
+        for target_id, units in self._index_per_target.items():
+            for unit in units:
+                index_per_unit_and_target.setdefault((type(unit), target_id), []).append(unit)
+        self._index_per_unit_and_target: t.Mapping[t.Tuple[t.Type[ArchUnit], int], t.Tuple[ArchUnit, ...]] = (
+            immutabledict((key, tuple(units)) for key, units in index_per_unit_and_target.items())
+        )
+        self._types_per_type: t.Mapping[t.Type[ArchUnit], t.Tuple[t.Type[ArchUnit], ...]] = immutabledict(
+            (unit_type, self._find_registered_types(unit_type)) for unit_type in get_all_subclasses(ArchUnit)
+        )
+
+    def __iter__(self) -> t.Iterator[ArchUnit]:
+        return iter(self._units)
+
+    def __contains__(self, unit: object) -> bool:
+        return unit in self._units
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def freeze(self) -> "FrozenArchUnitRegister":
+        return self
+
+    @instrumented(category="register")
     def get_all_of_type(self, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
-        for unit_type in get_all_subclasses(unit_type):
-            yield from self._index_per_unit[unit_type]
+        for registered_type in self._get_registered_types(unit_type):
+            yield from self._index_per_unit[registered_type]
 
+    @instrumented(category="register")
     def get_all_for_target(self, target: t.Any) -> t.Iterable[ArchUnit]:
-        for unit in self._index_per_target[type(target)]:
-            if unit.target is target:
-                yield unit
+        return self._index_per_target.get(id(target), ())
 
+    @instrumented(category="register")
     def get_all_of_type_for_target(self, target: t.Any, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
-        for unit in self._index_per_target[type(target)]:
-            if (unit.target is target) and isinstance(unit, unit_type):
-                yield unit
+        target_id = id(target)
+        units = self._index_per_target.get(target_id, ())
+        registered_types = self._get_registered_types(unit_type)
+        if len(units) <= len(registered_types):
+            yield from (unit for unit in units if isinstance(unit, unit_type))
+            return
+        for registered_type in registered_types:
+            yield from self._index_per_unit_and_target.get((registered_type, target_id), ())
+
+    def count_all_of_type(self, unit_type: t.Type[ArchUnit]) -> int:
+        return sum(
+            len(self._index_per_unit[registered_type]) for registered_type in self._get_registered_types(unit_type)
+        )
+
+    def count_all_for_target(self, target: t.Any) -> int:
+        return len(self._index_per_target.get(id(target), ()))
+
+    def _get_registered_types(self, unit_type: t.Type[ArchUnit]) -> t.Tuple[t.Type[ArchUnit], ...]:
+        registered_types = self._types_per_type.get(unit_type)
+        if registered_types is None:
+            # a type defined after the register was frozen; not cached, as the snapshot is immutable
+            registered_types = self._find_registered_types(unit_type)
+        return registered_types
+
+    def _find_registered_types(self, unit_type: t.Type[ArchUnit]) -> t.Tuple[t.Type[ArchUnit], ...]:
+        return tuple(subclass for subclass in get_all_subclasses(unit_type) if subclass in self._index_per_unit)
+
+
+_Key = t.TypeVar("_Key")
+_Entry = t.TypeVar("_Entry", bound=t.Union[ArchUnit, _Bucket])
+
+
+def _freeze_index(index: t.Dict[_Key, _Entry], view: ArchUnitRegisterView) -> t.Mapping[_Key, t.Tuple[ArchUnit, ...]]:
+    # NB: `dict.copy` is atomic, unlike iterating over a dict a writer may be adding buckets to meanwhile
+    entries = index.copy()
+    units_per_key = ((key, view._get_units(entry)) for key, entry in entries.items())
+    return immutabledict((key, tuple(units)) for key, units in units_per_key if units)
@@ -0,0 +1,164 @@
+import json
+import time
+import typing as t
+from xml.sax.saxutils import (
+    escape,
+    quoteattr,
+)
+
+from .graph import DependencyGraph
+from .rules import (
+    Rule,
+    Violation,
+)
+
+DEFAULT_FLUSH_EVERY = 100
+
+
+class Reporter:
+    """
+    Base class of the reporters of a check, which get the results as soon as they are found.
+
+    A reporter writes a record per violation and never keeps them, so its memory usage doesn't depend
+    on the number of violations. The output is flushed after each rule and every `flush_every` records.
+    """
+
+    def __init__(self, stream: t.TextIO, flush_every: int = DEFAULT_FLUSH_EVERY) -> None:
+        self.stream = stream
+        self.flush_every = flush_every
+        self._unflushed = 0
+
+    def start(self) -> None:
+        pass
+
+    def start_rule(self, rule: Rule) -> None:
+        pass
+
+    def add_violation(self, rule: Rule, violation: Violation) -> None:
+        raise NotImplementedError
+
+    def finish_rule(self, rule: Rule, violation_count: int, duration: float) -> None:
+        self.flush()
+
+    def finish(self) -> None:
+        self.flush()
+
+    def write(self, text: str) -> None:
+        self.stream.write(text)
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        self.stream.flush()
+        self._unflushed = 0
+
+
+class TextReporter(Reporter):
+    """Writes the violations as lines of text: `rule: a -> b`."""
+
+    def __init__(self, stream: t.TextIO, flush_every: int = 1) -> None:
+        super().__init__(stream, flush_every)
+
+    def add_violation(self, rule: Rule, violation: Violation) -> None:
+        self.write(f"{violation}\n")
+
+
+class JSONLinesReporter(Reporter):
+    """
+    Writes a JSON object per line: one per violation and one summing up each of the checked rules.
+
+        {"type": "violation", "rule": "...", "source": "a", "target": "b", "path": ["a", "b"]}
+        {"type": "rule", "rule": "...", "violations": 1, "duration": 0.002}
+    """
+
+    def add_violation(self, rule: Rule, violation: Violation) -> None:
+        record = {
+            "type": "violation",
+            "rule": violation.rule,
+            "source": violation.source,
+            "target": violation.target,
+            "path": list(violation.path),
+        }
+        self.write(f"{json.dumps(record)}\n")
+
+    def finish_rule(self, rule: Rule, violation_count: int, duration: float) -> None:
+        record = {"type": "rule", "rule": str(rule), "violations": violation_count, "duration": round(duration, 6)}
+        self.write(f"{json.dumps(record)}\n")
+        super().finish_rule(rule, violation_count, duration)
+
+
+class JUnitXMLReporter(Reporter):
+    """
+    Writes a JUnit XML report: a failed test case per violation and a passed one per rule kept.
+
+    Test cases are named after the violating import chains and classified by their rules. As the report
+    is written incrementally, the test suite has no summary counts: consumers count the test cases.
+    """
+
+    def __init__(
+        self, stream: t.TextIO, flush_every: int = DEFAULT_FLUSH_EVERY, suite_name: str = "pca-archunit"
+    ) -> None:
+        super().__init__(stream, flush_every)
+        self.suite_name = suite_name
+
+    def start(self) -> None:
+        self.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        self.write(f"<testsuites>\n<testsuite name={quoteattr(self.suite_name)}>\n")
+
+    def add_violation(self, rule: Rule, violation: Violation) -> None:
+        chain = " -> ".join(violation.path)
+        self.write(
+            f"<testcase classname={quoteattr(violation.rule)} name={quoteattr(chain)}>"
+            f'<failure message={quoteattr(str(violation))} type="Violation">{escape(chain)}</failure>'
+            "</testcase>\n"
+        )
+
+    def finish_rule(self, rule: Rule, violation_count: int, duration: float) -> None:
+        if not violation_count:
+            name = quoteattr(str(rule))
+            self.write(f'<testcase classname={name} name={name} time="{duration:.6f}"/>\n')
+        super().finish_rule(rule, violation_count, duration)
+
+    def finish(self) -> None:
+        self.write("</testsuite>\n</testsuites>\n")
+        super().finish()
+
+
+def report_rules(
+    graph: DependencyGraph,
+    rules: t.Iterable[Rule],
+    reporters: t.Sequence[Reporter],
+    fail_fast: bool = False,
+) -> int:
+    """
+    Checks the rules one by one, passing each violation to the reporters as soon as it is found.
+
+    :param fail_fast: stops at the first violation.
+    :return: the number of the violations found.
+    """
+    for reporter in reporters:
+        reporter.start()
+    violation_count = 0
+    try:
+        for rule in rules:
+            for reporter in reporters:
+                reporter.start_rule(rule)
+            rule_violation_count = 0
+            start = time.perf_counter()
+            for violation in rule.check(graph):
+                rule_violation_count += 1
+                for reporter in reporters:
+                    reporter.add_violation(rule, violation)
+                if fail_fast:
+                    break
+            duration = time.perf_counter() - start
+            for reporter in reporters:
+                reporter.finish_rule(rule, rule_violation_count, duration)
+            violation_count += rule_violation_count
+            if fail_fast and violation_count:
+                break
+    finally:
+        for reporter in reporters:
+            reporter.finish()
+    return violation_count
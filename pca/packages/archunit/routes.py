@@ -0,0 +1,298 @@
+"""
+Static extraction of the routes of web apps (Sanic-like: apps, blueprints, groups of blueprints and routes
+declared with decorators), without importing the app.
+
+    register_routes(register, "my_app", jobs=4)
+    register.get_all_of_type(Route)
+
+Declarations are found in the module-level code only: `app = Sanic(...)`, `bp = Blueprint(...)`,
+`group = Blueprint.group(bp1, bp2, ...)` and `@bp.route(...)`-like decorators of module-level functions.
+Names are followed through the imports between the analyzed modules, so a route declared on a blueprint
+imported from another module is bound to the blueprint defined there.
+"""
+
+import ast
+import re
+import typing as t
+from types import ModuleType
+
+from .analysis import analyze_modules
+from .cache import ScanCache
+from .graph import _resolve_relative_import
+from .importing import (
+    ModuleSpec,
+    find_module_spec,
+    iterate_module_specs,
+)
+from .introspection import TargetReference
+from .register import ArchUnitRegister
+from .units.application import Application
+from .units.base import ArchUnit
+from .units.routing import (
+    Blueprint,
+    BlueprintGroup,
+    Route,
+)
+
+# names of the callables making the routers, matched against the last part of the called name
+APPLICATION_FACTORIES = frozenset({"Sanic"})
+BLUEPRINT_FACTORIES = frozenset({"Blueprint"})
+BLUEPRINT_GROUP_FACTORIES = frozenset({"Blueprint.group", "BlueprintGroup"})
+# methods of the routers declaring routes, by the HTTP methods they imply when no `methods` are given
+ROUTE_DECORATORS = {
+    "route": ("GET",),
+    "websocket": (),
+    "get": ("GET",),
+    "post": ("POST",),
+    "put": ("PUT",),
+    "patch": ("PATCH",),
+    "delete": ("DELETE",),
+    "head": ("HEAD",),
+    "options": ("OPTIONS",),
+}
+
+# modules without any of these words can't declare anything: they aren't even parsed
+_KEYWORDS = re.compile(
+    rb"\b(?:%s)\b|\.(?:%s)\("
+    % (
+        b"|".join(
+            re.escape(name.encode())
+            for name in sorted(APPLICATION_FACTORIES | BLUEPRINT_FACTORIES | BLUEPRINT_GROUP_FACTORIES)
+        ),
+        b"|".join(re.escape(name.encode()) for name in ROUTE_DECORATORS),
+    )
+)
+
+
+class ModuleRoutes(t.NamedTuple):
+    """Units declared by a module, with references to their routers as imported by the module."""
+
+    module: str
+    # the names imported by the module, with references to what they have been imported from
+    aliases: t.Dict[str, TargetReference]
+    units: t.Tuple[ArchUnit, ...]
+
+
+def extract_module_routes(spec: ModuleSpec) -> ModuleRoutes:
+    """
+    Finds the apps, blueprints, groups of blueprints and routes declared by the module, without importing it.
+
+    References to the routers aren't followed through the imports yet, see `extract_routes`.
+    """
+    source = spec.read_source()
+    if not _KEYWORDS.search(source):
+        return ModuleRoutes(spec.name, {}, ())
+    return _extract_module_routes(spec, source)
+
+
+def _extract_module_routes(spec: ModuleSpec, source: bytes) -> ModuleRoutes:
+    package = spec.name if spec.is_package else spec.name.rpartition(".")[0]
+    extractor = _RoutesExtractor(spec.name, package)
+    extractor.extract(ast.parse(source, filename=str(spec.path)))
+    return ModuleRoutes(spec.name, extractor.aliases, tuple(extractor.units))
+
+
+class _RoutesExtractor:
+    def __init__(self, module: str, package: str) -> None:
+        self.module = module
+        self.package = package
+        self.aliases: t.Dict[str, TargetReference] = {}
+        self.units: t.List[ArchUnit] = []
+
+    def extract(self, tree: ast.Module) -> None:
+        # NB: the module-level code only, including the branches of its compound statements
+        statements: t.List[ast.stmt] = list(tree.body)
+        while statements:
+            statement = statements.pop(0)
+            if isinstance(statement, (ast.Import, ast.ImportFrom)):
+                self.extract_aliases(statement)
+            elif isinstance(statement, (ast.Assign, ast.AnnAssign)) and isinstance(statement.value, ast.Call):
+                targets = statement.targets if isinstance(statement, ast.Assign) else [statement.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        self.extract_router(target.id, statement.value)
+            elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.extract_routes(statement)
+            elif isinstance(statement, (ast.If, ast.Try, ast.With)):
+                statements[:0] = [
+                    child for field in ("body", "orelse", "finalbody") for child in getattr(statement, field, ())
+                ] + [child for handler in getattr(statement, "handlers", ()) for child in handler.body]
+
+    def extract_aliases(self, statement: t.Union[ast.Import, ast.ImportFrom]) -> None:
+        if isinstance(statement, ast.Import):
+            for alias in statement.names:
+                name = alias.asname or alias.name.partition(".")[0]
+                self.aliases[name] = TargetReference(alias.name if alias.asname else name)
+            return
+        module = _resolve_relative_import(self.package, statement.module, statement.level)
+        if module is not None:
+            for alias in statement.names:
+                if alias.name != "*":
+                    self.aliases[alias.asname or alias.name] = TargetReference(module, alias.name)
+
+    def extract_router(self, name: str, call: ast.Call) -> None:
+        # a local definition shadows an import of the same name
+        self.aliases.pop(name, None)
+        factory = _get_dotted_name(call.func)
+        if factory is None:
+            return
+        target = TargetReference(self.module, name)
+        last_part = factory.rpartition(".")[2]
+        if last_part in APPLICATION_FACTORIES:
+            self.units.append(Application(target, _get_str_argument(call, 0, "name") or name))
+        elif last_part in BLUEPRINT_FACTORIES:
+            blueprint_name = _get_str_argument(call, 0, "name") or name
+            self.units.append(Blueprint(target, blueprint_name, _get_str_argument(call, 1, "url_prefix")))
+        elif any(factory == group or factory.endswith(f".{group}") for group in BLUEPRINT_GROUP_FACTORIES):
+            blueprints = tuple(self.reference(argument.id) for argument in call.args if isinstance(argument, ast.Name))
+            self.units.append(BlueprintGroup(target, blueprints, _get_str_argument(call, None, "url_prefix")))
+
+    def extract_routes(self, function: t.Union[ast.FunctionDef, ast.AsyncFunctionDef]) -> None:
+        for decorator in function.decorator_list:
+            if not (
+                isinstance(decorator, ast.Call)
+                and isinstance(decorator.func, ast.Attribute)
+                and isinstance(decorator.func.value, ast.Name)
+                and decorator.func.attr in ROUTE_DECORATORS
+            ):
+                continue
+            uri = _get_str_argument(decorator, 0, "uri")
+            if uri is None:
+                continue
+            kind = decorator.func.attr
+            methods = _get_str_tuple_argument(decorator, "methods")
+            self.units.append(
+                Route(
+                    TargetReference(self.module, function.name),
+                    uri,
+                    self.reference(decorator.func.value.id),
+                    tuple(method.upper() for method in methods) if methods is not None else ROUTE_DECORATORS[kind],
+                    kind == "websocket",
+                )
+            )
+
+    def reference(self, name: str) -> TargetReference:
+        return self.aliases.get(name) or TargetReference(self.module, name)
+
+
+def _get_dotted_name(node: ast.expr) -> t.Optional[str]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _get_str_argument(call: ast.Call, position: t.Optional[int], keyword: str) -> t.Optional[str]:
+    value: t.Optional[ast.expr] = None
+    if position is not None and len(call.args) > position:
+        value = call.args[position]
+    for argument in call.keywords:
+        if argument.arg == keyword:
+            value = argument.value
+    if isinstance(value, ast.Constant) and isinstance(value.value, str):
+        return value.value
+    return None
+
+
+def _get_str_tuple_argument(call: ast.Call, keyword: str) -> t.Optional[t.Tuple[str, ...]]:
+    for argument in call.keywords:
+        if argument.arg == keyword and isinstance(argument.value, (ast.List, ast.Tuple, ast.Set)):
+            elements = argument.value.elts
+            if all(isinstance(element, ast.Constant) and isinstance(element.value, str) for element in elements):
+                return tuple(element.value for element in elements)  # type: ignore
+    return None
+
+
+def extract_routes(
+    where: t.Union[str, ModuleType],
+    recursive: bool = True,
+    jobs: t.Optional[int] = None,
+    cache: t.Optional[ScanCache] = None,
+) -> t.List[ArchUnit]:
+    """
+    Finds the apps, blueprints, groups of blueprints and routes declared by the modules of the package,
+    without importing them.
+
+    Units target `TargetReference`s to the declared objects. References to the routers of the routes and
+    to the members of the groups are followed through the imports to the objects themselves; routes
+    of unknown routers (e.g. decorated by anything else than an app or a blueprint) are dropped.
+
+    :param jobs: number of processes to parse the modules with, see `analysis.analyze_modules`.
+    :param cache: the cache of the extraction results, if any.
+    """
+    root, _ = find_module_spec(where)
+    specs = list(iterate_module_specs(where, recursive=recursive, include_packages=True))
+    if root.is_package:
+        specs.insert(0, root)
+    if cache is not None:
+        results: t.Iterable[ModuleRoutes] = cache.analyze(specs, extract_module_routes, jobs=jobs)
+    else:
+        results = analyze_modules(specs, extract_module_routes, jobs=jobs)
+    modules = [module_routes for module_routes in results if module_routes.units or module_routes.aliases]
+    return _link_routes(modules, {spec.name: spec for spec in specs})
+
+
+def _link_routes(modules: t.List[ModuleRoutes], specs: t.Dict[str, ModuleSpec]) -> t.List[ArchUnit]:
+    linker = _RouterLinker(modules, specs)
+    units: t.List[ArchUnit] = []
+    for module_routes in modules:
+        for unit in module_routes.units:
+            if isinstance(unit, BlueprintGroup):
+                found = (linker.find_router(blueprint) for blueprint in unit.blueprints)
+                unit = BlueprintGroup(unit.target, tuple(filter(None, found)), unit.url_prefix)
+            elif isinstance(unit, Route):
+                router = linker.find_router(unit.router)
+                if router is None:
+                    continue
+                unit = Route(unit.target, unit.uri, router, unit.methods, unit.websocket)
+            units.append(unit)
+    return units
+
+
+class _RouterLinker:
+    def __init__(self, modules: t.List[ModuleRoutes], specs: t.Dict[str, ModuleSpec]) -> None:
+        self.specs = specs
+        self.aliases = {module_routes.module: module_routes.aliases for module_routes in modules}
+        self.routers = {
+            unit.target
+            for module_routes in modules
+            for unit in module_routes.units
+            if isinstance(unit, (Application, Blueprint, BlueprintGroup))
+        }
+
+    def find_router(self, reference: TargetReference) -> t.Optional[TargetReference]:
+        """Follows the reference through the imports to the definition of a router, if it leads to any."""
+        seen = set()
+        while reference not in self.routers:
+            if reference.qualname is None or reference in seen:
+                return None
+            seen.add(reference)
+            alias = self.get_aliases(reference.module).get(reference.qualname)
+            if alias is None:
+                return None
+            reference = alias
+        return reference
+
+    def get_aliases(self, module: str) -> t.Dict[str, TargetReference]:
+        if module not in self.aliases:
+            # modules just re-exporting the routers (e.g. `from .views import blueprint` in an `__init__`)
+            # are skipped by the extraction, they are parsed only when a reference leads there
+            spec = self.specs.get(module)
+            self.aliases[module] = _extract_module_routes(spec, spec.read_source()).aliases if spec else {}
+        return self.aliases[module]
+
+
+def register_routes(
+    register: ArchUnitRegister,
+    where: t.Union[str, ModuleType],
+    jobs: t.Optional[int] = None,
+    cache: t.Optional[ScanCache] = None,
+) -> t.List[ArchUnit]:
+    """Registers the units found by `extract_routes`; returns them."""
+    units = extract_routes(where, jobs=jobs, cache=cache)
+    register.register_multiple(units)
+    return units
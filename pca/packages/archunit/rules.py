@@ -0,0 +1,383 @@
+import typing as t
+from collections import deque
+from fnmatch import fnmatchcase
+from types import ModuleType
+from weakref import WeakKeyDictionary
+
+from .graph import (
+    ANY_IMPORT,
+    DependencyGraph,
+)
+from .importing import import_dotted_name
+
+_WILDCARDS = frozenset("*?[")
+RULES_ATTRIBUTE_NAME = "archunit_rules"
+
+
+class Violation(t.NamedTuple):
+    """
+    A broken rule.
+
+    `path` is the chain of imports proving the violation: from the importing module to the imported one
+    for dependency rules, or a closed chain of modules for cycles.
+    """
+
+    rule: str
+    path: t.Tuple[str, ...]
+
+    @property
+    def source(self) -> str:
+        return self.path[0]
+
+    @property
+    def target(self) -> str:
+        return self.path[-1]
+
+    def __str__(self) -> str:
+        return f"{self.rule}: {' -> '.join(self.path)}"
+
+
+class Rule:
+    """Base class for the architecture rules, checked against a dependency graph."""
+
+    def __str__(self) -> str:
+        raise NotImplementedError
+
+    def check(self, graph: DependencyGraph) -> t.Iterator[Violation]:
+        raise NotImplementedError
+
+    def selects(self, name: str) -> bool:
+        """
+        Whether the module is selected by the rule, so that a change of its imports (or of the imports
+        of any module it depends on) may change the result of the rule. Any module may, by default.
+        """
+        return True
+
+
+class ModuleSelector:
+    """
+    A set of modules selected by their qualified names.
+
+    A plain name selects the module and all its submodules; a name with shell-style wildcards
+    (`*`, `?`, `[seq]`) is matched with `fnmatch`, e.g. `app.*.views`.
+    """
+
+    def __init__(self, patterns: t.Iterable[str]) -> None:
+        self.patterns = tuple(patterns)
+
+    def __str__(self) -> str:
+        return ", ".join(self.patterns)
+
+    def matches(self, name: str) -> bool:
+        for pattern in self.patterns:
+            if _WILDCARDS.isdisjoint(pattern):
+                if name == pattern or name.startswith(f"{pattern}."):
+                    return True
+            elif fnmatchcase(name, pattern) or fnmatchcase(name, f"{pattern}.*"):
+                return True
+        return False
+
+    def select(self, graph: DependencyGraph) -> t.List[int]:
+        """Ids of the modules of the graph selected by the patterns."""
+        return [module_id for module_id, name in enumerate(graph) if self.matches(name)]
+
+
+class Layer:
+    """A named layer of the architecture, consisting of the modules selected by the patterns."""
+
+    def __init__(self, name: str, *patterns: str) -> None:
+        self.name = name
+        self.modules = ModuleSelector(patterns)
+
+
+class Reachability:
+    """
+    Transitive closure of the dependency graph, as a bitset (an int) of reachable module ids per module.
+
+    Strongly connected components are found first, so the bitsets are computed once per component,
+    in the reversed topological order of the components.
+    """
+
+    def __init__(self, graph: DependencyGraph, flags: int = ANY_IMPORT) -> None:
+        self.graph = graph
+        self.flags = flags
+        self.components = strongly_connected_components(graph, flags)
+        self._component_of = [0] * len(graph)
+        for component_index, component in enumerate(self.components):
+            for module_id in component:
+                self._component_of[module_id] = component_index
+        # NB: Tarjan's algorithm emits a component after all the components reachable from it
+        self._reachable: t.List[int] = []
+        for component in self.components:
+            reachable = 0
+            for module_id in component:
+                reachable |= 1 << module_id
+            for module_id in component:
+                for successor in graph.successors(module_id, flags):
+                    successor_component = self._component_of[successor]
+                    if successor_component < len(self._reachable):
+                        reachable |= self._reachable[successor_component]
+            self._reachable.append(reachable)
+
+    @classmethod
+    def of(cls, graph: DependencyGraph, flags: int = ANY_IMPORT) -> "Reachability":
+        """Gives the reachability of the graph, computed once per graph & flags."""
+        per_flags = _reachability_cache.setdefault(graph, {})
+        if flags not in per_flags:
+            per_flags[flags] = cls(graph, flags)
+        return per_flags[flags]
+
+    def reachable(self, module_id: int) -> int:
+        """The bitset of the modules reachable from the module (including itself)."""
+        return self._reachable[self._component_of[module_id]]
+
+    def reaches(self, source_id: int, targets: int) -> bool:
+        """Is any of the `targets` bitset modules reachable from the source module?"""
+        return bool(self.reachable(source_id) & targets)
+
+    def find_path(self, source_id: int, targets: int) -> t.Optional[t.List[int]]:
+        """The shortest path of imports from the source to any of the `targets` bitset modules."""
+        if not self.reaches(source_id, targets):
+            return None
+        # look only into these modules, which lead to any of the targets
+        return _find_shortest_path(
+            lambda module_id: [i for i in self.graph.successors(module_id, self.flags) if self.reaches(i, targets)],
+            source_id,
+            lambda module_id: bool(targets >> module_id & 1),
+        )
+
+
+_reachability_cache: "WeakKeyDictionary[DependencyGraph, t.Dict[int, Reachability]]" = WeakKeyDictionary()
+
+
+def strongly_connected_components(  # noqa: C901
+    graph: DependencyGraph, flags: int = ANY_IMPORT
+) -> t.List[t.List[int]]:
+    """
+    Finds the strongly connected components of the graph with iterative Tarjan's algorithm.
+
+    Components are listed in the reversed topological order: each of them comes after all the components
+    reachable from it.
+    """
+    node_count = len(graph)
+    index = [-1] * node_count
+    low_link = [0] * node_count
+    on_stack = [False] * node_count
+    stack: t.List[int] = []
+    components: t.List[t.List[int]] = []
+    counter = 0
+    for root in range(node_count):
+        if index[root] != -1:
+            continue
+        index[root] = low_link[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(graph.successors(root, flags)))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if index[successor] == -1:
+                    index[successor] = low_link[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, iter(graph.successors(successor, flags))))
+                    break
+                if on_stack[successor] and index[successor] < low_link[node]:
+                    low_link[node] = index[successor]
+            else:
+                work.pop()
+                if work and low_link[node] < low_link[work[-1][0]]:
+                    low_link[work[-1][0]] = low_link[node]
+                if low_link[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def _find_shortest_path(
+    successors: t.Callable[[int], t.Iterable[int]], source_id: int, is_target: t.Callable[[int], bool]
+) -> t.Optional[t.List[int]]:
+    # breadth-first search, ignoring the source itself as a target, so that it may find cycles too
+    previous: t.Dict[int, int] = {source_id: -1}
+    queue = deque([source_id])
+    while queue:
+        node = queue.popleft()
+        for successor in successors(node):
+            if is_target(successor):
+                path = [successor, node]
+                while previous[path[-1]] != -1:
+                    path.append(previous[path[-1]])
+                return path[::-1]
+            if successor not in previous:
+                previous[successor] = node
+                queue.append(successor)
+    return None
+
+
+def _to_bitset(module_ids: t.Iterable[int]) -> int:
+    bitset = 0
+    for module_id in module_ids:
+        bitset |= 1 << module_id
+    return bitset
+
+
+class ForbiddenDependency(Rule):
+    """
+    Modules selected by `source` must not import modules selected by `target`.
+
+    If `transitive`, indirect imports (through any other modules) are forbidden as well.
+    Use `flags` to check only runtime or only `TYPE_CHECKING` imports.
+    """
+
+    def __init__(
+        self,
+        source: t.Union[str, t.Iterable[str]],
+        target: t.Union[str, t.Iterable[str]],
+        transitive: bool = False,
+        flags: int = ANY_IMPORT,
+    ) -> None:
+        self.source = ModuleSelector([source] if isinstance(source, str) else source)
+        self.target = ModuleSelector([target] if isinstance(target, str) else target)
+        self.transitive = transitive
+        self.flags = flags
+
+    def __str__(self) -> str:
+        dependency = "depend on" if self.transitive else "import"
+        return f"modules of {self.source} must not {dependency} modules of {self.target}"
+
+    def selects(self, name: str) -> bool:
+        return self.source.matches(name) or self.target.matches(name)
+
+    def check(self, graph: DependencyGraph) -> t.Iterator[Violation]:
+        targets = self.target.select(graph)
+        yield from _check_dependencies(
+            str(self), graph, self.source.select(graph), targets, self.transitive, self.flags
+        )
+
+
+def _check_dependencies(
+    rule: str,
+    graph: DependencyGraph,
+    source_ids: t.Iterable[int],
+    target_ids: t.Iterable[int],
+    transitive: bool,
+    flags: int,
+) -> t.Iterator[Violation]:
+    targets = _to_bitset(target_ids)
+    if not targets:
+        return
+    if not transitive:
+        for source_id in source_ids:
+            for target_id in graph.successors(source_id, flags):
+                if targets >> target_id & 1:
+                    yield Violation(rule, (graph.name_of(source_id), graph.name_of(target_id)))
+        return
+    reachability = Reachability.of(graph, flags)
+    for source_id in source_ids:
+        path = reachability.find_path(source_id, targets & ~(1 << source_id))
+        if path is not None:
+            yield Violation(rule, tuple(graph.name_of(module_id) for module_id in path))
+
+
+class LayeredArchitecture(Rule):
+    """
+    Layers, listed from the top to the bottom, where lower layers must not depend on upper ones.
+
+        LayeredArchitecture(
+            Layer("views", "app.views", "app.*.views"),
+            Layer("services", "app.services"),
+            Layer("domain", "app.domain"),
+        )
+
+    If `transitive` (by default), indirect dependencies through any other modules are checked as well.
+    """
+
+    def __init__(self, *layers: Layer, transitive: bool = True, flags: int = ANY_IMPORT) -> None:
+        self.layers = layers
+        self.transitive = transitive
+        self.flags = flags
+
+    def __str__(self) -> str:
+        return f"layers {' -> '.join(layer.name for layer in self.layers)} must not depend on upper layers"
+
+    def selects(self, name: str) -> bool:
+        return any(layer.modules.matches(name) for layer in self.layers)
+
+    def check(self, graph: DependencyGraph) -> t.Iterator[Violation]:
+        layer_ids = [layer.modules.select(graph) for layer in self.layers]
+        for index in range(1, len(self.layers)):
+            upper_ids = [module_id for ids in layer_ids[:index] for module_id in ids]
+            rule = f"layer '{self.layers[index].name}' must not depend on upper layers"
+            yield from _check_dependencies(rule, graph, layer_ids[index], upper_ids, self.transitive, self.flags)
+
+
+class NoCycles(Rule):
+    """
+    Modules selected by the patterns (all modules of the analyzed codebase, by default) must not form
+    import cycles. A violation is reported for each cycle, i.e. each strongly connected component.
+    """
+
+    def __init__(self, *patterns: str, flags: int = ANY_IMPORT) -> None:
+        self.modules = ModuleSelector(patterns) if patterns else None
+        self.flags = flags
+
+    def __str__(self) -> str:
+        return f"modules of {self.modules} must not form cycles" if self.modules else "modules must not form cycles"
+
+    def selects(self, name: str) -> bool:
+        return self.modules is None or self.modules.matches(name)
+
+    def check(self, graph: DependencyGraph) -> t.Iterator[Violation]:
+        selected = set(self.modules.select(graph) if self.modules else map(graph.id_of, graph.modules))
+        for component in Reachability.of(graph, self.flags).components:
+            if len(component) < 2 or selected.isdisjoint(component):
+                continue
+            start = min(component)
+            members = set(component)
+            path = _find_shortest_path(
+                lambda module_id: [i for i in graph.successors(module_id, self.flags) if i in members],
+                start,
+                lambda module_id: module_id == start,
+            )
+            assert path is not None, "A strongly connected component always has a cycle"
+            yield Violation(str(self), tuple(graph.name_of(module_id) for module_id in path))
+
+
+def check_rules(graph: DependencyGraph, rules: t.Iterable[Rule]) -> t.Iterator[Violation]:
+    """Checks the rules one by one, yielding violations as soon as they are found."""
+    for rule in rules:
+        yield from rule.check(graph)
+
+
+def load_rules(dotted_qualified_name: str) -> t.List[Rule]:
+    """
+    Imports the rules designated by the name: a rule, an iterable of rules or a module with rules.
+
+    A module gives the rules listed in its `archunit_rules` attribute or, if there is none, all the rules
+    defined on the module level, in the order of definition. Raises ImportError if the import failed
+    and TypeError if the name designates anything else.
+    """
+    rules = import_dotted_name(dotted_qualified_name)
+    if isinstance(rules, ModuleType):
+        module = rules
+        rules = getattr(module, RULES_ATTRIBUTE_NAME, None)
+        if rules is None:
+            return [value for value in vars(module).values() if isinstance(value, Rule)]
+    if isinstance(rules, Rule):
+        return [rules]
+    try:
+        rules = list(rules)
+    except TypeError:
+        rules = [rules]
+    for rule in rules:
+        if not isinstance(rule, Rule):
+            raise TypeError(f"{dotted_qualified_name} gives {rule!r} instead of an architecture rule")
+    return rules
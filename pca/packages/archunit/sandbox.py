@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from types import ModuleType
+
+from .importing import (
+    find_module_spec,
+    import_dotted_name,
+    iterate_module_specs,
+)
+from .introspection import (
+    TargetReference,
+    reference_of,
+)
+from .register import (
+    _INCLUDEME_HOOK_NAME,
+    ArchUnitRegister,
+)
+from .units.base import ArchUnit
+
+DEFAULT_CHUNK_SIZE = 8
+
+
+class SerializedUnit(t.NamedTuple):
+    """An ArchUnit sent between processes: the qualified name of its type, a reference to its target & its state."""
+
+    unit_type: str
+    target: TargetReference
+    state: t.Tuple[t.Any, ...]
+
+    @classmethod
+    def of(cls, unit: ArchUnit, module: t.Optional[ModuleType] = None) -> "SerializedUnit":
+        """
+        Serializes the unit; its target has to be referable, see `introspection.reference_of`.
+
+        :param module: the module the unit has been defined by, where its target is looked up if it has
+            no qualified name of its own.
+        """
+        unit_type = type(unit)
+        state = unit.__getstate__()
+        return cls(f"{unit_type.__module__}:{unit_type.__qualname__}", reference_of(unit.target, module), state[1:])
+
+    def load(self) -> ArchUnit:
+        """Makes the unit again, with the reference in place of its target."""
+        unit_type = import_dotted_name(self.unit_type)
+        return unit_type(self.target, *self.state)
+
+
+class ImportWorkerPool:
+    """
+    Pool of persistent worker processes, which import the modules and run their `archunit_includeme` hooks
+    instead of the current process.
+
+    Importing side-effectful modules (e.g. building a web app at the import time) in the workers keeps
+    the state of the checker clean. The workers are spawned on the first use and are kept warm, so
+    the modules are imported once per worker and the following scans with the same pool just run
+    the hooks. Use `restart` when the sources have changed in the meantime.
+
+        with ImportWorkerPool(workers=2) as pool:
+            pool.autodiscover(register, "my_app")
+
+    Units come back with `TargetReference`s as their targets; their types are imported by the current
+    process, so they should be defined by a side-effect-free module.
+    """
+
+    def __init__(self, workers: t.Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor: t.Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ImportWorkerPool":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.close()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # NB: spawned workers don't inherit the modules imported by the current process
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def discover(self, where: t.Union[str, ModuleType]) -> t.Iterator[t.Tuple[str, t.List[SerializedUnit]]]:
+        """
+        Yields the names of the modules of the package which define the `archunit_includeme` hook, along with
+        the serialized units registered by their hooks, in the order of discovery.
+
+        Like `ArchUnitRegister.autodiscover`, sources are checked for the name of the hook before the modules
+        are imported (by the workers).
+        """
+        root, _ = find_module_spec(where)
+        specs = list(iterate_module_specs(where, include_packages=True))
+        if root.is_package and not root.is_namespace:
+            specs.insert(0, root)
+        hook_name = _INCLUDEME_HOOK_NAME.encode()
+        names = [spec.name for spec in specs if hook_name in spec.read_source()]
+        results = self._get_executor().map(_include_in_worker, names, chunksize=self.chunk_size)
+        for name, units in zip(names, results):
+            if units is not None:
+                yield name, units
+
+    def autodiscover(self, register: ArchUnitRegister, where: t.Union[str, ModuleType]) -> t.List[str]:
+        """
+        Registers the units of all the modules of the package which define the `archunit_includeme` hook.
+
+        :return: the names of the included modules, in the order of discovery.
+        """
+        included = []
+        for name, units in self.discover(where):
+            register.register_multiple(unit.load() for unit in units)
+            included.append(name)
+        return included
+
+    def restart(self) -> None:
+        """Stops the workers; new ones are spawned on the next use, importing the modules anew."""
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _include_in_worker(module_name: str) -> t.Optional[t.List[SerializedUnit]]:
+    module = import_module(module_name)
+    if not hasattr(module, _INCLUDEME_HOOK_NAME):
+        # the name has been found somewhere in the source, but not as a definition of the hook
+        return None
+    register = ArchUnitRegister()
+    register.include(module)
+    return [SerializedUnit.of(unit, module) for unit in register]
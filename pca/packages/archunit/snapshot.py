@@ -0,0 +1,462 @@
+"""
+Compact binary snapshots of registers, loaded back without re-running the discovery.
+
+    save_snapshot(register, "units.snapshot")
+    with load_snapshot("units.snapshot") as snapshot:
+        tags = list(snapshot.get_all_of_type(Tag))
+
+A snapshot keeps the units, their types by qualified names, their targets by `TargetReference`s (so the
+targets don't need to be imported when loading) and the indexes of the register. Strings are kept once,
+in a string table, and field values once, in a value table; units and indexes are arrays of 32-bit ids.
+Sections are aligned, so a loaded snapshot just maps the file into memory (with `mmap`) and views its
+arrays in place: units, strings and references are decoded on the first access to them.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import sys
+import typing as t
+from array import array
+from pathlib import Path
+from sys import intern
+
+from .importing import import_dotted_name
+from .introspection import (
+    TargetReference,
+    get_all_subclasses,
+    reference_of,
+)
+from .units.base import ArchUnit
+
+_MAGIC = b"PCAAUSNP"
+_VERSION = 1
+_SECTIONS = (
+    "string_offsets",
+    "string_data",
+    "value_offsets",
+    "value_data",
+    "types",
+    "targets",
+    "unit_offsets",
+    "unit_data",
+    "type_offsets",
+    "target_offsets",
+    "target_units",
+)
+_HEADER = struct.Struct(f"<8sI4x{2 * len(_SECTIONS)}Q")
+_ALIGNMENT = 8
+_ID_TYPECODE: t.Literal["I"] = "I"
+_NO_ID = 0xFFFFFFFF
+# arrays of ids: in place in the mapped file, or copied when its byte order differs
+_IdArray = t.Union[memoryview, "array[int]"]
+
+# tags of the encoded field values
+_NONE, _FALSE, _TRUE, _INT, _BIG_INT, _FLOAT, _STR, _TUPLE, _REFERENCE = range(9)
+_INT_VALUE = struct.Struct("<q")
+_FLOAT_VALUE = struct.Struct("<d")
+_UNSET = object()
+
+
+class SnapshotError(ValueError):
+    """The file isn't a snapshot (of this version of the format)."""
+
+
+def save_snapshot(units: t.Iterable[ArchUnit], path: t.Union[str, Path]) -> None:
+    """
+    Writes the units of the register (or any other collection of units) as a snapshot file.
+
+    Targets of the units and values of their fields other than None, bools, numbers, strings and tuples of
+    these have to be referable, see `introspection.reference_of`; raises TypeError otherwise. The file is
+    replaced atomically.
+    """
+    writer = _SnapshotWriter()
+    for unit in units:
+        writer.add(unit)
+    path = Path(path)
+    temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with temporary_path.open("wb") as f:
+        writer.write(f)
+    os.replace(temporary_path, path)
+
+
+def load_snapshot(path: t.Union[str, Path]) -> "SnapshotRegister":
+    """Maps the snapshot file into memory, as a read-only register; see `SnapshotRegister`."""
+    return SnapshotRegister(path)
+
+
+class _SnapshotWriter:
+    def __init__(self) -> None:
+        self.strings: t.Dict[str, int] = {}
+        self.values: t.Dict[t.Hashable, int] = {}
+        self.value_data = bytearray()
+        self.value_offsets = array(_ID_TYPECODE, [0])
+        self.types: t.Dict[t.Type[ArchUnit], int] = {}
+        self.targets: t.Dict[TargetReference, int] = {}
+        # units by the id of their type: ids of their targets & their field values
+        self.units: t.Dict[int, t.List[t.Tuple[int, ...]]] = {}
+        self.seen: t.Set[ArchUnit] = set()
+
+    def add(self, unit: ArchUnit) -> None:
+        if unit in self.seen:
+            return
+        self.seen.add(unit)
+        unit_type = type(unit)
+        type_id = self.types.get(unit_type)
+        if type_id is None:
+            type_id = self.types[unit_type] = len(self.types)
+        try:
+            target_id = self.add_target(reference_of(unit.target))
+        except TypeError as e:
+            raise TypeError(f"{unit!r} can't be saved: {e}") from None
+        state = unit.__getstate__()[1:]
+        self.units.setdefault(type_id, []).append((target_id, *(self.add_value(value, unit) for value in state)))
+
+    def add_string(self, value: str) -> int:
+        string_id = self.strings.get(value)
+        if string_id is None:
+            string_id = self.strings[value] = len(self.strings)
+        return string_id
+
+    def add_target(self, reference: TargetReference) -> int:
+        target_id = self.targets.get(reference)
+        if target_id is None:
+            target_id = self.targets[reference] = len(self.targets)
+        return target_id
+
+    def add_value(self, value: t.Any, unit: ArchUnit) -> int:
+        try:
+            key = _value_key(value)
+            value_id = self.values.get(key)
+        except TypeError:
+            raise TypeError(f"{unit!r} can't be saved: {value!r} isn't hashable") from None
+        if value_id is None:
+            self.value_data += self.encode_value(value, unit)
+            value_id = self.values[key] = len(self.value_offsets) - 1
+            self.value_offsets.append(len(self.value_data))
+        return value_id
+
+    def encode_value(self, value: t.Any, unit: ArchUnit) -> bytes:
+        if value is None:
+            return bytes((_NONE,))
+        if type(value) is bool:
+            return bytes((_TRUE if value else _FALSE,))
+        if type(value) is int:
+            if -(2**63) <= value < 2**63:
+                return bytes((_INT,)) + _INT_VALUE.pack(value)
+            return bytes((_BIG_INT,)) + array(_ID_TYPECODE, [self.add_string(str(value))]).tobytes()
+        if type(value) is float:
+            return bytes((_FLOAT,)) + _FLOAT_VALUE.pack(value)
+        if type(value) is str:
+            return bytes((_STR,)) + array(_ID_TYPECODE, [self.add_string(value)]).tobytes()
+        if type(value) is tuple:
+            item_ids = [self.add_value(item, unit) for item in value]
+            return bytes((_TUPLE,)) + array(_ID_TYPECODE, [len(item_ids), *item_ids]).tobytes()
+        try:
+            reference = reference_of(value)
+        except TypeError as e:
+            raise TypeError(f"{unit!r} can't be saved: {e}") from None
+        return bytes((_REFERENCE,)) + array(_ID_TYPECODE, [self.add_target(reference)]).tobytes()
+
+    def write(self, f: t.BinaryIO) -> None:
+        sections = self.build_sections()
+        offset = _align(_HEADER.size)
+        locations: t.List[int] = []
+        for name in _SECTIONS:
+            locations.extend((offset, len(sections[name])))
+            offset = _align(offset + len(sections[name]))
+        f.write(_HEADER.pack(_MAGIC, _VERSION, *locations))
+        for name in _SECTIONS:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(sections[name])
+
+    def build_sections(self) -> t.Dict[str, bytes]:
+        types = array(_ID_TYPECODE, [self.add_string(_qualified_name(unit_type)) for unit_type in self.types])
+        targets = array(_ID_TYPECODE)
+        for reference in self.targets:
+            qualname = reference.qualname
+            targets.extend(
+                (self.add_string(reference.module), _NO_ID if qualname is None else self.add_string(qualname))
+            )
+
+        # units are ordered by their types, so the index of types is just the offsets of these runs
+        unit_offsets = array(_ID_TYPECODE, [0])
+        unit_data = array(_ID_TYPECODE)
+        type_offsets = array(_ID_TYPECODE, [0])
+        units_per_target: t.List[t.List[int]] = [[] for _ in self.targets]
+        unit_id = 0
+        for type_id in range(len(self.types)):
+            for record in self.units.get(type_id, ()):
+                unit_data.extend(record)
+                unit_offsets.append(len(unit_data))
+                units_per_target[record[0]].append(unit_id)
+                unit_id += 1
+            type_offsets.append(unit_id)
+        target_offsets = array(_ID_TYPECODE, [0])
+        target_units = array(_ID_TYPECODE)
+        for unit_ids in units_per_target:
+            target_units.extend(unit_ids)
+            target_offsets.append(len(target_units))
+
+        encoded_strings = [value.encode("utf-8", "surrogatepass") for value in self.strings]
+        string_offsets = array(_ID_TYPECODE, [0])
+        for encoded in encoded_strings:
+            string_offsets.append(string_offsets[-1] + len(encoded))
+        arrays = {
+            "string_offsets": string_offsets,
+            "value_offsets": self.value_offsets,
+            "types": types,
+            "targets": targets,
+            "unit_offsets": unit_offsets,
+            "unit_data": unit_data,
+            "type_offsets": type_offsets,
+            "target_offsets": target_offsets,
+            "target_units": target_units,
+        }
+        if sys.byteorder == "big":  # pragma: no cover
+            for values in arrays.values():
+                values.byteswap()
+        sections = {name: values.tobytes() for name, values in arrays.items()}
+        sections["string_data"] = b"".join(encoded_strings)
+        sections["value_data"] = bytes(self.value_data)
+        return sections
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _value_key(value: t.Any) -> t.Hashable:
+    # NB: types of the items too, as equal values of different types, e.g. `(True,)` and `(1,)`, are saved apart
+    if type(value) is tuple:
+        return (tuple, tuple(_value_key(item) for item in value))
+    if type(value) is float:
+        # NB: `0.0 == -0.0`, with equal hashes, so they would share a value
+        return (float, value.hex())
+    return (type(value), value)
+
+
+def _qualified_name(unit_type: type) -> str:
+    return f"{unit_type.__module__}:{unit_type.__qualname__}"
+
+
+class SnapshotRegister(t.Collection[ArchUnit]):
+    """
+    Read-only register mapped from a snapshot file, see `save_snapshot`.
+
+    Opening a snapshot reads just its header: the arrays of the file are used in place, and units are made
+    on the first access to them (importing their types). Targets of the units are `TargetReference`s; queries
+    for targets given as objects look them up by their references. Use `ArchUnitRegister.register_multiple`
+    to make a mutable copy.
+
+    The file stays mapped until the register is closed (or used as a context manager).
+    """
+
+    def __init__(self, path: t.Union[str, Path]) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._map_sections()
+        except (struct.error, TypeError, ValueError) as e:
+            self._mmap.close()
+            raise SnapshotError(f"{path} isn't a valid snapshot: {e}") from None
+        self._strings: t.List[t.Optional[str]] = [None] * (len(self._string_offsets) - 1)
+        self._references: t.List[t.Optional[TargetReference]] = [None] * (len(self._targets) // 2)
+        self._values: t.List[t.Any] = [_UNSET] * (len(self._value_offsets) - 1)
+        self._units: t.List[t.Optional[ArchUnit]] = [None] * (len(self._unit_offsets) - 1)
+        self._unit_types: t.Optional[t.List[t.Type[ArchUnit]]] = None
+        self._target_ids: t.Optional[t.Dict[TargetReference, int]] = None
+
+    def _map_sections(self) -> None:
+        magic, version, *locations = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise SnapshotError(f"unknown format: {magic!r}, version {version}")
+        view = memoryview(self._mmap)
+        sections = {
+            name: view[locations[2 * index] : locations[2 * index] + locations[2 * index + 1]]
+            for index, name in enumerate(_SECTIONS)
+        }
+        self._string_data = sections["string_data"]
+        self._value_data = sections["value_data"]
+        self._views = [view, *sections.values()]
+        arrays: t.Dict[str, _IdArray] = {}
+        for name, section in sections.items():
+            if name in ("string_data", "value_data"):
+                continue
+            if sys.byteorder == "big":  # pragma: no cover
+                values = array(_ID_TYPECODE, section.tobytes())
+                values.byteswap()
+                arrays[name] = values
+            else:
+                casted = section.cast(_ID_TYPECODE)
+                self._views.append(casted)
+                arrays[name] = casted
+        self._string_offsets = arrays["string_offsets"]
+        self._value_offsets = arrays["value_offsets"]
+        self._types = arrays["types"]
+        self._targets = arrays["targets"]
+        self._unit_offsets = arrays["unit_offsets"]
+        self._unit_data = arrays["unit_data"]
+        self._type_offsets = arrays["type_offsets"]
+        self._target_offsets = arrays["target_offsets"]
+        self._target_units = arrays["target_units"]
+
+    def __enter__(self) -> "SnapshotRegister":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmaps the file; units already made stay valid, but the register can't be queried anymore."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __iter__(self) -> t.Iterator[ArchUnit]:
+        for type_id in range(len(self._types)):
+            yield from self._get_units_of_type(type_id)
+
+    def __contains__(self, unit: object) -> bool:
+        if not isinstance(unit, ArchUnit):
+            return False
+        return unit in self.get_all_for_target(unit.target)
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def freeze(self) -> "SnapshotRegister":
+        return self
+
+    def get_all_of_type(self, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        subclasses = set(get_all_subclasses(unit_type))
+        for type_id, snapshot_type in enumerate(self._get_unit_types()):
+            if snapshot_type in subclasses:
+                yield from self._get_units_of_type(type_id)
+
+    def get_all_for_target(self, target: t.Any) -> t.Iterable[ArchUnit]:
+        target_id = self._find_target_id(target)
+        if target_id is None:
+            return ()
+        start, end = self._target_offsets[target_id], self._target_offsets[target_id + 1]
+        return [self._get_unit(unit_id) for unit_id in self._target_units[start:end].tolist()]
+
+    def get_all_of_type_for_target(self, target: t.Any, unit_type: t.Type[ArchUnit]) -> t.Iterable[ArchUnit]:
+        return [unit for unit in self.get_all_for_target(target) if isinstance(unit, unit_type)]
+
+    def count_all_of_type(self, unit_type: t.Type[ArchUnit]) -> int:
+        subclasses = set(get_all_subclasses(unit_type))
+        return sum(
+            self._type_offsets[type_id + 1] - self._type_offsets[type_id]
+            for type_id, snapshot_type in enumerate(self._get_unit_types())
+            if snapshot_type in subclasses
+        )
+
+    def count_all_for_target(self, target: t.Any) -> int:
+        target_id = self._find_target_id(target)
+        if target_id is None:
+            return 0
+        return self._target_offsets[target_id + 1] - self._target_offsets[target_id]
+
+    def _find_target_id(self, target: t.Any) -> t.Optional[int]:
+        try:
+            reference = reference_of(target)
+        except TypeError:
+            return None
+        if self._target_ids is None:
+            self._target_ids = {self._get_reference(index): index for index in range(len(self._references))}
+        return self._target_ids.get(reference)
+
+    def _get_unit_types(self) -> t.List[t.Type[ArchUnit]]:
+        if self._unit_types is None:
+            self._unit_types = [import_dotted_name(self._get_string(string_id)) for string_id in self._types]
+        return self._unit_types
+
+    def _get_unit(self, unit_id: int) -> ArchUnit:
+        unit = self._units[unit_id]
+        if unit is None:
+            # NB: units are ordered by their types, and there are few types
+            type_id = bisect.bisect_right(self._type_offsets, unit_id) - 1
+            unit = self._make_units(type_id, unit_id, unit_id + 1)[0]
+        return unit
+
+    def _get_units_of_type(self, type_id: int) -> t.List[ArchUnit]:
+        start, end = self._type_offsets[type_id], self._type_offsets[type_id + 1]
+        units = self._units[start:end]
+        if None in units:
+            return self._make_units(type_id, start, end)
+        return units  # type: ignore
+
+    def _make_units(self, type_id: int, start: int, end: int) -> t.List[ArchUnit]:
+        # NB: like unpickling, this restores the state of the units saved, without calling their `__init__`;
+        # strings of the snapshot are interned already
+        unit_type = self._get_unit_types()[type_id]
+        field_names = unit_type._archunit_fields
+        width = len(field_names)
+        offsets = self._unit_offsets[start : end + 1].tolist()
+        if offsets[-1] - offsets[0] != width * (end - start):
+            raise SnapshotError(f"fields of {_qualified_name(unit_type)} have changed since the snapshot was saved")
+        records = self._unit_data[offsets[0] : offsets[-1]].tolist()
+        get_reference, get_value, new, set_field = (
+            self._get_reference,
+            self._get_value,
+            unit_type.__new__,
+            object.__setattr__,
+        )
+        units = self._units
+        for unit_id, offset in zip(range(start, end), range(0, len(records), width)):
+            if units[unit_id] is None:
+                unit = new(unit_type)
+                set_field(unit, "target", get_reference(records[offset]))
+                for name, value_id in zip(field_names[1:], records[offset + 1 : offset + width]):
+                    set_field(unit, name, get_value(value_id))
+                units[unit_id] = unit
+        return units[start:end]  # type: ignore
+
+    def _get_string(self, string_id: int) -> str:
+        value = self._strings[string_id]
+        if value is None:
+            start, end = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+            value = self._strings[string_id] = intern(str(self._string_data[start:end], "utf-8", "surrogatepass"))
+        return value
+
+    def _get_reference(self, target_id: int) -> TargetReference:
+        reference = self._references[target_id]
+        if reference is None:
+            module, qualname = self._targets[2 * target_id], self._targets[2 * target_id + 1]
+            reference = self._references[target_id] = TargetReference(
+                self._get_string(module), None if qualname == _NO_ID else self._get_string(qualname)
+            )
+        return reference
+
+    def _get_value(self, value_id: int) -> t.Any:
+        value = self._values[value_id]
+        if value is not _UNSET:
+            return value
+        data = self._value_data
+        start = self._value_offsets[value_id]
+        tag = data[start]
+        if tag == _NONE:
+            value = None
+        elif tag in (_FALSE, _TRUE):
+            value = tag == _TRUE
+        elif tag == _INT:
+            value = _INT_VALUE.unpack_from(data, start + 1)[0]
+        elif tag == _FLOAT:
+            value = _FLOAT_VALUE.unpack_from(data, start + 1)[0]
+        else:
+            ids = data[start + 1 : self._value_offsets[value_id + 1]].cast(_ID_TYPECODE).tolist()
+            if tag == _STR:
+                value = self._get_string(ids[0])
+            elif tag == _BIG_INT:
+                value = int(self._get_string(ids[0]))
+            elif tag == _TUPLE:
+                value = tuple(self._get_value(item_id) for item_id in ids[1:])
+            elif tag == _REFERENCE:
+                value = self._get_reference(ids[0])
+            else:
+                raise SnapshotError(f"unknown tag of value {value_id}: {tag}")
+        self._values[value_id] = value
+        return value
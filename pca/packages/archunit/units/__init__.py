@@ -1,3 +1,35 @@
-from .application import *  # noqa: F401, F403
-from .base import *  # noqa: F401, F403
-from .common import *  # noqa: F401, F403
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .application import *  # noqa: F401, F403
+    from .base import *  # noqa: F401, F403
+    from .common import *  # noqa: F401, F403
+    from .profiling import *  # noqa: F401, F403
+    from .routing import *  # noqa: F401, F403
+
+# units exported by the package, imported on the first access (PEP 562), so that using one of them
+# doesn't import the modules of all the others; keep in sync with `__all__` of the modules of the package
+_LAZY_NAMES = {
+    "ArchUnit": ".base",
+    "ArchUnitMeta": ".base",
+    "Application": ".application",
+    "Tag": ".common",
+    "ImportCost": ".profiling",
+    "Blueprint": ".routing",
+    "BlueprintGroup": ".routing",
+    "Route": ".routing",
+}
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(import_module(_LAZY_NAMES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_NAMES])
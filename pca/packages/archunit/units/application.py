@@ -1,5 +1,7 @@
 from .base import ArchUnit
 
+__all__ = ["Application"]
+
 
 class Application(ArchUnit):
     """Represents Application object from C4 Model: Component level"""
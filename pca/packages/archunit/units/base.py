@@ -1,10 +1,134 @@
 import typing as t
-from dataclasses import dataclass
+from dataclasses import (
+    InitVar,
+    dataclass,
+    fields,
+)
+from functools import wraps
+from sys import intern
+
+from ..introspection import SubclassesIndex
+
+__all__ = ["ArchUnit", "ArchUnitMeta"]
+
+if t.TYPE_CHECKING:
+    from typing_extensions import dataclass_transform as _dataclass_transform
+else:
+
+    def _dataclass_transform(**kwargs):
+        # NB: it only tells the type checkers that the ArchUnits are dataclasses
+        return lambda cls: cls
+
+
+# the index of the ArchUnit type hierarchy, invalidated whenever a new ArchUnit type is defined
+_subclasses_index = SubclassesIndex()
+
+_HASH_CACHE = "_archunit_hash"
+_SLOT_DEFAULTS = "__archunit_slot_defaults__"
+
+
+@_dataclass_transform(frozen_default=True)
+class ArchUnitMeta(type):
+    """
+    Metaclass of the ArchUnits, which makes them compact on demand:
+
+        class Label(ArchUnit, compact=True):
+            value: str
+
+    Compact units have `__slots__` instead of `__dict__`, compute their hash only once and intern values
+    of their `str` fields (but the `target`, which is compared by identity). Slots have to be declared
+    before the class is created, hence the metaclass.
+    """
+
+    def __new__(mcs, name: str, bases: t.Tuple[type, ...], namespace: t.Dict[str, t.Any], compact: bool = False):
+        if compact:
+            namespace = _make_compact_namespace(bases, namespace)
+        return super().__new__(mcs, name, bases, namespace)
+
+
+def _make_compact_namespace(bases: t.Tuple[type, ...], namespace: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    namespace = dict(namespace)
+    field_names = [
+        name for name, annotation in namespace.get("__annotations__", {}).items() if not _is_pseudo_field(annotation)
+    ]
+    # defaults can't be class attributes, as they would collide with the slots; they are brought back
+    # while the dataclass is being made, see `ArchUnit.__init_subclass__`
+    namespace[_SLOT_DEFAULTS] = {name: namespace.pop(name) for name in field_names if name in namespace}
+    slots = tuple(field_names)
+    if not any(hasattr(base, _HASH_CACHE) for base in bases):
+        slots += (_HASH_CACHE,)
+    namespace["__slots__"] = slots
+    namespace["__hash__"] = _get_cached_hash
+    return namespace
+
+
+def _is_pseudo_field(annotation: t.Any) -> bool:
+    if isinstance(annotation, str):
+        return annotation.split("[", 1)[0].rpartition(".")[2] in ("ClassVar", "InitVar")
+    return t.get_origin(annotation) is t.ClassVar or annotation is t.ClassVar or isinstance(annotation, InitVar)
+
+
+def _get_cached_hash(self: "ArchUnit") -> int:
+    try:
+        return getattr(self, _HASH_CACHE)
+    except AttributeError:
+        value = hash(tuple(getattr(self, name) for name in type(self)._archunit_hash_fields))
+        object.__setattr__(self, _HASH_CACHE, value)
+        return value
 
 
 @dataclass(frozen=True)
-class ArchUnit:
+class ArchUnit(metaclass=ArchUnitMeta):
+    __slots__ = ("target",)
+
     target: t.Any
 
+    # names of the fields: all of them, these taking part in the hash and these with interned values
+    _archunit_fields: t.ClassVar[t.Tuple[str, ...]] = ("target",)
+    _archunit_hash_fields: t.ClassVar[t.Tuple[str, ...]] = ("target",)
+    _archunit_interned_fields: t.ClassVar[t.Tuple[str, ...]] = ()
+
     def __init_subclass__(cls) -> None:
-        dataclass(cls, frozen=True)  # type: ignore
+        slot_defaults = cls.__dict__.get(_SLOT_DEFAULTS)
+        if slot_defaults is None:
+            dataclass(cls, frozen=True)  # type: ignore
+        else:
+            _make_compact_dataclass(cls, slot_defaults)
+        cls._archunit_fields = tuple(f.name for f in fields(cls))
+        _subclasses_index.invalidate()
+
+    def __getstate__(self) -> t.Tuple[t.Any, ...]:
+        # NB: the cached hash isn't a part of the state, as hashes of strings differ between processes
+        return tuple(getattr(self, name) for name in self._archunit_fields)
+
+    def __setstate__(self, state: t.Tuple[t.Any, ...]) -> None:
+        for name, value in zip(self._archunit_fields, state):
+            if name in self._archunit_interned_fields and type(value) is str:
+                value = intern(value)
+            object.__setattr__(self, name, value)
+
+
+def _make_compact_dataclass(cls: t.Type[ArchUnit], slot_defaults: t.Dict[str, t.Any]) -> None:
+    slot_descriptors = {name: cls.__dict__[name] for name in slot_defaults}
+    for name, default in slot_defaults.items():
+        setattr(cls, name, default)
+    dataclass(cls, frozen=True)  # type: ignore
+    for name, descriptor in slot_descriptors.items():
+        setattr(cls, name, descriptor)
+
+    cls._archunit_hash_fields = tuple(f.name for f in fields(cls) if (f.compare if f.hash is None else f.hash))
+    cls._archunit_interned_fields = tuple(f.name for f in fields(cls) if f.name != "target" and f.type in (str, "str"))
+    if cls._archunit_interned_fields:
+        cls.__init__ = _interning(cls.__init__, cls._archunit_interned_fields)  # type: ignore
+
+
+def _interning(init: t.Callable[..., None], field_names: t.Tuple[str, ...]) -> t.Callable[..., None]:
+    @wraps(init)
+    def __init__(self: ArchUnit, *args: t.Any, **kwargs: t.Any) -> None:
+        init(self, *args, **kwargs)
+        for name in field_names:
+            value = getattr(self, name)
+            if type(value) is str:
+                object.__setattr__(self, name, intern(value))
+
+    return __init__
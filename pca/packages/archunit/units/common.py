@@ -1,5 +1,7 @@
 from .base import ArchUnit
 
+__all__ = ["Tag"]
+
 
 class Tag(ArchUnit):
     """Tag marks any object an arbitrary string marker."""
@@ -0,0 +1,15 @@
+from .base import ArchUnit
+
+__all__ = ["ImportCost"]
+
+
+class ImportCost(ArchUnit, compact=True):
+    """
+    Cost of importing the target module: the time & the memory allocated (as traced by `tracemalloc`)
+    by its own code, and cumulatively, including the modules imported by it for the first time.
+    """
+
+    self_ns: int
+    cumulative_ns: int
+    self_bytes: int = 0
+    cumulative_bytes: int = 0
@@ -0,0 +1,28 @@
+import typing as t
+
+from .base import ArchUnit
+
+__all__ = ["Blueprint", "BlueprintGroup", "Route"]
+
+
+class Blueprint(ArchUnit, compact=True):
+    """Represents a blueprint of a web app: a named set of its routes, under a common URL prefix."""
+
+    name: str
+    url_prefix: t.Optional[str] = None
+
+
+class BlueprintGroup(ArchUnit, compact=True):
+    """Represents a group of blueprints of a web app, under a common URL prefix."""
+
+    blueprints: t.Tuple[t.Any, ...] = ()
+    url_prefix: t.Optional[str] = None
+
+
+class Route(ArchUnit, compact=True):
+    """Represents a route of a web app: its target is the handler of the URI, declared on the router (app or blueprint)."""
+
+    uri: str
+    router: t.Any = None
+    methods: t.Tuple[str, ...] = ()
+    websocket: bool = False
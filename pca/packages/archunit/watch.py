@@ -0,0 +1,254 @@
+import os
+import time
+import typing as t
+from itertools import chain
+from pathlib import Path
+from types import ModuleType
+
+from .analysis import analyze_modules
+from .archives import stat_file
+from .graph import (
+    DependencyGraph,
+    ImportResolver,
+    ModuleImports,
+    extract_imports,
+)
+from .importing import (
+    ModuleSpec,
+    find_module_spec,
+    scan_directory,
+    walk_module_specs,
+)
+from .rules import (
+    Rule,
+    Violation,
+)
+
+DEFAULT_INTERVAL = 0.5
+
+
+class _ModuleState(t.NamedTuple):
+    spec: ModuleSpec
+    mtime_ns: int
+    size: int
+
+
+class _DirectoryState(t.NamedTuple):
+    package_name: str
+    mtime_ns: int
+    specs: t.List[ModuleSpec]
+    # NB: `os.stat` of a str is faster than of a Path, which matters for thousands of files polled
+    paths: t.Dict[str, str]
+    # the subdirectories with their modification times: adding or removing the `__init__` file of
+    # a subpackage changes the subdirectory only, yet it changes the kind of the package in the listing
+    subdirectories: t.Tuple[t.Tuple[str, int], ...]
+
+
+class WatchResult(t.NamedTuple):
+    """Outcome of a (re)check: what has changed, what has been checked again and all the current violations."""
+
+    changed: t.Tuple[str, ...]
+    analyzed: int
+    checked_rules: t.Tuple[Rule, ...]
+    violations: t.Tuple[Violation, ...]
+    duration: float
+
+
+class Watcher:
+    """
+    Checks the rules against the package and re-checks them incrementally, when its modules change.
+
+    The index of the modules, their resolved imports, the dependency graph and the violations of each rule
+    are kept between the checks. Changes are found by polling: a directory is scanned again (with
+    `os.scandir`) only if its modification time or the modification time of any of its subdirectories
+    has changed, and the module files are stat-ed.
+    On a change, only the changed modules are parsed again, and only the rules selecting the changed modules
+    or their (transitive) reverse dependents are evaluated again. Adding or removing a module may change
+    how the imports of any other module resolve, so then all the imports are resolved and all the rules
+    are evaluated again, still without parsing the unchanged modules.
+
+        watcher = Watcher("my_app", rules)
+        watcher.watch(print_result)
+    """
+
+    def __init__(
+        self,
+        target: t.Union[str, ModuleType],
+        rules: t.Iterable[Rule],
+        recursive: bool = True,
+        jobs: int = 1,
+    ) -> None:
+        self.target = target
+        self.rules = list(rules)
+        self.recursive = recursive
+        self.jobs = jobs
+        self.graph: t.Optional[DependencyGraph] = None
+        self._directories: t.Dict[str, _DirectoryState] = {}
+        self._states: t.Dict[str, _ModuleState] = {}
+        self._imports: t.Dict[str, ModuleImports] = {}
+        self._resolver: t.Optional[ImportResolver] = None
+        self._edges: t.Dict[str, t.List[t.Tuple[int, int, int]]] = {}
+        self._violations: t.List[t.List[Violation]] = [[] for _ in self.rules]
+
+    @property
+    def violations(self) -> t.Tuple[Violation, ...]:
+        return tuple(violation for rule_violations in self._violations for violation in rule_violations)
+
+    def check(self) -> WatchResult:
+        """Checks all the rules, analyzing the modules changed since the last check, if there was any."""
+        result = self.poll()
+        if result is not None:
+            return result
+        return WatchResult((), 0, (), self.violations, 0.0)
+
+    def poll(self) -> t.Optional[WatchResult]:
+        """Re-checks the rules affected by the modules changed since the last check; `None` if nothing changed."""
+        start = time.perf_counter()
+        states = self._scan()
+        changed = [name for name, state in states.items() if self._states.get(name) != state]
+        removed = [name for name in self._states if name not in states]
+        if self.graph is not None and not changed and not removed:
+            return None
+        structure_changed = self.graph is None or bool(removed) or any(name not in self._states for name in changed)
+        self._states = states
+
+        specs = [states[name].spec for name in changed]
+        results: t.Iterable[ModuleImports] = analyze_modules(specs, extract_imports, jobs=self.jobs)
+        for name, imports in zip(changed, results):
+            self._imports[name] = imports
+        for name in removed:
+            del self._imports[name]
+        if structure_changed or self._resolver is None:
+            self._resolver = ImportResolver(states)
+            self._edges = {name: self._resolver.resolve_module(self._imports[name]) for name in states}
+        else:
+            for name in changed:
+                self._edges[name] = self._resolver.resolve_module(self._imports[name])
+        previous_graph = self.graph
+        self.graph = graph = DependencyGraph(
+            self._resolver.names, self._resolver.internal_count, chain.from_iterable(self._edges.values())
+        )
+
+        if structure_changed or previous_graph is None:
+            rule_indexes: t.Iterable[int] = range(len(self.rules))
+        else:
+            affected = _dependents(previous_graph, changed) | _dependents(graph, changed)
+            rule_indexes = [
+                index for index, rule in enumerate(self.rules) if any(rule.selects(name) for name in affected)
+            ]
+        checked_rules = []
+        for index in rule_indexes:
+            rule = self.rules[index]
+            self._violations[index] = list(rule.check(graph))
+            checked_rules.append(rule)
+        return WatchResult(
+            tuple(changed + removed), len(specs), tuple(checked_rules), self.violations, time.perf_counter() - start
+        )
+
+    def watch(
+        self,
+        callback: t.Callable[[WatchResult], t.Any],
+        interval: float = DEFAULT_INTERVAL,
+        iterations: t.Optional[int] = None,
+    ) -> None:
+        """
+        Checks the rules and then polls for changes every `interval` seconds, passing each result to the callback.
+
+        :param iterations: number of polls to make; polls forever by default.
+        """
+        callback(self.check())
+        polls = 0
+        while iterations is None or polls < iterations:
+            time.sleep(interval)
+            polls += 1
+            result = self.poll()
+            if result is not None:
+                callback(result)
+
+    def _scan(self) -> t.Dict[str, _ModuleState]:
+        root, search_locations = find_module_spec(self.target)
+        directories: t.Dict[str, _DirectoryState] = {}
+        paths_by_name: t.Dict[str, str] = {root.name: str(root.path)}
+        # NB: a subdirectory is stat-ed once per scan, both as a subdirectory and as a directory scanned later on
+        mtimes: t.Dict[str, int] = {}
+
+        def stat_directory(path: str) -> int:
+            mtime_ns = mtimes.get(path)
+            if mtime_ns is None:
+                mtime_ns = mtimes[path] = _stat(path)[0]
+            return mtime_ns
+
+        def scan_cached_directory(package_name: str, directory: Path, include_namespaces: bool) -> t.List[ModuleSpec]:
+            path = str(directory)
+            mtime_ns = stat_directory(path)
+            if mtime_ns < 0:
+                return []
+            state = self._directories.get(path)
+            if (
+                state is None
+                or state.mtime_ns != mtime_ns
+                or state.package_name != package_name
+                or any(stat_directory(subpath) != sub_mtime_ns for subpath, sub_mtime_ns in state.subdirectories)
+            ):
+                # NB: the directories are stat-ed before they're scanned, so a change during the scan isn't missed
+                subdirectories = tuple((subpath, stat_directory(subpath)) for subpath in _list_subdirectories(path))
+                specs = scan_directory(package_name, directory, include_namespaces)
+                paths = {spec.name: str(spec.path) for spec in specs}
+                state = _DirectoryState(package_name, mtime_ns, specs, paths, subdirectories)
+            directories[path] = state
+            paths_by_name.update(state.paths)
+            return state.specs
+
+        specs = list(walk_module_specs(root, search_locations, self.recursive, True, scan_cached_directory))
+        if root.is_package:
+            specs.insert(0, root)
+        self._directories = directories
+        states = {}
+        for spec in specs:
+            if spec.is_namespace:
+                states[spec.name] = _ModuleState(spec, 0, 0)
+                continue
+            mtime_ns, size = _stat(paths_by_name[spec.name])
+            if mtime_ns < 0:
+                # removed in the meantime
+                continue
+            states[spec.name] = _ModuleState(spec, mtime_ns, size)
+        return states
+
+
+def _list_subdirectories(path: str) -> t.List[str]:
+    """
+    The subdirectories which may be packages; none for a directory inside a zip archive,
+    as the whole archive changes along with any of its directories, see `_stat`.
+    """
+    try:
+        with os.scandir(path) as entries:
+            return [entry.path for entry in entries if entry.name.isidentifier() and entry.is_dir()]
+    except OSError:
+        return []
+
+
+def _stat(path: str) -> t.Tuple[int, int]:
+    """The modification time & the size of the file or directory; `(-1, -1)` if there is none."""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        pass
+    try:
+        # a module or a directory inside a zip archive changes along with the archive
+        return stat_file(path)
+    except OSError:
+        return -1, -1
+
+
+def _dependents(graph: DependencyGraph, names: t.Iterable[str]) -> t.Set[str]:
+    """The modules and all the modules depending on them, directly or not."""
+    stack = [graph.id_of(name) for name in names if name in graph]
+    seen = set(stack)
+    while stack:
+        for predecessor in graph.predecessors(stack.pop()):
+            if predecessor not in seen:
+                seen.add(predecessor)
+                stack.append(predecessor)
+    return {graph.name_of(module_id) for module_id in seen}
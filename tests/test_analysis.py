@@ -0,0 +1,44 @@
+import ast
+import typing as t
+
+import pytest
+
+from pca.packages.archunit.analysis import (
+    analyze_modules,
+    parse_module,
+)
+from pca.packages.archunit.importing import (
+    ModuleSpec,
+    iterate_module_specs,
+    iterate_modules,
+)
+
+
+def count_functions(spec: ModuleSpec) -> t.Tuple[str, int]:
+    return spec.name, sum(isinstance(node, ast.FunctionDef) for node in ast.walk(parse_module(spec)))
+
+
+class TestAnalyzeModules:
+    def test_parse_module(self) -> None:
+        spec = next(iterate_module_specs("pca.packages.archunit.analysis"))
+        tree = parse_module(spec)
+        assert "analyze_modules" in {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+
+    def test_parse_namespace_package(self) -> None:
+        spec = next(iterate_module_specs("importing_test_package", include_packages=True))
+        assert spec.is_namespace
+        assert parse_module(spec).body == []
+
+    @pytest.mark.parametrize("jobs, chunk_size", [(1, 32), (2, 1), (2, 2), (3, 32)])
+    def test_order(self, jobs: int, chunk_size: int) -> None:
+        specs = list(iterate_module_specs("pca.packages.archunit", include_packages=True))
+        results: t.List[t.Tuple[str, int]] = list(
+            analyze_modules(specs, count_functions, jobs=jobs, chunk_size=chunk_size)
+        )
+        assert [name for name, _ in results] == [spec.name for spec in specs]
+        assert dict(results)["pca.packages.archunit.analysis"] == 4
+
+    def test_imported_modules(self) -> None:
+        modules = list(iterate_modules("importing_test_package"))
+        results: t.Iterable[t.Tuple[str, int]] = analyze_modules(modules, count_functions, jobs=2)
+        assert [name for name, _ in results] == [module.__name__ for module in modules]
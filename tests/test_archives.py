@@ -0,0 +1,119 @@
+import sys
+import typing as t
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from pca.packages.archunit.archives import (
+    ArchiveError,
+    ArchiveIndex,
+    clear_archive_indexes,
+    find_archive,
+    read_file,
+    stat_file,
+)
+from pca.packages.archunit.cache import ScanCache
+from pca.packages.archunit.graph import build_dependency_graph
+from pca.packages.archunit.importing import (
+    clear_resolution_cache,
+    iterate_module_specs,
+    iterate_modules,
+)
+
+SOURCES = {
+    "zipped_app/__init__.py": "",
+    "zipped_app/models.py": "import os\n",
+    "zipped_app/views.py": "from zipped_app import models\n" + "# padding\n" * 100,
+    "zipped_app/sub/__init__.py": "",
+    "zipped_app/sub/helpers.py": "from ..models import os\n",
+    # NB: `zipimport` imports namespace packages only if their directories have entries in the archive
+    "zipped_app/implicit/": "",
+    "zipped_app/implicit/spam.py": "from zipped_app.sub import helpers\n",
+    "zipped_app/not_importable/eggs.py": "",
+    "zipped_app/data.txt": "not a module\n",
+}
+
+
+def write_archive(path: Path, prefix: bytes = b"", compression: int = zipfile.ZIP_DEFLATED) -> Path:
+    path.write_bytes(prefix)
+    with zipfile.ZipFile(path, "a", compression=compression) as archive:
+        for name, source in SOURCES.items():
+            archive.writestr(name, source)
+    return path
+
+
+@pytest.fixture
+def zipped_app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> t.Iterator[Path]:
+    # a zipapp: the archive follows a shebang line
+    archive = write_archive(tmp_path / "app.pyz", prefix=b"#!/usr/bin/env python3\n")
+    monkeypatch.syspath_prepend(str(archive))
+    yield archive
+    for name in [name for name in sys.modules if name.startswith("zipped_app")]:
+        del sys.modules[name]
+    clear_resolution_cache()
+    clear_archive_indexes()
+
+
+class TestArchiveIndex:
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2])
+    def test_read(self, tmp_path: Path, compression: int) -> None:
+        index = ArchiveIndex(str(write_archive(tmp_path / "app.zip", b"#!python\n", compression)))
+        members = {name: source for name, source in SOURCES.items() if not name.endswith("/")}
+        assert set(index.members) == set(members)
+        for name, source in members.items():
+            assert index.read(name) == source.encode()
+
+    def test_directories(self, tmp_path: Path) -> None:
+        index = ArchiveIndex(str(write_archive(tmp_path / "app.zip")))
+        entries = index.list_directory("zipped_app")
+        assert entries is not None
+        assert [(entry.name, entry.is_dir()) for entry in entries] == [
+            ("__init__.py", False),
+            ("data.txt", False),
+            ("implicit", True),
+            ("models.py", False),
+            ("sub", True),
+            ("views.py", False),
+        ]
+        assert entries[2].path == str(tmp_path / "app.zip" / "zipped_app" / "implicit")
+        assert index.list_directory("zipped_app/eggs") is None
+
+    def test_not_an_archive(self, tmp_path: Path) -> None:
+        path = tmp_path / "app.zip"
+        path.write_bytes(b"PK" * 10)
+        with pytest.raises(ArchiveError):
+            ArchiveIndex(str(path))
+        assert find_archive(str(path / "zipped_app")) is None
+
+    def test_files(self, zipped_app: Path) -> None:
+        member = zipped_app / "zipped_app" / "models.py"
+        assert read_file(str(member)) == b"import os\n"
+        assert stat_file(str(member)) == (zipped_app.stat().st_mtime_ns, len(b"import os\n"))
+        with pytest.raises(OSError):
+            read_file(str(zipped_app / "zipped_app" / "eggs.py"))
+        with pytest.raises(OSError):
+            stat_file(str(zipped_app / "zipped_app" / "eggs.py"))
+
+
+class TestZippedModules:
+    @pytest.mark.parametrize("kwargs", [{}, {"include_packages": True}, {"recursive": False}])
+    def test_same_as_iterate_modules(self, zipped_app: Path, kwargs: dict) -> None:
+        specs = [spec.name for spec in iterate_module_specs("zipped_app", **kwargs)]
+        assert specs == [module.__name__ for module in iterate_modules("zipped_app", **kwargs)]
+        assert "zipped_app.models" in specs
+
+    def test_specs(self, zipped_app: Path) -> None:
+        specs = {spec.name: spec for spec in iterate_module_specs("zipped_app", include_packages=True)}
+        assert specs["zipped_app.implicit"].is_namespace
+        assert specs["zipped_app.sub"].path == zipped_app / "zipped_app" / "sub" / "__init__.py"
+        assert specs["zipped_app.sub.helpers"].read_source() == b"from ..models import os\n"
+        assert "zipped_app" not in sys.modules
+
+    def test_dependency_graph(self, zipped_app: Path, tmp_path: Path) -> None:
+        for _ in range(2):
+            with ScanCache(tmp_path / "cache") as cache:
+                graph = build_dependency_graph("zipped_app", jobs=1, cache=cache)
+            assert graph.imports("zipped_app.implicit.spam") == ["zipped_app.sub.helpers"]
+            assert graph.imports("zipped_app.sub.helpers") == ["zipped_app.models"]
+        assert (cache.stats.hits, cache.stats.misses) == (7, 0)
@@ -0,0 +1,83 @@
+import os
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from pca.packages.archunit.cache import ScanCache
+from pca.packages.archunit.importing import (
+    ModuleSpec,
+    iterate_module_specs,
+)
+
+
+def read_source(spec: ModuleSpec) -> t.Tuple[str, bytes]:
+    return spec.name, spec.read_source()
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    package = tmp_path / "src" / "cached_package"
+    (package / "implicit").mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "foo.py").write_text("foo = 1\n")
+    (package / "implicit" / "bar.py").write_text("bar = 2\n")
+    monkeypatch.syspath_prepend(str(tmp_path / "src"))
+    return package
+
+
+def analyze(cache_directory: Path) -> t.Tuple[t.Dict[str, bytes], ScanCache]:
+    with ScanCache(cache_directory) as cache:
+        specs = iterate_module_specs("cached_package", include_packages=True)
+        results: t.Dict[str, bytes] = dict(cache.analyze(specs, read_source, jobs=1))
+    return results, cache
+
+
+class TestScanCache:
+    def test_warm_run(self, package: Path, tmp_path: Path) -> None:
+        cold_results, cold_cache = analyze(tmp_path / "cache")
+        assert cold_results == {
+            "cached_package.foo": b"foo = 1\n",
+            "cached_package.implicit": b"",
+            "cached_package.implicit.bar": b"bar = 2\n",
+        }
+        assert (cold_cache.stats.hits, cold_cache.stats.misses) == (0, 3)
+
+        warm_results, warm_cache = analyze(tmp_path / "cache")
+        assert warm_results == cold_results
+        assert (warm_cache.stats.hits, warm_cache.stats.misses) == (3, 0)
+
+    def test_changed_file(self, package: Path, tmp_path: Path) -> None:
+        analyze(tmp_path / "cache")
+        (package / "foo.py").write_text("foo = 42\n")
+        results, cache = analyze(tmp_path / "cache")
+        assert results["cached_package.foo"] == b"foo = 42\n"
+        assert (cache.stats.hits, cache.stats.misses, cache.stats.invalidations) == (2, 1, 1)
+
+    def test_touched_file(self, package: Path, tmp_path: Path) -> None:
+        analyze(tmp_path / "cache")
+        stat = os.stat(package / "foo.py")
+        os.utime(package / "foo.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        _, cache = analyze(tmp_path / "cache")
+        assert (cache.stats.hits, cache.stats.misses) == (3, 0)
+
+    def test_removed_file(self, package: Path, tmp_path: Path) -> None:
+        analyze(tmp_path / "cache")
+        (package / "foo.py").unlink()
+        results, cache = analyze(tmp_path / "cache")
+        assert "cached_package.foo" not in results
+        assert cache.stats.removals == 1
+
+    def test_namespace_package_became_regular(self, package: Path, tmp_path: Path) -> None:
+        analyze(tmp_path / "cache")
+        (package / "implicit" / "__init__.py").write_text("baz = 3\n")
+        results, cache = analyze(tmp_path / "cache")
+        assert results["cached_package.implicit"] == b"baz = 3\n"
+        assert (cache.stats.hits, cache.stats.misses, cache.stats.removals) == (2, 1, 1)
+
+    def test_clear(self, package: Path, tmp_path: Path) -> None:
+        _, cache = analyze(tmp_path / "cache")
+        cache.clear()
+        assert not list((tmp_path / "cache").glob("*.pickle"))
+        _, cache = analyze(tmp_path / "cache")
+        assert cache.stats.misses == 3
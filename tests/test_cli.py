@@ -1,6 +1,13 @@
+import json
+import sys
+import typing as t
+from xml.etree import ElementTree
+
+import pytest
 from click.testing import CliRunner
 
 from pca.packages.archunit import cli
+from pca.packages.archunit.importing import clear_resolution_cache
 
 
 def test_command_line_interface():
@@ -12,3 +19,93 @@ def test_command_line_interface():
     help_result = runner.invoke(cli.main, ["--help"])
     assert help_result.exit_code == 0
     assert "--help" in help_result.output
+
+
+@pytest.fixture
+def layered_package(tmp_path, monkeypatch):
+    package = tmp_path / "layered_app"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "domain.py").write_text("from layered_app import views\n")
+    (package / "services.py").write_text("from layered_app import domain\n")
+    (package / "views.py").write_text("from layered_app import services, domain\n")
+    (tmp_path / "layered_rules.py").write_text(
+        "from pca.packages.archunit.rules import Layer, LayeredArchitecture, NoCycles\n"
+        "layers = LayeredArchitecture(\n"
+        "    Layer('views', 'layered_app.views'),\n"
+        "    Layer('services', 'layered_app.services'),\n"
+        "    Layer('domain', 'layered_app.domain'),\n"
+        "    transitive=False,\n"
+        ")\n"
+        "no_cycles = NoCycles()\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "layered_app"
+    for name in ("layered_app", "layered_app.views", "layered_rules"):
+        sys.modules.pop(name, None)
+    clear_resolution_cache()
+
+
+def violation_lines(output: str) -> t.List[str]:
+    return [line for line in output.splitlines() if " -> " in line]
+
+
+class TestCheck:
+    def test_violations(self, layered_package):
+        result = CliRunner().invoke(cli.main, ["check", layered_package, "layered_rules", "--jobs", "1"])
+        assert result.exit_code == cli.EXIT_VIOLATIONS
+        assert violation_lines(result.output) == [
+            "layer 'domain' must not depend on upper layers: layered_app.domain -> layered_app.views",
+            "modules must not form cycles: layered_app.domain -> layered_app.views -> layered_app.domain",
+        ]
+        assert "2 rule(s) checked against 4 module(s): 2 violation(s) found" in result.output
+
+    def test_fail_fast(self, layered_package):
+        result = CliRunner().invoke(cli.main, ["check", layered_package, "layered_rules", "-j", "1", "--fail-fast"])
+        assert result.exit_code == cli.EXIT_VIOLATIONS
+        assert len(violation_lines(result.output)) == 1
+
+    def test_reports(self, layered_package, tmp_path):
+        junit_xml, jsonl = tmp_path / "report.xml", tmp_path / "report.jsonl"
+        result = CliRunner().invoke(
+            cli.main,
+            [
+                "check",
+                layered_package,
+                "layered_rules",
+                "-j",
+                "1",
+                "--junit-xml",
+                str(junit_xml),
+                "--jsonl",
+                str(jsonl),
+            ],
+        )
+        assert result.exit_code == cli.EXIT_VIOLATIONS
+        assert len(ElementTree.parse(junit_xml).findall("testsuite/testcase/failure")) == 2
+        records = [json.loads(line) for line in jsonl.read_text().splitlines()]
+        assert [record["type"] for record in records] == ["violation", "rule", "violation", "rule"]
+
+    def test_no_violations(self, layered_package, tmp_path):
+        result = CliRunner().invoke(
+            cli.main,
+            ["check", layered_package, "layered_rules:layers", "-j", "1", "--cache-dir", str(tmp_path / "cache")],
+        )
+        assert result.exit_code == cli.EXIT_VIOLATIONS
+        result = CliRunner().invoke(cli.main, ["check", "tests.importing_test_package", "layered_rules", "-j", "1"])
+        assert result.exit_code == cli.EXIT_OK, result.output
+        assert "no violations" in result.output
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            ["nonexistent_package", "layered_rules"],
+            ["sys", "layered_rules"],
+            ["layered_app", "nonexistent_rules"],
+            ["layered_app", "layered_rules:Layer"],
+            ["layered_app"],
+        ],
+    )
+    def test_usage_errors(self, layered_package, args):
+        result = CliRunner().invoke(cli.main, ["check", *args])
+        assert result.exit_code == cli.EXIT_USAGE_ERROR
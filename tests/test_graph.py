@@ -0,0 +1,112 @@
+from pathlib import Path
+
+import pytest
+
+from pca.packages.archunit.graph import (
+    RUNTIME_IMPORT,
+    TYPE_CHECKING_IMPORT,
+    ImportStatement,
+    build_dependency_graph,
+    extract_imports,
+)
+from pca.packages.archunit.importing import iterate_module_specs
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    package = tmp_path / "graph_package"
+    (package / "domain").mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "domain" / "__init__.py").write_text("from .model import Entity\n")
+    (package / "domain" / "model.py").write_text(
+        "import typing as t\n"
+        "if t.TYPE_CHECKING:\n"
+        "    from ..services import Service\n"
+        "else:\n"
+        "    Service = None\n"
+    )
+    (package / "services.py").write_text(
+        "import os.path\n"
+        "from graph_package.domain import model\n"
+        "from . import views, domain\n"
+        "def lazy():\n"
+        "    import graph_package.views.whatever\n"
+    )
+    (package / "views.py").write_text("from .services import *\nfrom .domain.model import Entity\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return package
+
+
+def test_extract_imports(package: Path) -> None:
+    specs = {spec.name: spec for spec in iterate_module_specs("graph_package", include_packages=True)}
+    assert extract_imports(specs["graph_package.domain.model"]).imports == (
+        ImportStatement("typing", (), RUNTIME_IMPORT),
+        ImportStatement("graph_package.services", ("Service",), TYPE_CHECKING_IMPORT),
+    )
+    assert extract_imports(specs["graph_package.domain"]).imports == (
+        ImportStatement("graph_package.domain.model", ("Entity",), RUNTIME_IMPORT),
+    )
+
+
+class TestDependencyGraph:
+    def test_modules(self, package: Path) -> None:
+        graph = build_dependency_graph("graph_package", jobs=1)
+        assert list(graph.modules) == [
+            "graph_package",
+            "graph_package.domain",
+            "graph_package.domain.model",
+            "graph_package.services",
+            "graph_package.views",
+        ]
+        assert set(graph) - set(graph.modules) == {"typing", "os.path"}
+        assert graph.is_internal("graph_package.views")
+        assert not graph.is_internal("typing")
+        assert graph.name_of(graph.id_of("graph_package.views")) == "graph_package.views"
+
+    def test_imports(self, package: Path) -> None:
+        graph = build_dependency_graph("graph_package", jobs=1)
+        assert graph.edge_count == 9
+        assert graph.imports("graph_package") == []
+        assert graph.imports("graph_package.domain") == ["graph_package.domain.model"]
+        assert set(graph.imports("graph_package.services")) == {
+            "os.path",
+            "graph_package.domain",
+            "graph_package.domain.model",
+            "graph_package.views",
+        }
+        assert graph.imports("graph_package.domain.model", TYPE_CHECKING_IMPORT) == ["graph_package.services"]
+        assert graph.imports("graph_package.domain.model", RUNTIME_IMPORT) == ["typing"]
+
+    def test_imported_by(self, package: Path) -> None:
+        graph = build_dependency_graph("graph_package", jobs=1)
+        assert set(graph.imported_by("graph_package.domain.model")) == {
+            "graph_package.domain",
+            "graph_package.services",
+            "graph_package.views",
+        }
+        assert graph.imported_by("graph_package.services", RUNTIME_IMPORT) == ["graph_package.views"]
+        assert set(graph.imported_by("graph_package.services")) == {
+            "graph_package.views",
+            "graph_package.domain.model",
+        }
+
+    def test_edge_flags(self, package: Path) -> None:
+        graph = build_dependency_graph("graph_package", jobs=1)
+        model, services = graph.id_of("graph_package.domain.model"), graph.id_of("graph_package.services")
+        assert graph.edge_flags(model, services) == TYPE_CHECKING_IMPORT
+        assert graph.edge_flags(services, model) == RUNTIME_IMPORT
+        assert graph.edge_flags(services, graph.id_of("graph_package")) == 0
+
+    def test_unparsable_module(self, package: Path) -> None:
+        (package / "bad.py").write_text("import os\ndef (:\n")
+        with pytest.warns(UserWarning, match="graph_package.bad can't be parsed, so its imports are skipped"):
+            graph = build_dependency_graph("graph_package", jobs=1)
+        assert "graph_package.bad" in graph.modules
+        assert graph.imports("graph_package.bad") == []
+        assert graph.imports("graph_package.domain") == ["graph_package.domain.model"]
+
+    def test_parallel(self, package: Path) -> None:
+        serial = build_dependency_graph("graph_package", jobs=1)
+        parallel = build_dependency_graph("graph_package", jobs=2)
+        assert list(parallel) == list(serial)
+        assert list(parallel.edges()) == list(serial.edges())
@@ -1,8 +1,25 @@
+import sys
+import typing as t
+from importlib import (
+    import_module,
+    invalidate_caches,
+    reload,
+)
+from pathlib import Path
+from types import ModuleType
+
 import pytest
 
 from pca.packages.archunit.importing import (
+    DEFAULT_RESOLUTION_CACHE_SIZE,
+    ModuleSpec,
     OwnImportError,
+    clear_resolution_cache,
+    import_dotted_name,
+    iterate_module_specs,
     iterate_modules,
+    maybe_dotted_name,
+    resolution_cache_info,
 )
 
 
@@ -54,3 +71,138 @@ class TestIterateModules:
     def test_importing_funciton(self):
         with pytest.raises(OwnImportError):
             tuple(iterate_modules("pca.packages.archunit.importing:iterate_modules"))
+
+
+class TestIterateModuleSpecs:
+    @pytest.mark.parametrize(
+        "target, kwargs",
+        [
+            ("importing_test_package", {}),
+            ("importing_test_package", {"include_packages": True}),
+            ("importing_test_package.implicit_package", {"recursive": False}),
+            ("importing_test_package.implicit_package", {"recursive": False, "include_packages": True}),
+            ("importing_test_package.implicit_package.subpackage", {"recursive": False}),
+            ("importing_test_package.implicit_package.subpackage.bar", {"include_packages": True}),
+            ("pca.packages.archunit.importing", {}),
+        ],
+    )
+    def test_same_as_iterate_modules(self, target: str, kwargs: dict) -> None:
+        assert [spec.name for spec in iterate_module_specs(target, **kwargs)] == [
+            module.__name__ for module in iterate_modules(target, **kwargs)
+        ]
+
+    def test_specs(self) -> None:
+        specs = {spec.name: spec for spec in iterate_module_specs("importing_test_package", include_packages=True)}
+        implicit_package = specs["importing_test_package.implicit_package"]
+        assert implicit_package.is_package and implicit_package.is_namespace
+        assert implicit_package.path.name == "implicit_package"
+        subpackage = specs["importing_test_package.implicit_package.subpackage"]
+        assert subpackage.is_package and not subpackage.is_namespace
+        assert subpackage.path.name == "__init__.py"
+        spam = specs["importing_test_package.implicit_package.spam"]
+        assert not spam.is_package and not spam.is_namespace
+        assert spam.path.name == "spam.py"
+        assert spam.load() is import_module(spam.name)
+
+    def test_modules_are_not_imported(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        package = tmp_path / "side_effect_package"
+        (package / "implicit").mkdir(parents=True)
+        (package / "__init__.py").write_text("raise RuntimeError('package imported')\n")
+        (package / "implicit" / "module.py").write_text("raise RuntimeError('module imported')\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+
+        assert [spec.name for spec in iterate_module_specs("side_effect_package", include_packages=True)] == [
+            "side_effect_package.implicit",
+            "side_effect_package.implicit.module",
+        ]
+        assert "side_effect_package" not in sys.modules
+
+    def test_unknown_module(self) -> None:
+        with pytest.raises(ModuleNotFoundError):
+            tuple(iterate_module_specs("importing_test_package.implicit_package.eggs"))
+
+    def test_importing_function(self) -> None:
+        with pytest.raises(OwnImportError):
+            tuple(iterate_module_specs("pca.packages.archunit.importing:iterate_modules"))
+
+
+class TestImportDottedName:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self) -> t.Iterator[None]:
+        clear_resolution_cache()
+        yield
+        clear_resolution_cache(DEFAULT_RESOLUTION_CACHE_SIZE)
+
+    def test_resolution(self) -> None:
+        assert import_dotted_name("pca.packages.archunit.importing:ModuleSpec.load") is ModuleSpec.load
+        assert maybe_dotted_name("pca.packages.archunit.importing") is sys.modules["pca.packages.archunit.importing"]
+        assert maybe_dotted_name(ModuleSpec) is ModuleSpec
+
+    def test_cached(self) -> None:
+        for _ in range(3):
+            assert import_dotted_name("pca.packages.archunit.importing:iterate_modules") is iterate_modules
+        info = resolution_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (2, 1, 1)
+
+    def test_failures_cached(self) -> None:
+        for _ in range(2):
+            with pytest.raises(ImportError, match="does not define a 'spam' attribute"):
+                import_dotted_name("pca.packages.archunit.importing:spam")
+            with pytest.raises(ModuleNotFoundError):
+                import_dotted_name("pca.packages.archunit.spam")
+        info = resolution_cache_info()
+        assert (info.hits, info.misses) == (2, 2)
+
+    def test_failures_chained(self) -> None:
+        for _ in range(2):
+            with pytest.raises(ImportError) as error_info:
+                import_dotted_name("pca.packages.archunit.importing:spam")
+            assert isinstance(error_info.value.__cause__, AttributeError)
+        assert resolution_cache_info().hits == 1
+
+    def test_failures_invalidated(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        for name in ("found_later", "found_even_later"):
+            monkeypatch.delitem(sys.modules, name, raising=False)
+        with pytest.raises(ModuleNotFoundError):
+            import_dotted_name("found_later")
+        (tmp_path / "found_later.py").write_text("")
+        # by a change of `sys.path`
+        monkeypatch.setattr(sys, "path", [str(tmp_path), *sys.path])
+        assert import_dotted_name("found_later") is sys.modules["found_later"]
+
+        with pytest.raises(ModuleNotFoundError):
+            import_dotted_name("found_even_later")
+        (tmp_path / "found_even_later.py").write_text("")
+        with pytest.raises(ModuleNotFoundError):
+            import_dotted_name("found_even_later")
+        # by `importlib.invalidate_caches`, as the finders may have cached the contents of the directory as well
+        invalidate_caches()
+        assert import_dotted_name("found_even_later") is sys.modules["found_even_later"]
+        assert resolution_cache_info().invalidations == 2
+        for name in ("found_later", "found_even_later"):
+            del sys.modules[name]
+
+    def test_invalidated_by_replaced_module(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        assert import_dotted_name("importing_test_package.implicit_package.spam") is import_module(
+            "importing_test_package.implicit_package.spam"
+        )
+        replacement = ModuleType("importing_test_package.implicit_package.spam")
+        monkeypatch.setitem(sys.modules, "importing_test_package.implicit_package.spam", replacement)
+        assert import_dotted_name("importing_test_package.implicit_package.spam") is replacement
+        assert resolution_cache_info().invalidations == 1
+
+    def test_invalidated_by_reload(self) -> None:
+        module = import_module("importing_test_package.implicit_package.subpackage.foo")
+        import_dotted_name("importing_test_package.implicit_package.subpackage.foo")
+        reload(module)
+        import_dotted_name("importing_test_package.implicit_package.subpackage.foo")
+        assert resolution_cache_info().invalidations == 1
+
+    def test_eviction(self) -> None:
+        clear_resolution_cache(maxsize=2)
+        for name in ("ModuleSpec", "iterate_modules", "ModuleSpec", "find_module_spec"):
+            import_dotted_name(f"pca.packages.archunit.importing:{name}")
+        info = resolution_cache_info()
+        assert (info.evictions, info.currsize, info.maxsize) == (1, 2, 2)
+        import_dotted_name("pca.packages.archunit.importing:ModuleSpec")
+        assert resolution_cache_info().hits == 2
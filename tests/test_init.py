@@ -6,3 +6,48 @@ def test_pca_namespace():
     from pca.packages import archunit
 
     assert hasattr(archunit, "VERSION")
+
+
+def test_units_exported_lazily():
+    """Test the units package exports all the units defined by its modules, importing only the ones used"""
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, pkgutil, importlib, inspect\n"
+        "from pca.packages.archunit.units import Tag\n"
+        "assert 'pca.packages.archunit.units.routing' not in sys.modules\n"
+        "from pca.packages.archunit import units\n"
+        "for info in pkgutil.iter_modules(units.__path__):\n"
+        "    module = importlib.import_module(f'{units.__name__}.{info.name}')\n"
+        "    for name, obj in vars(module).items():\n"
+        "        if inspect.isclass(obj) and obj.__module__ == module.__name__ and not name.startswith('_'):\n"
+        "            assert getattr(units, name) is obj, name\n"
+        "assert set(units.__all__) <= set(dir(units))\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_lazy_names_in_sync():
+    """Test the tables of the lazily exported names match the public names of the modules they point to"""
+    import importlib
+    import inspect
+    import pkgutil
+
+    from pca.packages import archunit
+    from pca.packages.archunit import units
+
+    lazy_names = {}
+    for info in pkgutil.iter_modules(units.__path__):
+        module = importlib.import_module(f"{units.__name__}.{info.name}")
+        defined = {
+            name
+            for name, obj in vars(module).items()
+            if inspect.isclass(obj) and obj.__module__ == module.__name__ and not name.startswith("_")
+        }
+        assert set(module.__all__) == defined, module.__name__
+        lazy_names.update(dict.fromkeys(module.__all__, f".{info.name}"))
+    assert units._LAZY_NAMES == lazy_names
+    assert set(units.__all__) == set(lazy_names)
+    for name in archunit._LAZY_NAMES:
+        assert getattr(archunit, name) is not None
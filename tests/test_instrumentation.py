@@ -0,0 +1,134 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from pca.packages.archunit import (
+    cli,
+    instrumentation,
+)
+from pca.packages.archunit.importing import iterate_modules
+from pca.packages.archunit.units.common import Tag
+
+
+@instrumentation.instrumented()
+def add(a, b):
+    return a + b
+
+
+@instrumentation.instrumented("numbers", category="test")
+def numbers(n):
+    yield from range(n)
+
+
+@pytest.fixture(autouse=True)
+def no_tracer():
+    previous = instrumentation.disable()
+    yield
+    if previous is not None:  # pragma: no cover
+        instrumentation.enable(previous)
+    else:
+        instrumentation.disable()
+
+
+def test_disabled():
+    assert instrumentation.get_tracer() is None
+    with instrumentation.span("anything") as span:
+        assert span is instrumentation._NULL_SPAN
+    instrumentation.count("anything")
+    assert add(1, 2) == 3
+    assert list(numbers(3)) == [0, 1, 2]
+
+
+def test_tracing():
+    with instrumentation.tracing() as tracer:
+        assert instrumentation.get_tracer() is tracer
+        with instrumentation.span("outer", module="a"):
+            assert add(1, 2) == 3
+            assert add(2, 3) == 5
+        assert list(numbers(3)) == [0, 1, 2]
+        instrumentation.count("things", 2)
+        instrumentation.count("things")
+    assert instrumentation.get_tracer() is None
+
+    summary = {stats.name: stats for stats in tracer.summary()}
+    assert summary.keys() == {"outer", "add", "numbers"}
+    assert summary["add"].calls == 2
+    assert summary["outer"].total_ns >= summary["add"].total_ns
+    assert tracer.counters == {"things": 3}
+    assert "outer" in tracer.format_summary()
+
+    trace_events = tracer.to_chrome_trace()["traceEvents"]
+    complete = [event for event in trace_events if event["ph"] == "X"]
+    assert [event["name"] for event in complete] == ["add", "add", "outer", "numbers"]
+    assert complete[2]["args"] == {"module": "a"}
+    assert complete[3]["cat"] == "test"
+    assert [event for event in trace_events if event["ph"] == "C"][0]["args"] == {"value": 3}
+
+
+def test_library_spans(register, instance):
+    with instrumentation.tracing() as tracer:
+        modules = list(iterate_modules("tests.importing_test_package"))
+        register.register(Tag(instance, "tag"))
+        assert len(list(register.get_all_for_target(instance))) == 1
+    names = {stats.name for stats in tracer.summary()}
+    assert {"import_module", "ArchUnitRegister.register", "ArchUnitRegister.get_all_for_target"} <= names
+    for span_name in ("import_module", "iterate_modules.module"):
+        spanned = {
+            event["args"]["module"] for event in tracer.to_chrome_trace()["traceEvents"] if event["name"] == span_name
+        }
+        assert {module.__name__ for module in modules} <= spanned
+    assert tracer.counters["iterated_modules"] >= len(modules)
+
+
+def test_generator_passed_through():
+    closed = []
+
+    @instrumentation.instrumented("endless")
+    def endless():
+        try:
+            while True:
+                try:
+                    yield "item"
+                except ValueError:
+                    yield "caught"
+        finally:
+            closed.append(True)
+
+    with instrumentation.tracing() as tracer:
+        generator = endless()
+        assert next(generator) == "item"
+        assert generator.throw(ValueError) == "caught"
+        generator.close()
+        # the span ends along with the generator, without waiting for it to be garbage-collected
+        assert closed == [True]
+        assert [stats.name for stats in tracer.summary()] == ["endless"]
+
+
+def test_register_query_spans(register, instance):
+    register.register_multiple(Tag(instance, f"tag{index}") for index in range(100))
+    with instrumentation.tracing() as tracer:
+        units = register.get_all_of_type(Tag)
+        # the span of a query covers the iteration over its units, so there is none before
+        assert tracer.summary() == []
+        assert len(list(units)) == 100
+        assert len(list(register.get_all_of_type_for_target(instance, Tag))) == 100
+    assert {stats.name: stats.calls for stats in tracer.summary()} == {
+        "ArchUnitRegister.get_all_of_type": 1,
+        "ArchUnitRegister.get_all_of_type_for_target": 1,
+    }
+
+
+def test_cli_trace(tmp_path, monkeypatch):
+    (tmp_path / "traced_rules.py").write_text(
+        "from pca.packages.archunit.rules import NoCycles\narchunit_rules = [NoCycles()]\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    trace_path = tmp_path / "trace.json"
+    result = CliRunner().invoke(
+        cli.main, ["check", "tests.importing_test_package", "traced_rules", "-j", "1", "--trace", str(trace_path)]
+    )
+    assert result.exit_code == cli.EXIT_OK, result.output
+    names = {event["name"] for event in json.loads(trace_path.read_text())["traceEvents"]}
+    assert {"load_rules", "build_dependency_graph", "check_rules", "scan_directory"} <= names
+    assert "total ms" in result.output
@@ -0,0 +1,119 @@
+import sys
+from importlib import import_module
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from pca.packages.archunit import cli
+from pca.packages.archunit.graph import build_dependency_graph
+from pca.packages.archunit.importing import clear_resolution_cache
+from pca.packages.archunit.introspection import TargetReference
+from pca.packages.archunit.profiling import (
+    ImportBudget,
+    ImportProfiler,
+    format_import_costs,
+    profile_imports,
+    register_import_costs,
+)
+from pca.packages.archunit.register import ArchUnitRegister
+from pca.packages.archunit.units.profiling import ImportCost
+
+MS = 1_000_000
+
+
+@pytest.fixture
+def slow_app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    package = tmp_path / "slow_app"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "heavy.py").write_text(
+        "import time\nfrom slow_app import lib\ntime.sleep(0.05)\nBLOB = bytearray(2_000_000)\n"
+    )
+    (package / "lib.py").write_text("import time\ntime.sleep(0.02)\n")
+    (package / "light.py").write_text("VALUE = 1\n")
+    (package / "broken.py").write_text("raise ImportError('not importable')\n")
+    (package / "failing.py").write_text("from slow_app import light\nraise RuntimeError('failing on import')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "slow_app"
+    for name in [name for name in sys.modules if name.split(".")[0] == "slow_app"]:
+        del sys.modules[name]
+    clear_resolution_cache()
+
+
+def test_profile_imports(slow_app: str) -> None:
+    meta_path = list(sys.meta_path)
+    costs = {unit.target.__name__: unit for unit in profile_imports(slow_app)}
+    assert sys.meta_path == meta_path
+    assert set(costs) == {"slow_app", "slow_app.heavy", "slow_app.lib", "slow_app.light"}
+    heavy, lib = costs["slow_app.heavy"], costs["slow_app.lib"]
+    assert lib.self_ns >= 20 * MS and lib.cumulative_ns == lib.self_ns
+    # the imported module is a part of the cumulative cost of the importing one only
+    assert heavy.self_ns >= 50 * MS
+    assert heavy.cumulative_ns >= heavy.self_ns + lib.cumulative_ns
+    assert heavy.self_bytes >= 2_000_000 and heavy.cumulative_bytes >= heavy.self_bytes + lib.cumulative_bytes
+    assert costs["slow_app.light"].cumulative_ns < 20 * MS
+    # the modules keep their own loaders
+    heavy_module = sys.modules["slow_app.heavy"]
+    assert type(heavy_module.__loader__).__name__ == "SourceFileLoader"
+    assert heavy_module.__spec__ is not None and heavy_module.__spec__.loader is heavy_module.__loader__
+
+
+def test_profiler_without_memory(slow_app: str) -> None:
+    with ImportProfiler(trace_memory=False) as profiler:
+        import_module(f"{slow_app}.heavy")
+    assert [cost.module for cost in profiler.costs] == ["slow_app", "slow_app.lib", "slow_app.heavy"]
+    assert all(cost.self_bytes == cost.cumulative_bytes == 0 for cost in profiler.costs)
+
+
+def test_isolated(slow_app: str) -> None:
+    costs = {unit.target: unit for unit in profile_imports(slow_app, isolated=True)}
+    assert "slow_app" not in sys.modules
+    assert costs[TargetReference("slow_app.heavy")].cumulative_ns >= 70 * MS
+
+
+def test_report(slow_app: str) -> None:
+    register = ArchUnitRegister()
+    costs = register_import_costs(register, slow_app, trace_memory=False)
+    assert set(register.get_all_of_type(ImportCost)) == set(costs)
+    lines = format_import_costs(costs, limit=2).splitlines()
+    assert lines[0].split() == ["#", "cumulative", "ms", "self", "ms", "cumulative", "KiB", "self", "KiB", "module"]
+    assert [line.split()[-1] for line in lines[1:]] == ["slow_app.heavy", "slow_app.lib"]
+    assert format_import_costs(costs, sort_by="self_ns").splitlines()[1].endswith("slow_app.heavy")
+    with pytest.raises(ValueError):
+        format_import_costs(costs, sort_by="name")
+
+
+class TestImportBudget:
+    def test_from_register(self, slow_app: str) -> None:
+        register = ArchUnitRegister()
+        register_import_costs(register, slow_app)
+        graph = build_dependency_graph(slow_app, jobs=1)
+        rule = ImportBudget("slow_app", max_ms=40, register=register)
+        assert str(rule) == "modules of slow_app must import in under 40 ms"
+        assert [violation.path for violation in rule.check(graph)] == [("slow_app.heavy",)]
+        rule = ImportBudget(max_ms=10, cumulative=False, max_bytes=1_000_000, register=register)
+        assert sorted((violation.source, violation.rule.count(",")) for violation in rule.check(graph)) == [
+            ("slow_app.heavy", 1),
+            ("slow_app.lib", 0),
+        ]
+        with pytest.raises(ValueError):
+            ImportBudget("slow_app")
+
+    def test_measured(self, slow_app: str) -> None:
+        graph = build_dependency_graph(slow_app, jobs=1)
+        (violation,) = ImportBudget("slow_app.heavy", max_bytes=1_000_000).check(graph)
+        assert violation.path == ("slow_app.heavy",)
+        assert violation.rule.startswith("modules of slow_app.heavy must import allocating at most 1000000 bytes (")
+        assert "slow_app" not in sys.modules
+
+
+def test_cli(slow_app: str) -> None:
+    result = CliRunner().invoke(
+        cli.main, ["profile-imports", slow_app, "--in-process", "--no-memory", "--sort", "self", "--limit", "1"]
+    )
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert len(lines) == 3
+    assert lines[1].endswith("slow_app.heavy")
+    assert lines[2].startswith("4 module(s) imported in ")
@@ -0,0 +1,89 @@
+import pytest
+
+from pca.packages.archunit.importing import clear_resolution_cache
+
+pytest_plugins = ["pytester"]
+
+PLUGIN = "pca.packages.archunit.pytest_plugin"
+
+
+@pytest.fixture
+def project(pytester):
+    package = pytester.mkpydir("plugin_app")
+    (package / "domain.py").write_text("from plugin_app import views\n")
+    (package / "services.py").write_text("from plugin_app import domain\n")
+    (package / "views.py").write_text(
+        "from plugin_app import services\n"
+        "from pca.packages.archunit.units.common import Tag\n"
+        "def archunit_includeme(register):\n"
+        "    register.register(Tag(services, 'layer'))\n"
+    )
+    pytester.makepyfile(
+        plugin_rules=(
+            "from pca.packages.archunit.rules import Layer, LayeredArchitecture, NoCycles\n"
+            "layers = LayeredArchitecture(\n"
+            "    Layer('views', 'plugin_app.views'),\n"
+            "    Layer('services', 'plugin_app.services'),\n"
+            "    transitive=False,\n"
+            ")\n"
+            "no_cycles = NoCycles()\n"
+            "archunit_rules = [layers, no_cycles, NoCycles('plugin_app.services')]\n"
+        ),
+        test_app=(
+            "def test_graph(archunit_graph):\n"
+            "    assert 'plugin_app.domain' in archunit_graph\n"
+            "def test_register(archunit_register, archunit_analysis):\n"
+            "    assert archunit_register is archunit_analysis.register\n"
+            "    assert len(archunit_register) == 1\n"
+        ),
+    )
+    pytester.makeini(
+        "[pytest]\n"
+        "archunit_target = plugin_app\n"
+        "archunit_rules =\n"
+        "    plugin_rules\n"
+        f"archunit_cache_dir = {pytester.path / '.archunit_cache'}\n"
+    )
+    pytester.syspathinsert()
+    yield pytester
+    clear_resolution_cache()
+
+
+def test_rules_collected_as_items(project):
+    result = project.runpytest("-p", PLUGIN, "--collect-only", "-q")
+    result.stdout.fnmatch_lines(
+        [
+            "test_app.py::test_graph",
+            "test_app.py::test_register",
+            "archunit::plugin_rules::layers",
+            "archunit::plugin_rules::no_cycles",
+            "archunit::plugin_rules::rule2",
+        ]
+    )
+
+
+def test_rule_failures_list_violations(project):
+    result = project.runpytest("-p", PLUGIN)
+    result.assert_outcomes(passed=3, failed=2)
+    result.stdout.fnmatch_lines(
+        [
+            "*modules must not form cycles: 1 violation(s)",
+            "*modules must not form cycles: plugin_app.domain -> plugin_app.views -> *",
+            "FAILED archunit::plugin_rules::no_cycles*",
+            "FAILED archunit::plugin_rules::rule2*",
+        ]
+    )
+    assert (project.path / ".archunit_cache").is_dir()
+
+
+def test_rules_skipped_with_explicit_paths(project):
+    project.runpytest("-p", PLUGIN, "test_app.py").assert_outcomes(passed=2)
+    project.runpytest("-p", PLUGIN, "test_app.py", "--archunit").assert_outcomes(passed=3, failed=2)
+    project.runpytest("-p", PLUGIN, "--no-archunit").assert_outcomes(passed=2)
+
+
+def test_missing_target(project):
+    project.makeini("[pytest]\narchunit_rules = plugin_rules\n")
+    result = project.runpytest("-p", PLUGIN, "-k", "layers")
+    result.assert_outcomes(failed=1, deselected=4)
+    result.stdout.fnmatch_lines(["*archunit_target is not configured*"])
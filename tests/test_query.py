@@ -0,0 +1,138 @@
+import gc
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from pca.packages.archunit.introspection import TargetReference
+from pca.packages.archunit.query import (
+    Query,
+    clear_plan_cache,
+    plan_cache_info,
+)
+from pca.packages.archunit.register import ArchUnitRegister
+from pca.packages.archunit.snapshot import (
+    load_snapshot,
+    save_snapshot,
+)
+from pca.packages.archunit.units.common import Tag
+from pca.packages.archunit.units.routing import Route
+
+VIEWS = [TargetReference("shop.views", f"view{index}") for index in range(20)]
+ADMIN_VIEWS = [TargetReference("shop.admin.views", f"view{index}") for index in range(5)]
+
+
+@pytest.fixture
+def register() -> t.Iterator[ArchUnitRegister]:
+    register = ArchUnitRegister()
+    for index, view in enumerate(VIEWS + ADMIN_VIEWS):
+        register.register(Route(view, f"/{view.module}/{index}", websocket=index % 2 == 0))
+        register.register(Tag(view, "view"))
+    register.register_multiple(Tag(view, "public") for view in VIEWS[:3] + ADMIN_VIEWS[:1])
+    register.register(Tag(TargetReference("shop.models", "Order"), "public"))
+    yield register
+    clear_plan_cache()
+
+
+def targets(query: Query) -> t.Set[str]:
+    return {str(unit.target) for unit in query}
+
+
+def test_conditions(register: ArchUnitRegister) -> None:
+    routes = Query(register).of_type(Route)
+    assert routes.count() == 25
+    assert targets(routes.carrying(Tag, value="public")) == {
+        "shop.views:view0",
+        "shop.views:view1",
+        "shop.views:view2",
+        "shop.admin.views:view0",
+    }
+    assert targets(routes.carrying(Tag, value="public").in_modules("shop.views")) == {
+        "shop.views:view0",
+        "shop.views:view1",
+        "shop.views:view2",
+    }
+    assert targets(routes.carrying(Tag, value="public").where(websocket=True)) == {
+        "shop.views:view0",
+        "shop.views:view2",
+        "shop.admin.views:view0",
+    }
+    assert targets(routes.for_targets(VIEWS[0], ADMIN_VIEWS[1], VIEWS[0])) == {
+        "shop.views:view0",
+        "shop.admin.views:view1",
+    }
+    assert targets(Query(register).of_type(Tag).in_modules("shop.*s").where(value="public")) == {
+        "shop.views:view0",
+        "shop.admin.views:view0",
+        "shop.views:view1",
+        "shop.views:view2",
+        "shop.models:Order",
+    }
+    assert routes.filter(lambda unit: isinstance(unit, Route) and unit.uri.endswith("/24")).first() == Route(
+        ADMIN_VIEWS[4], "/shop.admin.views/24", websocket=True
+    )
+    assert routes.where(uri="/nowhere").first() is None
+    assert routes.carrying(Route, uri="/nowhere").count() == 0
+
+
+def test_plans(register: ArchUnitRegister) -> None:
+    routes = Query(register).of_type(Route)
+    assert routes.explain() == "1. scan units of Route (~25 units)"
+    # the fewest candidates come from the target, the tags are looked up per candidate
+    assert routes.for_targets(VIEWS[0]).carrying(Tag, value="public").where(websocket=True).explain() == (
+        "1. scan targets: shop.views:view0 (~3 units), of Route\n"
+        "2. lookup targets carrying Tag(value='public') (~30 units)\n"
+        "3. filter fields: websocket=True"
+    )
+    # the targets are selected once, rather than looked up per candidate
+    assert routes.carrying(Tag, value="public").for_targets(*VIEWS).in_modules("shop").explain() == (
+        "1. scan units of Route (~25 units)\n"
+        "2. lookup targets carrying Tag(value='public') (~30 units)\n"
+        f"3. intersect targets: {', '.join(map(str, VIEWS))} (~43 units)\n"
+        "4. filter targets in modules: shop"
+    )
+    assert Query(register).of_type(Tag).carrying(Route, websocket=True).explain() == (
+        "1. scan targets carrying Route(websocket=True) (~25 units), of Tag"
+    )
+
+
+def test_plan_cache(register: ArchUnitRegister) -> None:
+    clear_plan_cache()
+    query = Query(register).of_type(Route).carrying(Tag, value="public")
+    for _ in range(3):
+        assert query.count() == 4
+    assert Query(register).of_type(Route).carrying(Tag, value="public").plan() is query.plan()
+    assert plan_cache_info()[:2] == (4, 1)
+    # the plan is made anew when the register changes
+    register.register(Tag(VIEWS[10], "public"))
+    assert query.count() == 5
+    assert plan_cache_info()[:2] == (4, 2)
+    # unhashable values aren't cached
+    assert Query(register).of_type(Route).where(methods=[]).count() == 0
+    assert plan_cache_info()[:2] == (4, 2)
+
+
+def test_plan_cache_of_registers_gone() -> None:
+    clear_plan_cache()
+    register = ArchUnitRegister()
+    register.register(Tag(VIEWS[0], "public"))
+    assert Query(register).of_type(Tag).where(value="public").count() == 1
+    assert plan_cache_info().currsize == 1
+    # the plans go with their register, so that they aren't taken for these of a register made later
+    del register
+    gc.collect()
+    assert plan_cache_info().currsize == 0
+    register = ArchUnitRegister()
+    register.register(Tag(VIEWS[1], "public"))
+    assert Query(register).of_type(Tag).where(value="public").count() == 1
+    assert plan_cache_info()[:2] == (0, 2)
+
+
+def test_other_registers(register: ArchUnitRegister, tmp_path: Path) -> None:
+    save_snapshot(register, tmp_path / "units.snapshot")
+    with load_snapshot(tmp_path / "units.snapshot") as snapshot:
+        for queried in (register.freeze(), snapshot):
+            query = Query(queried).of_type(Route).carrying(Tag, value="public").in_modules("shop.admin")
+            assert targets(query) == {"shop.admin.views:view0"}
+            assert targets(Query(queried).for_targets(VIEWS[1])) == {"shop.views:view1"}
+            assert Query(queried).for_targets(VIEWS[1]).explain() == "1. scan targets: shop.views:view1 (~3 units)"
@@ -1,4 +1,45 @@
-# from pca.packages.archunit import ArchUnitRegister
+import sys
+import typing as t
+from pathlib import Path
 
+import pytest
 
-# def test
+from pca.packages.archunit import ArchUnitRegister
+from pca.packages.archunit.units import Tag
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> t.Iterator[Path]:
+    package = tmp_path / "including_package"
+    (package / "implicit").mkdir(parents=True)
+    (package / "__init__.py").write_text(
+        "from pca.packages.archunit.units import Tag\n"
+        "def archunit_includeme(register):\n"
+        "    register.register(Tag(__name__, 'package'))\n"
+    )
+    (package / "implicit" / "module.py").write_text(
+        "from pca.packages.archunit.units import Tag\n"
+        "def archunit_includeme(register):\n"
+        "    register.register(Tag(__name__, 'module'))\n"
+    )
+    (package / "unrelated.py").write_text("raise RuntimeError('unrelated module imported')\n")
+    (package / "mentioning.py").write_text("# archunit_includeme is mentioned, but not defined\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for name in [name for name in sys.modules if name.startswith("including_package")]:
+        del sys.modules[name]
+
+
+def test_include(register: ArchUnitRegister, package: Path) -> None:
+    module = register.include("including_package.implicit.module")
+    assert module.__name__ == "including_package.implicit.module"
+    assert list(register) == [Tag("including_package.implicit.module", "module")]
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_autodiscover(register: ArchUnitRegister, package: Path, jobs: int) -> None:
+    modules = register.autodiscover("including_package", jobs=jobs)
+    assert [module.__name__ for module in modules] == ["including_package", "including_package.implicit.module"]
+    assert {t.cast(Tag, unit).value for unit in register.get_all_of_type(Tag)} == {"package", "module"}
+    assert "including_package.unrelated" not in sys.modules
+    assert "including_package.mentioning" in sys.modules
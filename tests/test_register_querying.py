@@ -1,3 +1,5 @@
+import collections
+import threading
 import typing as t
 
 import pytest
@@ -6,6 +8,7 @@ from pca.packages.archunit import (
     ArchUnit,
     ArchUnitRegister,
 )
+from pca.packages.archunit.register import ArchUnitRegisterView
 
 
 class Foo(ArchUnit):
@@ -20,6 +23,10 @@ class Quax(ArchUnit):
     pass
 
 
+class Batch(ArchUnit):
+    number: t.Any = 0
+
+
 @pytest.fixture
 def example_units_by_id() -> t.Dict[int, ArchUnit]:
     return {
@@ -56,6 +63,14 @@ def test_empty_register_as_collection(register: ArchUnitRegister) -> None:
     assert list(register) == []
 
 
+def test_registering_twice(register: ArchUnitRegister) -> None:
+    unit = Foo("1")
+    register.register(unit)
+    register.register(Foo("1"))
+    assert len(register) == 1
+    assert list(register.get_all_for_target(unit.target)) == [unit]
+
+
 def test_example_register_as_collection(example_register: ArchUnitRegister, example_units: t.List[ArchUnit]) -> None:
     assert len(example_register) == 4
     assert example_units[0] in example_register
@@ -86,6 +101,17 @@ class TestGetAllOfType:
             example_units_by_id[2],
         }
 
+    def test_new_subclass(self, example_register: ArchUnitRegister, example_units: t.List[ArchUnit]) -> None:
+        assert set(example_register.get_all_of_type(Quax)) == {example_units[3]}
+
+        class Spam(Quax):
+            pass
+
+        spam = Spam("2")
+        example_register.register(spam)
+        assert set(example_register.get_all_of_type(Quax)) == {example_units[3], spam}
+        assert set(example_register.get_all_of_type(ArchUnit)) == {*example_units, spam}
+
 
 class TestGetAllForTarget:
     def test_empty_register(self, register: ArchUnitRegister) -> None:
@@ -103,6 +129,12 @@ class TestGetAllForTarget:
             example_units_by_id[3],
         }
 
+    def test_identity(self, register: ArchUnitRegister) -> None:
+        target, other_target = object(), object()
+        register.register_multiple([Foo(target), Quax(target), Foo(other_target)])
+        assert set(register.get_all_for_target(target)) == {Foo(target), Quax(target)}
+        assert set(register.get_all_for_target(object())) == set()
+
 
 class TestGetAllOfTypeForTarget:
     def test_empty_register(self, register: ArchUnitRegister) -> None:
@@ -131,6 +163,12 @@ class TestGetAllOfTypeForTarget:
             example_units_by_id[2],
         }
 
+    def test_many_targets(self, register: ArchUnitRegister) -> None:
+        target = object()
+        register.register_multiple([Foo(target), Baz(target), Quax(target), Baz(object())])
+        assert set(register.get_all_of_type_for_target(target, Foo)) == {Foo(target), Baz(target)}
+        assert set(register.get_all_of_type_for_target(target, Baz)) == {Baz(target)}
+
     def test_example_register_1_baz(
         self,
         example_register: ArchUnitRegister,
@@ -139,3 +177,120 @@ class TestGetAllOfTypeForTarget:
         assert set(example_register.get_all_of_type_for_target("1", Baz)) == {
             example_units_by_id[2],
         }
+
+
+class TestFrozenRegister:
+    def test_same_as_register(self, example_register: ArchUnitRegister, example_units: t.List[ArchUnit]) -> None:
+        frozen = example_register.freeze()
+        assert len(frozen) == len(example_register)
+        assert set(frozen) == set(example_register)
+        assert all(unit in frozen for unit in example_units)
+        assert Quax("0") not in frozen
+        for unit_type in (ArchUnit, Foo, Baz, Quax):
+            assert set(frozen.get_all_of_type(unit_type)) == set(example_register.get_all_of_type(unit_type))
+            for target in ("0", "1", "2"):
+                assert set(frozen.get_all_of_type_for_target(target, unit_type)) == set(
+                    example_register.get_all_of_type_for_target(target, unit_type)
+                )
+        for target in ("0", "1", "2"):
+            assert set(frozen.get_all_for_target(target)) == set(example_register.get_all_for_target(target))
+
+    def test_independent_of_register(self, example_register: ArchUnitRegister) -> None:
+        frozen = example_register.freeze()
+        example_register.clear()
+        assert len(frozen) == 4
+        assert frozen.freeze() is frozen
+
+    def test_new_subclass(self, example_register: ArchUnitRegister) -> None:
+        frozen = example_register.freeze()
+
+        class Spam(Baz):
+            pass
+
+        assert set(frozen.get_all_of_type(Spam)) == set()
+        assert len(list(frozen.get_all_of_type(Foo))) == 3
+
+
+class TestConcurrency:
+    def test_read_view(self, example_register: ArchUnitRegister, example_units: t.List[ArchUnit]) -> None:
+        view = example_register.read_view()
+        example_register.register_multiple([Foo("0"), Quax("0"), Batch("1")])
+        assert len(example_register) == example_register.generation == 7
+        # the view keeps the units published when it was taken
+        assert len(view) == view.generation == 4
+        assert set(view) == set(example_units)
+        assert Foo("0") in example_register and Foo("0") not in view
+        assert set(view.get_all_of_type(Foo)) == set(example_units[:3])
+        assert view.count_all_of_type(ArchUnit) == 4
+        assert set(view.get_all_for_target("0")) == {example_units[1]}
+        assert view.count_all_for_target("0") == 1
+        assert list(view.get_all_of_type_for_target("1", Batch)) == []
+        example_register.clear()
+        assert len(example_register) == 0
+        assert set(view.freeze()) == set(example_units)
+
+    def test_views_of_growing_target(self, register: ArchUnitRegister) -> None:
+        # a target with a single unit, with a few & with many ones is indexed differently
+        target = object()
+        units: t.List[ArchUnit] = [Foo(target), Quax(target)] + [Batch(target, number) for number in range(12)]
+        views = [register.read_view()]
+        for unit in units:
+            register.register(unit)
+            views.append(register.read_view())
+        for count, view in enumerate(views):
+            assert list(view.get_all_for_target(target)) == units[:count]
+            assert view.count_all_for_target(target) == count
+            assert list(view.get_all_of_type_for_target(target, Batch)) == units[2:count]
+            assert list(view.get_all_of_type_for_target(target, Quax)) == units[1:2][: count - 1]
+            assert all(unit in view for unit in units[:count])
+            assert not any(unit in view for unit in units[count:])
+            assert set(view.freeze().get_all_of_type_for_target(target, Batch)) == set(units[2:count])
+
+    def test_batch_failing(self, register: ArchUnitRegister) -> None:
+        with pytest.raises(TypeError):
+            register.register_multiple([Foo("0"), Batch("0", [])])
+        assert len(register) == 0
+        register.register(Quax("0"))
+        assert list(register) == [Quax("0")]
+
+    def test_batches_published_atomically(self, register: ArchUnitRegister) -> None:
+        targets = [object() for _ in range(50)]
+        batch_count = 200
+        errors: t.List[BaseException] = []
+        writing = threading.Event()
+
+        def write(offset: int) -> None:
+            for number in range(offset, batch_count, 2):
+                register.register_multiple(Batch(target, number) for target in targets)
+
+        def read() -> None:
+            try:
+                while writing.is_set():
+                    check_view(register.read_view(), targets)
+            except BaseException as error:
+                errors.append(error)
+                raise
+
+        writing.set()
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        writers = [threading.Thread(target=write, args=(offset,)) for offset in range(2)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        writing.clear()
+        for thread in readers:
+            thread.join()
+        assert not errors
+        assert len(register) == len(targets) * batch_count
+        check_view(register.read_view(), targets)
+
+
+def check_view(view: ArchUnitRegisterView, targets: t.List[object]) -> None:
+    """The view has whole batches only, the same ones in all the indexes."""
+    units = list(view.get_all_of_type(Batch))
+    assert len(units) == view.count_all_of_type(ArchUnit) == len(view)
+    per_batch = collections.Counter(unit.number for unit in units)  # type: ignore
+    assert set(per_batch.values()) <= {len(targets)}
+    for target in (targets[0], targets[-1]):
+        assert {unit.number for unit in view.get_all_of_type_for_target(target, Batch)} == set(per_batch)  # type: ignore
@@ -0,0 +1,142 @@
+import io
+import json
+import tracemalloc
+import typing as t
+from xml.etree import ElementTree
+
+import pytest
+
+from pca.packages.archunit.graph import (
+    RUNTIME_IMPORT,
+    DependencyGraph,
+)
+from pca.packages.archunit.reporting import (
+    JSONLinesReporter,
+    JUnitXMLReporter,
+    Reporter,
+    TextReporter,
+    report_rules,
+)
+from pca.packages.archunit.rules import (
+    ForbiddenDependency,
+    NoCycles,
+    Rule,
+    Violation,
+)
+
+GRAPH = DependencyGraph(
+    ["app.views", "app.domain", "app.db"],
+    3,
+    [(0, 1, RUNTIME_IMPORT), (1, 2, RUNTIME_IMPORT), (2, 1, RUNTIME_IMPORT)],
+)
+RULES = [
+    ForbiddenDependency(["app.domain"], ["app.db"]),
+    ForbiddenDependency(["app.db"], ["app.views"]),
+    NoCycles(),
+]
+
+
+class ManyViolations(Rule):
+    def __init__(self, count: int) -> None:
+        self.count = count
+
+    def __str__(self) -> str:
+        return "many <violations>"
+
+    def check(self, graph: DependencyGraph) -> t.Iterator[Violation]:
+        for index in range(self.count):
+            yield Violation(str(self), (f"app.module{index}", "app.db"))
+
+
+class CountingStream(io.TextIOBase):
+    def __init__(self) -> None:
+        self.size = 0
+        self.flushes = 0
+
+    def write(self, text: str) -> int:
+        self.size += len(text)
+        return len(text)
+
+    def flush(self) -> None:
+        self.flushes += 1
+
+
+def test_text():
+    stream = io.StringIO()
+    assert report_rules(GRAPH, RULES, [TextReporter(stream)]) == 2
+    assert stream.getvalue().splitlines() == [
+        "modules of app.domain must not import modules of app.db: app.domain -> app.db",
+        "modules must not form cycles: app.domain -> app.db -> app.domain",
+    ]
+
+
+def test_json_lines():
+    stream = io.StringIO()
+    report_rules(GRAPH, RULES, [JSONLinesReporter(stream)])
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["type"] for record in records] == ["violation", "rule", "rule", "violation", "rule"]
+    assert records[0] == {
+        "type": "violation",
+        "rule": str(RULES[0]),
+        "source": "app.domain",
+        "target": "app.db",
+        "path": ["app.domain", "app.db"],
+    }
+    assert [record["violations"] for record in records if record["type"] == "rule"] == [1, 0, 1]
+
+
+def test_junit_xml():
+    stream = io.StringIO()
+    report_rules(GRAPH, RULES + [ManyViolations(1)], [JUnitXMLReporter(stream)])
+    suite = ElementTree.fromstring(stream.getvalue()).find("testsuite")
+    assert suite is not None
+    test_cases = suite.findall("testcase")
+    assert [(case.get("classname"), case.find("failure") is not None) for case in test_cases] == [
+        (str(RULES[0]), True),
+        (str(RULES[1]), False),
+        (str(RULES[2]), True),
+        ("many <violations>", True),
+    ]
+    failure = test_cases[0].find("failure")
+    assert failure is not None and failure.text == "app.domain -> app.db"
+
+
+@pytest.mark.parametrize("reporter_type", [TextReporter, JSONLinesReporter, JUnitXMLReporter])
+def test_fail_fast(reporter_type):
+    violations = []
+
+    class Recorder(Reporter):
+        def add_violation(self, rule, violation):
+            violations.append(violation)
+
+    assert report_rules(GRAPH, RULES, [reporter_type(io.StringIO()), Recorder(io.StringIO())], fail_fast=True) == 1
+    assert len(violations) == 1
+
+
+def test_output_is_streamed():
+    stream = io.StringIO()
+    reporter = TextReporter(stream)
+
+    class Peeking(ManyViolations):
+        def check(self, graph):
+            violations = super().check(graph)
+            yield next(violations)
+            # the first violation is already written before the next one is looked for
+            assert stream.getvalue() == "many <violations>: app.module0 -> app.db\n"
+            yield from violations
+
+    assert report_rules(GRAPH, [Peeking(3)], [reporter]) == 3
+
+
+@pytest.mark.parametrize("reporter_type", [JSONLinesReporter, JUnitXMLReporter])
+def test_constant_memory(reporter_type):
+    stream = CountingStream()
+    tracemalloc.start()
+    try:
+        report_rules(GRAPH, [ManyViolations(20_000)], [reporter_type(stream)])
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert stream.size > 1_000_000
+    assert peak < 200_000
+    assert stream.flushes >= 20_000 // 100
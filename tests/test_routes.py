@@ -0,0 +1,112 @@
+import sys
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from pca.packages.archunit.cache import ScanCache
+from pca.packages.archunit.importing import clear_resolution_cache
+from pca.packages.archunit.introspection import TargetReference
+from pca.packages.archunit.register import ArchUnitRegister
+from pca.packages.archunit.routes import (
+    extract_routes,
+    register_routes,
+)
+from pca.packages.archunit.units.application import Application
+from pca.packages.archunit.units.routing import (
+    Blueprint,
+    BlueprintGroup,
+    Route,
+)
+
+EXAMPLE_APP_PATH = Path(__file__).parents[1] / "examples" / "sanic_example_app"
+
+
+@pytest.fixture
+def example_app(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.syspath_prepend(str(EXAMPLE_APP_PATH))
+    yield "app"
+    clear_resolution_cache()
+
+
+@pytest.fixture
+def routed_package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    package = tmp_path / "routed_app"
+    (package / "api").mkdir(parents=True)
+    (package / "__init__.py").write_text(
+        "import sanic\n"
+        "from .api import orders as orders_blueprint\n"
+        "app = sanic.Sanic(name='shop')\n"
+        "api = sanic.Blueprint.group(orders_blueprint, unknown, url_prefix='/api')\n"
+    )
+    (package / "api" / "__init__.py").write_text("from .views import orders\n")
+    (package / "api" / "views.py").write_text(
+        "from functools import lru_cache as cache\n"
+        "from sanic import Blueprint\n"
+        "orders = Blueprint('orders', '/orders')\n"
+        "@orders.post('/')\n"
+        "async def create(request): ...\n"
+        "@orders.route('/<id>', methods=['get', 'delete'])\n"
+        "@cache.get('/not-a-route')\n"
+        "async def manage(request, id): ...\n"
+        "def nested():\n"
+        "    @orders.get('/nested')\n"
+        "    def not_declared_at_module_level(request): ...\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "routed_app"
+    clear_resolution_cache()
+
+
+def test_example_app(example_app: str) -> None:
+    units = {unit.target: unit for unit in extract_routes(example_app, jobs=1) if unit.target.module != "app.app"}
+    blueprint1 = TargetReference("app.module1.views", "blueprint1")
+    blueprint2 = TargetReference("app.module2", "blueprint2")
+    assert units == {
+        TargetReference("app", "app"): Application(TargetReference("app", "app"), "sanic-example"),
+        TargetReference("app", "blueprint_group"): BlueprintGroup(
+            TargetReference("app", "blueprint_group"), (blueprint1, blueprint2), "/api"
+        ),
+        blueprint1: Blueprint(blueprint1, "blueprint-module-1", "/bp1"),
+        blueprint2: Blueprint(blueprint2, "bp_example2", "/my_blueprint2"),
+        TargetReference("app.module1.views", "foo"): Route(
+            TargetReference("app.module1.views", "foo"), "/foo", blueprint1, ("GET",)
+        ),
+        TargetReference("app.module2", "foo2"): Route(
+            TargetReference("app.module2", "foo2"), "/foo", blueprint2, ("GET",)
+        ),
+        TargetReference("app.views", "foo3"): Route(
+            TargetReference("app.views", "foo3"), "/feed", TargetReference("app.app", "app"), (), websocket=True
+        ),
+    }
+    # nothing has been imported
+    assert "app" not in sys.modules and "sanic" not in sys.modules
+
+
+def test_imports_followed(routed_package: str, tmp_path: Path) -> None:
+    register = ArchUnitRegister()
+    with ScanCache(tmp_path / "cache") as cache:
+        register_routes(register, routed_package, jobs=1, cache=cache)
+    orders = TargetReference("routed_app.api.views", "orders")
+    assert set(register.get_all_of_type(BlueprintGroup)) == {
+        BlueprintGroup(TargetReference("routed_app", "api"), (orders,), "/api")
+    }
+    assert set(register.get_all_of_type(Application)) == {Application(TargetReference("routed_app", "app"), "shop")}
+    routes = t.cast(t.List[Route], list(register.get_all_of_type(Route)))
+    assert sorted((route.target.qualname, route.uri, route.methods) for route in routes) == [
+        ("create", "/", ("POST",)),
+        ("manage", "/<id>", ("GET", "DELETE")),
+    ]
+    assert all(route.router is orders for route in routes)
+
+
+def test_groups_only(routed_package: str, tmp_path: Path) -> None:
+    # no other keyword of the declarations, so the module is parsed for the name of the group factory alone
+    (tmp_path / routed_package / "groups.py").write_text(
+        "from sanic.blueprint_group import BlueprintGroup\n"
+        "from .api import orders\n"
+        "v1 = BlueprintGroup(orders, url_prefix='/v1')\n"
+    )
+    units = extract_routes(routed_package, jobs=1)
+    orders = TargetReference("routed_app.api.views", "orders")
+    assert BlueprintGroup(TargetReference("routed_app.groups", "v1"), (orders,), "/v1") in units
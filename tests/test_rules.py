@@ -0,0 +1,161 @@
+import typing as t
+
+import pytest
+
+from pca.packages.archunit.graph import (
+    RUNTIME_IMPORT,
+    TYPE_CHECKING_IMPORT,
+    DependencyGraph,
+)
+from pca.packages.archunit.rules import (
+    ForbiddenDependency,
+    Layer,
+    LayeredArchitecture,
+    ModuleSelector,
+    NoCycles,
+    Reachability,
+    Violation,
+    check_rules,
+    strongly_connected_components,
+)
+
+MODULES = [
+    "app.views",
+    "app.module1.views",
+    "app.services",
+    "app.helpers",
+    "app.domain",
+    "app.domain.model",
+]
+
+
+def make_graph(*edges: t.Tuple[str, str], type_checking: t.Iterable[t.Tuple[str, str]] = ()) -> DependencyGraph:
+    ids = {name: index for index, name in enumerate(MODULES)}
+    return DependencyGraph(
+        MODULES,
+        len(MODULES),
+        [(ids[source], ids[target], RUNTIME_IMPORT) for source, target in edges]
+        + [(ids[source], ids[target], TYPE_CHECKING_IMPORT) for source, target in type_checking],
+    )
+
+
+@pytest.fixture
+def layers() -> LayeredArchitecture:
+    return LayeredArchitecture(
+        Layer("views", "app.views", "app.*.views"),
+        Layer("services", "app.services"),
+        Layer("domain", "app.domain"),
+    )
+
+
+def test_module_selector() -> None:
+    selector = ModuleSelector(["app.domain", "app.*.views"])
+    assert selector.matches("app.domain")
+    assert selector.matches("app.domain.model")
+    assert selector.matches("app.module1.views")
+    assert not selector.matches("app.domainx")
+    assert not selector.matches("app.views")
+
+
+def test_strongly_connected_components() -> None:
+    graph = make_graph(
+        ("app.views", "app.services"),
+        ("app.services", "app.helpers"),
+        ("app.helpers", "app.services"),
+        ("app.helpers", "app.domain"),
+    )
+    components = strongly_connected_components(graph)
+    assert sorted(map(sorted, components)) == [[0], [1], [2, 3], [4], [5]]
+    # reversed topological order: a component comes after these reachable from it
+    order = {module_id: index for index, component in enumerate(components) for module_id in component}
+    assert order[4] < order[2] < order[0]
+
+
+def test_strongly_connected_components_of_deep_graph() -> None:
+    size = 5000
+    names = [f"app.module{i}" for i in range(size)]
+    graph = DependencyGraph(names, size, [(i, i + 1, RUNTIME_IMPORT) for i in range(size - 1)] + [(size - 1, 0, 1)])
+    assert len(strongly_connected_components(graph)) == 1
+
+
+def test_reachability() -> None:
+    graph = make_graph(("app.views", "app.services"), ("app.services", "app.domain"))
+    reachability = Reachability(graph)
+    assert reachability.reaches(0, 1 << 4)
+    assert not reachability.reaches(4, 1 << 0)
+    assert reachability.find_path(0, 1 << 4) == [0, 2, 4]
+    assert Reachability.of(graph) is Reachability.of(graph)
+
+
+class TestLayeredArchitecture:
+    def test_valid(self, layers: LayeredArchitecture) -> None:
+        graph = make_graph(
+            ("app.views", "app.services"),
+            ("app.module1.views", "app.domain.model"),
+            ("app.services", "app.domain"),
+        )
+        assert list(layers.check(graph)) == []
+
+    def test_direct_violation(self, layers: LayeredArchitecture) -> None:
+        graph = make_graph(("app.domain.model", "app.module1.views"))
+        assert list(layers.check(graph)) == [
+            Violation(
+                "layer 'domain' must not depend on upper layers",
+                ("app.domain.model", "app.module1.views"),
+            )
+        ]
+
+    def test_transitive_violation(self, layers: LayeredArchitecture) -> None:
+        graph = make_graph(("app.domain", "app.helpers"), ("app.helpers", "app.services"))
+        (violation,) = layers.check(graph)
+        assert violation.path == ("app.domain", "app.helpers", "app.services")
+        assert str(violation) == (
+            "layer 'domain' must not depend on upper layers: app.domain -> app.helpers -> app.services"
+        )
+        assert list(LayeredArchitecture(*layers.layers, transitive=False).check(graph)) == []
+
+    def test_type_checking_imports(self, layers: LayeredArchitecture) -> None:
+        graph = make_graph(type_checking=[("app.domain", "app.services")])
+        assert len(list(layers.check(graph))) == 1
+        assert list(LayeredArchitecture(*layers.layers, flags=RUNTIME_IMPORT).check(graph)) == []
+
+
+def test_forbidden_dependency() -> None:
+    graph = make_graph(("app.views", "app.helpers"), ("app.helpers", "app.domain.model"))
+    rule = ForbiddenDependency("app.views", "app.domain")
+    assert list(rule.check(graph)) == []
+    transitive_rule = ForbiddenDependency("app.views", "app.domain", transitive=True)
+    assert [violation.path for violation in transitive_rule.check(graph)] == [
+        ("app.views", "app.helpers", "app.domain.model")
+    ]
+
+
+def test_no_cycles() -> None:
+    graph = make_graph(
+        ("app.views", "app.services"),
+        ("app.services", "app.helpers"),
+        ("app.helpers", "app.services"),
+    )
+    assert [violation.path for violation in NoCycles().check(graph)] == [
+        ("app.services", "app.helpers", "app.services")
+    ]
+    assert list(NoCycles("app.domain").check(graph)) == []
+
+
+def test_check_rules(layers: LayeredArchitecture) -> None:
+    graph = make_graph(("app.domain", "app.views"), ("app.views", "app.domain"))
+    assert [violation.rule for violation in check_rules(graph, [layers, NoCycles()])] == [
+        "layer 'domain' must not depend on upper layers",
+        "modules must not form cycles",
+    ]
+
+
+def test_selects(layers) -> None:
+    forbidden = ForbiddenDependency("app.domain", ["app.views"])
+    assert forbidden.selects("app.domain.model")
+    assert forbidden.selects("app.views")
+    assert not forbidden.selects("app.services")
+    assert layers.selects("app.module1.views")
+    assert not layers.selects("app.helpers")
+    assert NoCycles().selects("app.helpers")
+    assert not NoCycles("app.domain").selects("app.helpers")
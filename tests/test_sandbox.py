@@ -0,0 +1,116 @@
+import pickle
+import sys
+import textwrap
+
+import pytest
+
+from pca.packages.archunit.introspection import (
+    TargetReference,
+    reference_of,
+)
+from pca.packages.archunit.register import ArchUnitRegister
+from pca.packages.archunit.sandbox import (
+    ImportWorkerPool,
+    SerializedUnit,
+)
+from pca.packages.archunit.units.common import Tag
+
+APP_SOURCE = """
+from pca.packages.archunit.units.common import Tag
+
+from sandboxed_app import side_effects
+
+side_effects.IMPORTS += 1
+
+
+class App:
+    pass
+
+
+app = App()
+
+
+def handler():
+    pass
+
+
+def archunit_includeme(register):
+    side_effects.CALLS += 1
+    register.register(Tag(app, f"imports-{side_effects.IMPORTS}"))
+    register.register(Tag(handler, f"calls-{side_effects.CALLS}"))
+"""
+
+
+@pytest.fixture
+def sandboxed_app(tmp_path, monkeypatch):
+    package = tmp_path / "sandboxed_app"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "side_effects.py").write_text("IMPORTS = 0\nCALLS = 0\n")
+    (package / "app.py").write_text(textwrap.dedent(APP_SOURCE))
+    (package / "plain.py").write_text("# mentions archunit_includeme, but doesn't define it\n")
+    (package / "other.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return "sandboxed_app"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ImportWorkerPool(workers=1) as pool:
+        yield pool
+
+
+def tag_values(register, target):
+    return sorted(unit.value for unit in register.get_all_for_target(target))
+
+
+def test_target_reference():
+    reference = TargetReference("app.views", "View.get")
+    assert TargetReference("app.views", "View.get") is reference
+    assert pickle.loads(pickle.dumps(reference)) is reference
+    assert str(reference) == "app.views:View.get"
+    assert str(TargetReference("app.views")) == "app.views"
+    assert TargetReference("pca.packages.archunit.units.common", "Tag").resolve() is Tag
+    with pytest.raises(AttributeError):
+        reference.module = "app"
+
+
+def test_reference_of():
+    module = sys.modules[__name__]
+    assert reference_of(module) is TargetReference(__name__)
+    assert reference_of(Tag) is TargetReference("pca.packages.archunit.units.common", "Tag")
+    assert reference_of(tag_values) is TargetReference(__name__, "tag_values")
+    assert reference_of(APP_SOURCE, module) is TargetReference(__name__, "APP_SOURCE")
+    with pytest.raises(TypeError):
+        reference_of(object(), module)
+
+
+def test_serialized_unit():
+    unit = Tag(Tag, "unit-type")
+    serialized = pickle.loads(pickle.dumps(SerializedUnit.of(unit)))
+    assert serialized == SerializedUnit(
+        "pca.packages.archunit.units.common:Tag",
+        TargetReference("pca.packages.archunit.units.common", "Tag"),
+        ("unit-type",),
+    )
+    assert serialized.load() == Tag(serialized.target, "unit-type")
+
+
+def test_autodiscover(pool, sandboxed_app):
+    register = ArchUnitRegister()
+    assert pool.autodiscover(register, sandboxed_app) == ["sandboxed_app.app"]
+    # the modules have been imported by the worker only
+    assert "sandboxed_app.app" not in sys.modules
+    assert tag_values(register, TargetReference("sandboxed_app.app", "app")) == ["imports-1"]
+    assert tag_values(register, TargetReference("sandboxed_app.app", "handler")) == ["calls-1"]
+
+    # the worker is kept warm: the module isn't imported again, only its hook is called
+    register = ArchUnitRegister()
+    pool.autodiscover(register, sandboxed_app)
+    assert tag_values(register, TargetReference("sandboxed_app.app", "app")) == ["imports-1"]
+    assert tag_values(register, TargetReference("sandboxed_app.app", "handler")) == ["calls-2"]
+
+    pool.restart()
+    register = ArchUnitRegister()
+    pool.autodiscover(register, sandboxed_app)
+    assert tag_values(register, TargetReference("sandboxed_app.app", "handler")) == ["calls-1"]
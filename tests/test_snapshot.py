@@ -0,0 +1,122 @@
+import sys
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from pca.packages.archunit import snapshot
+from pca.packages.archunit.introspection import (
+    TargetReference,
+    reference_of,
+)
+from pca.packages.archunit.register import ArchUnitRegister
+from pca.packages.archunit.snapshot import (
+    SnapshotError,
+    load_snapshot,
+    save_snapshot,
+)
+from pca.packages.archunit.units.application import Application
+from pca.packages.archunit.units.base import ArchUnit
+from pca.packages.archunit.units.common import Tag
+from pca.packages.archunit.units.routing import (
+    BlueprintGroup,
+    Route,
+)
+
+
+class Values(ArchUnit):
+    values: t.Tuple[t.Any, ...] = ()
+
+
+class Target:
+    pass
+
+
+ORDERS = TargetReference("shop.views", "orders")
+
+
+@pytest.fixture
+def register() -> ArchUnitRegister:
+    register = ArchUnitRegister()
+    register.register_multiple(
+        [
+            Tag(Target, "model"),
+            Tag(snapshot, "module"),
+            Application(TargetReference("shop"), "shop"),
+            BlueprintGroup(TargetReference("shop", "api"), (ORDERS,), "/api"),
+            Route(TargetReference("shop.views", "create"), "/", ORDERS, ("POST",)),
+            Route(TargetReference("shop.views", "feed"), "/feed", ORDERS, websocket=True),
+            Values(Target, (None, True, False, 0, -(2**63), 2**64, 1.5, "ünïcode", (), ("nested", (1,)), Target)),
+        ]
+    )
+    return register
+
+
+def test_round_trip(register: ArchUnitRegister, tmp_path: Path) -> None:
+    save_snapshot(register, tmp_path / "units.snapshot")
+    with load_snapshot(tmp_path / "units.snapshot") as loaded:
+        assert len(loaded) == len(register)
+        # targets are loaded as their references
+        assert set(loaded) - set(loaded.get_all_of_type(Values)) == {
+            type(unit)(reference_of(unit.target), *unit.__getstate__()[1:])  # type: ignore
+            for unit in register
+            if not isinstance(unit, Values)
+        }
+        (values,) = t.cast(t.List[Values], list(loaded.get_all_of_type(Values)))
+        target = TargetReference(__name__, "Target")
+        assert values.target is target
+        assert values.values == (None, True, False, 0, -(2**63), 2**64, 1.5, "ünïcode", (), ("nested", (1,)), target)
+        assert values.values[1] is True and values.values[10] is target
+
+
+def test_queries(register: ArchUnitRegister, tmp_path: Path) -> None:
+    save_snapshot(register, tmp_path / "units.snapshot")
+    with load_snapshot(tmp_path / "units.snapshot") as loaded:
+        assert loaded.freeze() is loaded
+        assert {t.cast(Tag, unit).value for unit in loaded.get_all_of_type(Tag)} == {"model", "module"}
+        assert len(list(loaded.get_all_of_type(ArchUnit))) == len(register)
+        # targets are looked up by their references, given as the objects or as the references
+        assert {type(unit) for unit in loaded.get_all_for_target(Target)} == {Tag, Values}
+        assert loaded.get_all_of_type_for_target(TargetReference(__name__, "Target"), Tag) == [
+            Tag(TargetReference(__name__, "Target"), "model")
+        ]
+        assert list(loaded.get_all_for_target(snapshot)) == [Tag(TargetReference(snapshot.__name__), "module")]
+        assert list(loaded.get_all_for_target(object())) == []
+        assert Route(TargetReference("shop.views", "feed"), "/feed", ORDERS, websocket=True) in loaded
+        assert Route(TargetReference("shop.views", "feed"), "/feed", ORDERS) not in loaded
+        # units are made once
+        assert next(iter(loaded.get_all_of_type(Application))) is next(iter(loaded.get_all_of_type(Application)))
+
+        copy = ArchUnitRegister()
+        copy.register_multiple(loaded)
+        assert len(list(copy.get_all_of_type(Route))) == 2
+
+
+def test_equal_values_of_other_types(tmp_path: Path) -> None:
+    all_values = [(True,), (1,), (1.0,), ((1,), 1), ((True,), 1.0), (0.0,), (-0.0,), (-0.0, 0.0), (1, 1.0, True, -0.0)]
+    saved = [Values(TargetReference("shop", f"values{index}"), values) for index, values in enumerate(all_values)]
+    save_snapshot(saved, tmp_path / "units.snapshot")
+    with load_snapshot(tmp_path / "units.snapshot") as loaded:
+        # NB: compared by their representations, as `True == 1 == 1.0`
+        assert sorted(map(repr, loaded)) == sorted(map(repr, saved))
+
+
+def test_strings_interned(tmp_path: Path) -> None:
+    save_snapshot([Tag(ORDERS, "".join(["dyna", "mic"]))], tmp_path / "units.snapshot")
+    with load_snapshot(tmp_path / "units.snapshot") as loaded:
+        (tag,) = t.cast(t.List[Tag], list(loaded))
+        assert tag.value is sys.intern("dynamic")
+
+
+def test_not_referable(tmp_path: Path) -> None:
+    with pytest.raises(TypeError, match="can't be saved"):
+        save_snapshot([Tag(object(), "anonymous")], tmp_path / "units.snapshot")
+    with pytest.raises(TypeError, match="can't be saved"):
+        save_snapshot([Values(Target, (object(),))], tmp_path / "units.snapshot")
+    assert not (tmp_path / "units.snapshot").exists()
+
+
+def test_not_a_snapshot(tmp_path: Path) -> None:
+    (tmp_path / "units.snapshot").write_bytes(b"PCA" * 100)
+    with pytest.raises(SnapshotError):
+        load_snapshot(tmp_path / "units.snapshot")
@@ -1,3 +1,11 @@
+import pickle
+from dataclasses import (
+    FrozenInstanceError,
+    field,
+)
+
+import pytest
+
 from pca.packages.archunit import ArchUnit
 
 
@@ -9,3 +17,53 @@ class Foo(ArchUnit):
 def test_repr() -> None:
     foo = Foo(None, bar="bar", baz=["baz1", "baz2"])
     assert repr(foo) == "Foo(target=None, bar='bar', baz=['baz1', 'baz2'])"
+
+
+class CompactFoo(ArchUnit, compact=True):
+    bar: str
+    baz: int = 0
+    quax: list = field(default_factory=list, compare=False)
+
+
+def test_compact() -> None:
+    foo = CompactFoo(None, bar="bar")
+    assert repr(foo) == "CompactFoo(target=None, bar='bar', baz=0, quax=[])"
+    assert not hasattr(foo, "__dict__")
+    assert foo == CompactFoo(None, bar="bar", quax=[1])
+    with pytest.raises(FrozenInstanceError):
+        foo.bar = "spam"  # type: ignore
+
+
+def test_compact_hash() -> None:
+    foo = CompactFoo(None, bar="bar", baz=1)
+    assert hash(foo) == hash((None, "bar", 1))
+    assert hash(foo) == hash(CompactFoo(None, bar="bar", baz=1))
+
+
+def test_compact_interning() -> None:
+    bar = "".join(["b", "ar"])
+    assert CompactFoo(None, bar=bar).bar is CompactFoo(None, bar="bar").bar
+    target = "".join(["tar", "get"])
+    assert CompactFoo(target, bar=bar).target is target
+
+
+def test_compact_pickling() -> None:
+    foo = CompactFoo(None, bar="bar", baz=1, quax=[1])
+    hash(foo)
+    unpickled = pickle.loads(pickle.dumps(foo))
+    assert unpickled == foo
+    assert unpickled.quax == [1]
+    assert unpickled.bar is foo.bar
+
+
+def test_compact_subclasses() -> None:
+    class CompactSpam(CompactFoo, compact=True):
+        eggs: str = "eggs"
+
+    class Spam(CompactFoo):
+        eggs: str = "eggs"
+
+    assert CompactSpam.__slots__ == ("eggs",)
+    assert not hasattr(CompactSpam(None, bar="bar"), "__dict__")
+    assert hasattr(Spam(None, bar="bar"), "__dict__")
+    assert hash(CompactSpam(None, bar="bar")) == hash(Spam(None, bar="bar"))
@@ -0,0 +1,152 @@
+import os
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+from pca.packages.archunit import (
+    cli,
+    watch,
+)
+from pca.packages.archunit.importing import clear_resolution_cache
+from pca.packages.archunit.rules import (
+    ForbiddenDependency,
+    NoCycles,
+)
+from pca.packages.archunit.watch import Watcher
+
+RULES = [
+    ForbiddenDependency("watched_app.domain", "watched_app.views"),
+    ForbiddenDependency("watched_app.views", "watched_app.db", transitive=True),
+    NoCycles("watched_app.db"),
+]
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    package = tmp_path / "watched_app"
+    package.mkdir()
+    for name, source in {
+        "__init__": "",
+        "views": "from watched_app import services\n",
+        "services": "from watched_app import domain\n",
+        "domain": "import json\n",
+        "db": "",
+    }.items():
+        (package / f"{name}.py").write_text(source)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    sys.modules.pop("watched_app", None)
+    clear_resolution_cache()
+
+
+def write(path, source):
+    stat = os.stat(path) if path.exists() else None
+    path.write_text(source)
+    if stat is not None:
+        # a modification time distinct from the previous one, whatever the resolution of the file system
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_incremental_checks(package):
+    watcher = Watcher("watched_app", RULES)
+    result = watcher.check()
+    assert result.analyzed == 5
+    assert result.checked_rules == tuple(RULES)
+    assert result.violations == ()
+    assert watcher.poll() is None
+
+    write(package / "domain.py", "from watched_app import views\n")
+    result = watcher.poll()
+    assert result.changed == ("watched_app.domain",)
+    assert result.analyzed == 1
+    # views depend on domain, which is selected by the first rule and now depends on views;
+    # db is neither changed nor depends on the changed module
+    assert result.checked_rules == tuple(RULES[:2])
+    assert [str(violation) for violation in result.violations] == [
+        f"{RULES[0]}: watched_app.domain -> watched_app.views",
+    ]
+
+    write(package / "domain.py", "from watched_app import db\n")
+    result = watcher.poll()
+    # db can't get into a cycle, as it doesn't depend on the changed module
+    assert result.checked_rules == tuple(RULES[:2])
+    assert [violation.path for violation in result.violations] == [
+        ("watched_app.views", "watched_app.services", "watched_app.domain", "watched_app.db"),
+    ]
+
+
+def test_added_and_removed_modules(package):
+    watcher = Watcher("watched_app", RULES)
+    watcher.check()
+
+    write(package / "db.py", "from watched_app import migrations\n")
+    (package / "migrations").mkdir()
+    write(package / "migrations" / "__init__.py", "from watched_app import db\n")
+    result = watcher.poll()
+    assert set(result.changed) == {"watched_app.db", "watched_app.migrations"}
+    assert result.analyzed == 2
+    assert result.checked_rules == tuple(RULES)
+    assert [violation.rule for violation in result.violations] == [str(RULES[2])]
+
+    (package / "migrations" / "__init__.py").unlink()
+    (package / "migrations").rmdir()
+    result = watcher.poll()
+    assert result.changed == ("watched_app.migrations",)
+    assert result.analyzed == 0
+    assert result.violations == ()
+
+
+def touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def fresh_graph(rules):
+    watcher = Watcher("watched_app", rules)
+    watcher.check()
+    return watcher.graph
+
+
+def test_packages_turning_regular_and_namespace(package):
+    (package / "plugins").mkdir()
+    write(package / "plugins" / "base.py", "")
+    rules = [ForbiddenDependency("watched_app.plugins", "watched_app.views")]
+    watcher = Watcher("watched_app", rules)
+    watcher.check()
+
+    # only the directory of the subpackage changes, not the directory of its parent package
+    write(package / "plugins" / "__init__.py", "from watched_app import views\n")
+    touch(package / "plugins")
+    result = watcher.poll()
+    assert result is not None
+    assert result.changed == ("watched_app.plugins",)
+    assert result.analyzed == 1
+    assert [str(violation) for violation in result.violations] == [
+        f"{rules[0]}: watched_app.plugins -> watched_app.views",
+    ]
+    assert set(watcher.graph) == set(fresh_graph(rules))
+
+    (package / "plugins" / "__init__.py").unlink()
+    touch(package / "plugins")
+    result = watcher.poll()
+    assert result is not None
+    assert result.changed == ("watched_app.plugins",)
+    assert result.violations == ()
+    assert set(watcher.graph) == set(fresh_graph(rules))
+    assert "watched_app.plugins" in watcher.graph
+
+
+def test_cli(package, monkeypatch):
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(watch.time, "sleep", interrupt)
+    result = CliRunner().invoke(cli.main, ["watch", "watched_app", "tests.test_watch:RULES"])
+    assert result.exit_code == cli.EXIT_OK, result.output
+    assert "5 module(s) analyzed, 3 rule(s) evaluated" in result.output
+
+    write(package / "domain.py", "from watched_app import views\n")
+    result = CliRunner().invoke(cli.main, ["watch", "watched_app", "tests.test_watch:RULES"])
+    assert result.exit_code == cli.EXIT_VIOLATIONS
+    assert f"{RULES[0]}: watched_app.domain -> watched_app.views" in result.output